@@ -0,0 +1,6 @@
+__version__ = "0.5.3.4"
+def __getattr__(name):
+    if name in ('Program', 'compile'):
+        from . import program
+        return getattr(program, name)
+    raise AttributeError(f"module 'shell_lite' has no attribute '{name}'")
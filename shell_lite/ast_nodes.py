@@ -1,301 +1,344 @@
-from dataclasses import dataclass, field
+import sys
+from dataclasses import MISSING, dataclass, field, fields
 from typing import Any, List, Optional
-@dataclass
+def slotted(cls):
+    """
+    @dataclass whose fields live in __slots__ rather than a per-instance
+    __dict__. Large scripts produce hundreds of thousands of nodes and
+    tokens, so this cuts their memory by about a third without changing the
+    attribute API. Python 3.10+ has dataclass(slots=True); older versions
+    get the same class built by hand.
+    """
+    if sys.version_info >= (3, 10):
+        return dataclass(cls, slots=True)
+    cls = dataclass(cls)
+    inherited = set()
+    for base in cls.__mro__[1:]:
+        inherited.update(getattr(base, '__slots__', ()))
+    own = tuple(f.name for f in fields(cls) if f.name not in inherited)
+    namespace = dict(cls.__dict__)
+    for name in own:
+        namespace.pop(name, None)
+    namespace.pop('__dict__', None)
+    namespace.pop('__weakref__', None)
+    namespace['__slots__'] = own
+    late = [(f.name, f.default) for f in fields(cls) if not f.init and f.default is not MISSING]
+    if late:
+        init = namespace['__init__']
+        def __init__(self, *args, **kwargs):
+            for name, value in late:
+                setattr(self, name, value)
+            init(self, *args, **kwargs)
+        namespace['__init__'] = __init__
+    return type(cls)(cls.__name__, cls.__bases__, namespace)
+@slotted
 class Node:
     line: int = field(default=0, init=False)
-@dataclass
+@slotted
 class Number(Node):
     value: int
-@dataclass
+@slotted
 class String(Node):
     value: str
-@dataclass
+@slotted
 class Regex(Node):
     pattern: str
-@dataclass
+@slotted
 class VarAccess(Node):
     name: str
-@dataclass
+    scope: Optional[tuple] = field(default=None, init=False, repr=False, compare=False)
+@slotted
 class Assign(Node):
     name: str
     value: Node
-@dataclass
+    scope: Optional[tuple] = field(default=None, init=False, repr=False, compare=False)
+@slotted
 class PropertyAssign(Node):
     instance_name: str
     property_name: str
     value: Node
-@dataclass
+@slotted
 class UnaryOp(Node):
     op: str
     right: Node
-@dataclass
+@slotted
 class BinOp(Node):
     left: Node
     op: str
     right: Node
-@dataclass
+@slotted
 class Print(Node):
     expression: Node
     style: Optional[str] = None
     color: Optional[str] = None
-@dataclass
+@slotted
 class If(Node):
     condition: Node
     body: List[Node]
     else_body: Optional[List[Node]] = None
-@dataclass
+@slotted
 class While(Node):
     condition: Node
     body: List[Node]
-@dataclass
+@slotted
 class For(Node):
     count: Node
     body: List[Node]
-@dataclass
+@slotted
 class ListVal(Node):
     elements: List[Node]
-@dataclass
+@slotted
 class Dictionary(Node):
     pairs: List[tuple[Node, Node]]
-@dataclass
+@slotted
 class SetVal(Node):
     elements: List[Node]
-@dataclass
+@slotted
 class Boolean(Node):
     value: bool
-@dataclass
+@slotted
 class Input(Node):
     prompt: Optional[str] = None
-@dataclass
+@slotted
 class FunctionDef(Node):
     name: str
     args: List[tuple[str, Optional[Node], Optional[str]]]
     body: List[Node]
     return_type: Optional[str] = None
-@dataclass
+    layout: Optional[dict] = field(default=None, init=False, repr=False, compare=False)
+@slotted
 class Call(Node):
     name: str
     args: List[Node]
     kwargs: Optional[List[tuple[str, Node]]] = None
     body: Optional[List[Node]] = None
-@dataclass
+    cache: Optional[tuple] = field(default=None, init=False, repr=False, compare=False)
+    def __getstate__(self):
+        state = {f.name: getattr(self, f.name) for f in fields(self)}
+        state['cache'] = None
+        return (None, state)
+@slotted
 class Return(Node):
     value: Node
-@dataclass
+    tail: bool = field(default=False, init=False, repr=False, compare=False)
+@slotted
 class ClassDef(Node):
     name: str
     properties: List[tuple[str, Optional[Node]]]
     methods: List[FunctionDef]
     parent: Optional[str] = None
-@dataclass
+@slotted
 class Instantiation(Node):
     var_name: str
     class_name: str
     args: List[Node]
     kwargs: Optional[List[tuple[str, Node]]] = None
-@dataclass
+@slotted
 class MethodCall(Node):
     instance_name: str
     method_name: str
     args: List[Node]
     kwargs: Optional[List[tuple[str, Node]]] = None
-@dataclass
+@slotted
 class PropertyAccess(Node):
     instance_name: str
     property_name: str
-@dataclass
+@slotted
 class Import(Node):
     path: str
-@dataclass
+@slotted
 class Try(Node):
     try_body: List[Node]
     catch_var: str
     catch_body: List[Node]
-@dataclass
+@slotted
 class Lambda(Node):
     params: List[str]
     body: Node
-@dataclass
+@slotted
 class Ternary(Node):
     condition: Node
     true_expr: Node
     false_expr: Node
-@dataclass
+@slotted
 class ListComprehension(Node):
     expr: Node
     var_name: str
     iterable: Node
     condition: Optional[Node] = None
-@dataclass
+    layout: Optional[dict] = field(default=None, init=False, repr=False, compare=False)
+@slotted
 class Spread(Node):
     value: Node
-@dataclass
+@slotted
 class ConstAssign(Node):
     name: str
     value: Node
-@dataclass
+@slotted
 class ForIn(Node):
     var_name: str
     iterable: Node
     body: List[Node]
-@dataclass
+    layout: Optional[dict] = field(default=None, init=False, repr=False, compare=False)
+@slotted
 class IndexAccess(Node):
     obj: Node
     index: Node
-@dataclass
+@slotted
 class Stop(Node):
     pass
-@dataclass
+@slotted
 class Skip(Node):
     pass
-@dataclass
+@slotted
 class When(Node):
     value: Node
     cases: List[tuple[Node, List[Node]]]
     otherwise: Optional[List[Node]] = None
-@dataclass
+@slotted
 class Throw(Node):
     message: Node
-@dataclass
+@slotted
 class TryAlways(Node):
     try_body: List[Node]
     catch_var: str
     catch_body: List[Node]
     always_body: List[Node]
-@dataclass
+@slotted
 class Unless(Node):
     condition: Node
     body: List[Node]
     else_body: Optional[List[Node]] = None
-@dataclass
+@slotted
 class Execute(Node):
     code: Node
-@dataclass
+@slotted
 class Repeat(Node):
     count: Node
     body: List[Node]
-@dataclass
+    layout: Optional[dict] = field(default=None, init=False, repr=False, compare=False)
+@slotted
 class ImportAs(Node):
     path: str
     alias: str
-@dataclass
+@slotted
 class Until(Node):
     condition: Node
     body: List[Node]
-@dataclass
+@slotted
 class Forever(Node):
     body: List[Node]
-@dataclass
+@slotted
 class Exit(Node):
     code: Optional[Node] = None
-@dataclass
+@slotted
 class Make(Node):
     class_name: str
     args: List[Node]
-@dataclass
+@slotted
 class FileWatcher(Node):
     path: Node
     body: List[Node]
-@dataclass
+@slotted
 class Alert(Node):
     message: Node
-@dataclass
+@slotted
 class Prompt(Node):
     prompt: Node
-@dataclass
+@slotted
 class Confirm(Node):
     prompt: Node
-@dataclass
+@slotted
 class Spawn(Node):
     call: Node
-@dataclass
+@slotted
 class Await(Node):
     task: Node
-@dataclass
+@slotted
 class ProgressLoop(Node):
     loop_node: Node
-@dataclass
+@slotted
 class Convert(Node):
     expression: Node
     target_format: str
-@dataclass
+@slotted
 class Listen(Node):
     port: Node
-@dataclass
+@slotted
 class OnRequest(Node):
     path: Node
     body: List[Node]
-@dataclass
+@slotted
 class Every(Node):
     interval: Node
     unit: str
     body: List[Node]
-@dataclass
+@slotted
 class After(Node):
     delay: Node
     unit: str
     body: List[Node]
-@dataclass
+@slotted
 class ServeStatic(Node):
     folder: Node
     url: Node
-@dataclass
+@slotted
 class Download(Node):
     url: Node
-@dataclass
+@slotted
 class ArchiveOp(Node):
     op: str
     source: Node
     target: Node
-@dataclass
+@slotted
 class CsvOp(Node):
     op: str
     data: Optional[Node]
     path: Node
-@dataclass
+@slotted
 class ClipboardOp(Node):
     op: str
     content: Optional[Node]
-@dataclass
+@slotted
 class AutomationOp(Node):
     action: str
     args: List[Node]
-@dataclass
+@slotted
 class DateOp(Node):
     expr: str
-@dataclass
+@slotted
 class FileWrite(Node):
     path: Node
     content: Node
     mode: str
-@dataclass
+@slotted
 class FileRead(Node):
     path: Node
-@dataclass
+@slotted
 class DatabaseOp(Node):
     op: str
     args: List[Node]
-@dataclass
+@slotted
 class PythonImport(Node):
     module_name: str
     alias: Optional[str]
-@dataclass
+@slotted
 class FromImport(Node):
     module_name: str
     names: List[tuple[str, Optional[str]]]
-@dataclass
+@slotted
 class App(Node):
     title: str
     width: int
     height: int
     body: List[Node]
-@dataclass
+@slotted
 class Widget(Node):
     widget_type: str
     label: str
     var_name: Optional[str] = None
     event_handler: Optional[List[Node]] = None
-@dataclass
+@slotted
 class Layout(Node):
     layout_type: str
     body: List[Node]
\ No newline at end of file
@@ -0,0 +1,204 @@
+import gc
+import io
+import json
+import platform
+import statistics
+import sys
+import time
+from contextlib import redirect_stdout
+from typing import Any, Callable, Dict, List, Optional
+DEFAULT_WARMUP = 3
+DEFAULT_REPEAT = 15
+DEFAULT_THRESHOLD = 0.10
+WORKLOADS = {
+    'arithmetic': "total = 0\ni = 0\nwhile i < 2000\n    total = total + i * 3 - i / 2\n    i = i + 1\n",
+    'calls': "to fib n\n    if n < 2\n        return n\n    return fib(n - 1) + fib(n - 2)\nresult = fib(14)\n",
+    'method_calls': ("structure Counter\n    has count\n    to bump n\n        return count + n\nc is Counter 0\n"
+                     "total = 0\ni = 0\nwhile i < 500\n    total = total + c.bump(i)\n    i = i + 1\n"),
+    'loops': "out = []\nnums = [1 to 3000]\nfor each x in nums\n    add x * 2 to out\nrepeat 1000 times\n    add 0 to out\n",
+    'list_comprehension': "nums = [1 to 3000]\nsquares = [n * n for n in nums if n % 2 == 0]\n",
+}
+ROUTES = "".join(f"when someone visits \"/api/v1/resource{i}/:id\"\n    return \"resource {i} \" + id\n" for i in range(50))
+SQLITE = ("db open \":memory:\"\ndb exec \"create table items (id integer, name text)\"\ni = 0\nwhile i < 200\n"
+          "    db exec \"insert into items values (\" + str(i) + \", 'item')\"\n    i = i + 1\n"
+          "rows = db query \"select id from items where id % 3 = 0\"\ndb close\n")
+PARSE_SOURCE = "".join(WORKLOADS.values()) * 10
+BENCHMARKS: Dict[str, Callable[[], Callable[[], Any]]] = {}
+def register_benchmark(name: str):
+    """Add a benchmark to the suite. The decorated setup function runs once,
+    untimed, and returns the callable that is timed for every sample; it may
+    raise ImportError to mark the benchmark as skipped."""
+    def decorator(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return decorator
+def script_runner(source: str) -> Callable[[], Any]:
+    from .bytecode import compile_source
+    from .interpreter import Interpreter
+    module = compile_source(source, parser='legacy')
+    def run():
+        interpreter = Interpreter()
+        with redirect_stdout(io.StringIO()):
+            interpreter.run_statements(module.statements)
+        return interpreter
+    return run
+@register_benchmark('lexer')
+def bench_lexer():
+    from .lexer import Lexer
+    return lambda: Lexer(PARSE_SOURCE).tokenize()
+@register_benchmark('parser.legacy')
+def bench_parser_legacy():
+    from .lexer import Lexer
+    from .parser import Parser
+    tokens = Lexer(PARSE_SOURCE).tokenize()
+    return lambda: Parser(list(tokens)).parse()
+@register_benchmark('parser.gbp')
+def bench_parser_gbp():
+    from .lexer import Lexer
+    from .parser_gbp import GeometricBindingParser
+    tokens = Lexer(PARSE_SOURCE).tokenize()
+    return lambda: GeometricBindingParser(list(tokens)).parse()
+for _name, _source in WORKLOADS.items():
+    register_benchmark('interpreter.' + _name)(lambda source=_source: script_runner(source))
+@register_benchmark('http.routing')
+def bench_http_routing():
+    interpreter = script_runner(ROUTES)()
+    paths = [f"/api/v1/resource{i}/{i * 7}" for i in range(0, 50, 5)] + ["/missing"]
+    def run():
+        for _ in range(20):
+            for path in paths:
+                interpreter.match_route(path)
+    return run
+@register_benchmark('sqlite')
+def bench_sqlite():
+    import sqlite3
+    return script_runner(SQLITE)
+@register_benchmark('transpile.python')
+def bench_transpile_python():
+    from .bytecode import parse_source
+    from .compiler import Compiler
+    statements = parse_source(PARSE_SOURCE, 'legacy')
+    return lambda: Compiler().compile(statements)
+@register_benchmark('transpile.js')
+def bench_transpile_js():
+    from .bytecode import parse_source
+    from .js_compiler import JSCompiler
+    statements = parse_source(WORKLOADS['calls'] * 50, 'legacy')
+    return lambda: JSCompiler().compile(statements)
+@register_benchmark('llvm.codegen')
+def bench_llvm():
+    from .bytecode import parse_source
+    from .llvm_backend.codegen import LLVMCompiler
+    statements = parse_source(WORKLOADS['calls'] * 20, 'legacy')
+    return lambda: str(LLVMCompiler().compile(statements))
+def measure(run: Callable[[], Any], warmup: int = DEFAULT_WARMUP, repeat: int = DEFAULT_REPEAT) -> Dict[str, Any]:
+    """Time `repeat` calls of `run` after `warmup` untimed ones. The garbage
+    collector is run before and disabled during each sample."""
+    for _ in range(warmup):
+        run()
+    samples = []
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            gc.collect()
+            start = time.perf_counter()
+            run()
+            samples.append(time.perf_counter() - start)
+    finally:
+        if enabled:
+            gc.enable()
+    return {'min': min(samples), 'median': statistics.median(samples), 'mean': statistics.fmean(samples),
+            'stdev': statistics.stdev(samples) if len(samples) > 1 else 0.0, 'repeat': repeat}
+def run_suite(names: Optional[List[str]] = None, warmup: int = DEFAULT_WARMUP, repeat: int = DEFAULT_REPEAT,
+              progress=None) -> Dict[str, Any]:
+    """Run the named benchmarks (all by default) and return the JSON report."""
+    from . import __version__
+    results = {}
+    for name in names if names is not None else BENCHMARKS:
+        try:
+            run = BENCHMARKS[name]()
+        except ImportError as e:
+            results[name] = {'skipped': f"missing dependency: {e.name or e}"}
+        else:
+            results[name] = measure(run, warmup, repeat)
+        if progress:
+            progress(name, results[name])
+    return {'shell_lite': __version__, 'python': platform.python_version(),
+            'implementation': platform.python_implementation(), 'platform': platform.platform(),
+            'warmup': warmup, 'benchmarks': results}
+def select(patterns: List[str]) -> List[str]:
+    """Benchmark names containing any of `patterns` (all when empty)."""
+    return [name for name in BENCHMARKS if not patterns or any(p in name for p in patterns)]
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], threshold: float = DEFAULT_THRESHOLD) -> List[Dict[str, Any]]:
+    """Median of each benchmark against the baseline report. A benchmark is a
+    regression when it is more than `threshold` (a fraction) slower, an
+    improvement when it is that much faster."""
+    rows = []
+    for name, result in report['benchmarks'].items():
+        old = baseline.get('benchmarks', {}).get(name)
+        if 'median' not in result or not old or 'median' not in old:
+            continue
+        ratio = result['median'] / old['median'] if old['median'] else 1.0
+        status = 'regression' if ratio > 1 + threshold else 'improvement' if ratio < 1 - threshold else 'unchanged'
+        rows.append({'name': name, 'baseline': old['median'], 'current': result['median'], 'ratio': ratio, 'status': status})
+    return rows
+def format_progress(name: str, result: Dict[str, Any]):
+    if 'skipped' in result:
+        print(f"  {name:<34} skipped ({result['skipped']})", file=sys.stderr)
+    else:
+        print(f"  {name:<34} median {result['median'] * 1000:9.3f} ms  stdev {result['stdev'] * 1000:8.3f} ms", file=sys.stderr)
+def bench_command(args: List[str]) -> int:
+    """`shl bench [--filter NAME]... [--repeat N] [--warmup N] [--output FILE]
+    [--compare BASELINE.json [--threshold 0.10]] [--list]`. The report is
+    JSON on stdout (or FILE); returns 1 when --compare finds a regression."""
+    options = {'--filter': [], '--repeat': DEFAULT_REPEAT, '--warmup': DEFAULT_WARMUP, '--output': None,
+               '--compare': None, '--threshold': DEFAULT_THRESHOLD}
+    i = 0
+    while i < len(args):
+        name, _, value = args[i].partition('=')
+        if name == '--list':
+            print("\n".join(BENCHMARKS))
+            return 0
+        if name not in options:
+            raise ValueError(f"Unknown option '{args[i]}'")
+        if not value:
+            if i + 1 >= len(args):
+                raise ValueError(f"{name} requires an argument")
+            i += 1
+            value = args[i]
+        if name == '--filter':
+            options[name].append(value)
+        elif name in ('--repeat', '--warmup'):
+            if not value.isdigit() or (name == '--repeat' and int(value) < 1):
+                raise ValueError(f"{name} expects a positive number, got '{value}'")
+            options[name] = int(value)
+        elif name == '--threshold':
+            options[name] = float(value)
+        else:
+            options[name] = value
+        i += 1
+    baseline = None
+    if options['--compare']:
+        with open(options['--compare'], 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+    names = select(options['--filter'])
+    if not names:
+        raise ValueError("No benchmark matches " + ", ".join(options['--filter']))
+    report = run_suite(names, options['--warmup'], options['--repeat'], format_progress)
+    failed = 0
+    if baseline is not None:
+        report['comparison'] = rows = compare(report, baseline, options['--threshold'])
+        for row in rows:
+            marker = {'regression': 'SLOWER', 'improvement': 'faster'}.get(row['status'], '')
+            print(f"  {row['name']:<34} {row['ratio']:6.2f}x  {marker}", file=sys.stderr)
+        failed = sum(row['status'] == 'regression' for row in rows)
+        if failed:
+            print(f"{failed} benchmark(s) regressed by more than {options['--threshold']:.0%}", file=sys.stderr)
+    output = json.dumps(report, indent=2)
+    if options['--output']:
+        with open(options['--output'], 'w', encoding='utf-8') as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    return 1 if failed else 0
@@ -0,0 +1,570 @@
+import hashlib
+import os
+import pickle
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from .ast_nodes import *
+from . import __version__
+from .optimizer import DEFAULT_OPT_LEVEL
+MAGIC = b'SHLC'
+BYTECODE_VERSION = 4
+CACHE_DIR = '__shlcache__'
+POP_TOP = 0
+DUP_TOP = 1
+LOAD_CONST = 2
+LOAD_NAME = 3
+STORE_NAME = 4
+STORE_CONST_NAME = 5
+LOAD_FAST = 6
+STORE_FAST = 7
+LOAD_GLOBAL = 8
+BINARY_ADD = 9
+BINARY_SUB = 10
+BINARY_MUL = 11
+BINARY_DIV = 12
+BINARY_MOD = 13
+COMPARE_EQ = 14
+COMPARE_NE = 15
+COMPARE_LT = 16
+COMPARE_GT = 17
+COMPARE_LE = 18
+COMPARE_GE = 19
+BINARY_AND = 20
+BINARY_OR = 21
+BINARY_MATCHES = 22
+UNARY_NOT = 23
+JUMP = 24
+POP_JUMP_IF_FALSE = 25
+POP_JUMP_IF_TRUE = 26
+BUILD_LIST = 27
+BUILD_DICT = 28
+LIST_APPEND = 29
+BINARY_SUBSCR = 30
+PRINT = 31
+CALL_NAME = 32
+RETURN_VALUE = 33
+MAKE_FUNCTION = 34
+THROW = 35
+GET_ITER = 36
+COUNT_ITER = 37
+FOR_ITER = 38
+SETUP_LOOP = 39
+POP_BLOCK = 40
+BREAK_LOOP = 41
+CONTINUE_LOOP = 42
+ENTER_SCOPE = 43
+EXIT_SCOPE = 44
+EVAL_NODE = 45
+OPNAMES = {value: name for name, value in list(globals().items()) if name.isupper() and isinstance(value, int) and name not in ('MAGIC', 'BYTECODE_VERSION')}
+HAS_JUMP = {JUMP, POP_JUMP_IF_FALSE, POP_JUMP_IF_TRUE, FOR_ITER}
+BINARY_OPS = {
+    '+': BINARY_ADD, '-': BINARY_SUB, '*': BINARY_MUL, '/': BINARY_DIV, '%': BINARY_MOD,
+    '==': COMPARE_EQ, '!=': COMPARE_NE, '<': COMPARE_LT, '>': COMPARE_GT,
+    '<=': COMPARE_LE, '>=': COMPARE_GE,
+    'and': BINARY_AND, 'or': BINARY_OR, 'matches': BINARY_MATCHES,
+}
+class CodeObject:
+    """
+    A flat bytecode unit. `instructions` holds (opcode, arg) pairs laid out
+    as consecutive ints; `lines[i]` is the source line of instruction i.
+    Functions compiled in slot mode keep their locals in `varnames` slots.
+    """
+    def __init__(self, name: str, filename: str = '<string>', is_function: bool = False):
+        self.name = name
+        self.filename = filename
+        self.is_function = is_function
+        self.uses_slots = False
+        self.instructions: List[int] = []
+        self.lines: List[int] = []
+        self.consts: List[Any] = []
+        self.names: List[str] = []
+        self.varnames: List[str] = []
+        self.argcount = 0
+    def __repr__(self):
+        return f"<code {self.name} ({len(self.lines)} instructions)>"
+class _NeedsNames(Exception):
+    pass
+class BytecodeCompiler:
+    def __init__(self, filename: str = '<string>'):
+        self.filename = filename
+        self.code: Optional[CodeObject] = None
+        self.const_map: Dict[Tuple[type, Any], int] = {}
+        self.name_map: Dict[str, int] = {}
+        self.slot_map: Dict[str, int] = {}
+        self.current_line = 0
+    def compile(self, statements: List[Node], name: str = '<module>') -> CodeObject:
+        """Compile top-level statements into a module CodeObject."""
+        code = CodeObject(name, self.filename)
+        self._begin(code)
+        for stmt in statements:
+            self.compile_stmt(stmt)
+        self.emit(LOAD_CONST, self.const(None))
+        self.emit(RETURN_VALUE)
+        return code
+    def compile_function(self, func_def: FunctionDef) -> CodeObject:
+        """Compile a FunctionDef body, preferring slot-indexed locals.
+        Bodies that need a real Environment (fallback nodes, scoped loops,
+        constants) are recompiled with name-based locals instead.
+        """
+        try:
+            return self._compile_function(func_def, use_slots=True)
+        except _NeedsNames:
+            return self._compile_function(func_def, use_slots=False)
+    def _compile_function(self, func_def: FunctionDef, use_slots: bool) -> CodeObject:
+        saved = (self.code, self.const_map, self.name_map, self.slot_map, self.current_line)
+        code = CodeObject(func_def.name, self.filename, is_function=True)
+        code.uses_slots = use_slots
+        code.argcount = len(func_def.args)
+        self._begin(code)
+        if use_slots:
+            for arg_name, _, _ in func_def.args:
+                self.slot(arg_name)
+            for local_name in _assigned_names(func_def.body):
+                self.slot(local_name)
+        self.current_line = func_def.line
+        try:
+            body = func_def.body
+            for stmt in body[:-1]:
+                self.compile_stmt(stmt)
+            if body:
+                self.compile_expr(body[-1], as_statement=True)
+            else:
+                self.emit(LOAD_CONST, self.const(None))
+            self.emit(RETURN_VALUE)
+        finally:
+            self.code, self.const_map, self.name_map, self.slot_map, self.current_line = saved
+        return code
+    def _begin(self, code: CodeObject):
+        self.code = code
+        self.const_map = {}
+        self.name_map = {}
+        self.slot_map = {}
+    def emit(self, op: int, arg: int = 0) -> int:
+        self.code.instructions.append(op)
+        self.code.instructions.append(arg)
+        self.code.lines.append(self.current_line)
+        return len(self.code.lines) - 1
+    def here(self) -> int:
+        return len(self.code.lines)
+    def patch(self, index: int, target: int):
+        self.code.instructions[index * 2 + 1] = target
+    def const(self, value: Any) -> int:
+        key = None
+        if value is None or isinstance(value, (int, float, str, bool)):
+            key = (type(value), value)
+            index = self.const_map.get(key)
+            if index is not None:
+                return index
+        self.code.consts.append(value)
+        index = len(self.code.consts) - 1
+        if key is not None:
+            self.const_map[key] = index
+        return index
+    def name(self, name: str) -> int:
+        index = self.name_map.get(name)
+        if index is None:
+            self.code.names.append(name)
+            index = self.name_map[name] = len(self.code.names) - 1
+        return index
+    def slot(self, name: str) -> int:
+        index = self.slot_map.get(name)
+        if index is None:
+            self.code.varnames.append(name)
+            index = self.slot_map[name] = len(self.code.varnames) - 1
+        return index
+    def require_names(self):
+        if self.code.uses_slots:
+            raise _NeedsNames()
+    def emit_load(self, name: str):
+        if self.code.uses_slots:
+            if name in self.slot_map:
+                self.emit(LOAD_FAST, self.slot_map[name])
+            else:
+                self.emit(LOAD_GLOBAL, self.name(name))
+        else:
+            self.emit(LOAD_NAME, self.name(name))
+    def emit_store(self, name: str):
+        if self.code.uses_slots:
+            self.emit(STORE_FAST, self.slot(name))
+        else:
+            self.emit(STORE_NAME, self.name(name))
+    def emit_fallback(self, node: Node):
+        self.require_names()
+        self.emit(EVAL_NODE, self.const(node))
+    def compile_block(self, statements: Optional[List[Node]]):
+        for stmt in statements or []:
+            self.compile_stmt(stmt)
+    def compile_stmt(self, node: Node):
+        saved_line = self.current_line
+        if node is not None and node.line:
+            self.current_line = node.line
+        try:
+            method = getattr(self, f'stmt_{type(node).__name__}', None) if node is not None else None
+            if method is not None:
+                method(node)
+            elif node is None:
+                self.emit_fallback(node)
+                self.emit(POP_TOP)
+            else:
+                self.compile_expr(node)
+                self.emit(POP_TOP)
+        finally:
+            self.current_line = saved_line
+    def compile_expr(self, node: Node, as_statement: bool = False):
+        saved_line = self.current_line
+        if node is not None and node.line:
+            self.current_line = node.line
+        try:
+            if node is None:
+                self.emit(LOAD_CONST, self.const(None))
+                return
+            method = getattr(self, f'expr_{type(node).__name__}', None)
+            if method is not None:
+                method(node)
+            elif as_statement and hasattr(self, f'stmt_{type(node).__name__}'):
+                getattr(self, f'stmt_{type(node).__name__}')(node)
+                self.emit(LOAD_CONST, self.const(None))
+            else:
+                self.emit_fallback(node)
+        finally:
+            self.current_line = saved_line
+    def expr_Number(self, node: Number):
+        self.emit(LOAD_CONST, self.const(node.value))
+    def expr_String(self, node: String):
+        self.emit(LOAD_CONST, self.const(node.value))
+    def expr_Boolean(self, node: Boolean):
+        self.emit(LOAD_CONST, self.const(node.value))
+    def expr_VarAccess(self, node: VarAccess):
+        self.emit_load(node.name)
+    def expr_Assign(self, node: Assign):
+        self.compile_expr(node.value)
+        self.emit(DUP_TOP)
+        self.emit_store(node.name)
+    def stmt_Assign(self, node: Assign):
+        self.compile_expr(node.value)
+        self.emit_store(node.name)
+    def expr_ConstAssign(self, node: ConstAssign):
+        self.require_names()
+        self.compile_expr(node.value)
+        self.emit(DUP_TOP)
+        self.emit(STORE_CONST_NAME, self.name(node.name))
+    def expr_BinOp(self, node: BinOp):
+        op = BINARY_OPS.get(node.op)
+        if op is None:
+            self.emit_fallback(node)
+            return
+        self.compile_expr(node.left)
+        self.compile_expr(node.right)
+        self.emit(op)
+    def expr_UnaryOp(self, node: UnaryOp):
+        if node.op != 'not':
+            self.emit_fallback(node)
+            return
+        self.compile_expr(node.right)
+        self.emit(UNARY_NOT)
+    def expr_Print(self, node: Print):
+        if node.color or node.style:
+            self.emit_fallback(node)
+            return
+        self.compile_expr(node.expression)
+        self.emit(PRINT)
+    def expr_ListVal(self, node: ListVal):
+        if any(isinstance(e, Spread) for e in node.elements):
+            self.emit_fallback(node)
+            return
+        for e in node.elements:
+            self.compile_expr(e)
+        self.emit(BUILD_LIST, len(node.elements))
+    def expr_Dictionary(self, node: Dictionary):
+        for k, v in node.pairs:
+            self.compile_expr(k)
+            self.compile_expr(v)
+        self.emit(BUILD_DICT, len(node.pairs))
+    def expr_IndexAccess(self, node: IndexAccess):
+        self.compile_expr(node.obj)
+        self.compile_expr(node.index)
+        self.emit(BINARY_SUBSCR)
+    def expr_Ternary(self, node: Ternary):
+        self.compile_expr(node.condition)
+        jump_false = self.emit(POP_JUMP_IF_FALSE)
+        self.compile_expr(node.true_expr)
+        jump_end = self.emit(JUMP)
+        self.patch(jump_false, self.here())
+        self.compile_expr(node.false_expr)
+        self.patch(jump_end, self.here())
+    def expr_Call(self, node: Call):
+        if node.kwargs or node.body:
+            self.emit_fallback(node)
+            return
+        for a in node.args:
+            self.compile_expr(a)
+        local_slot = self.slot_map.get(node.name, -1) if self.code.uses_slots else -1
+        self.emit(CALL_NAME, self.const((node.name, len(node.args), local_slot)))
+    def expr_ListComprehension(self, node: ListComprehension):
+        self.require_names()
+        self.emit(BUILD_LIST, 0)
+        self.compile_expr(node.iterable)
+        self.emit(GET_ITER)
+        self.emit(ENTER_SCOPE)
+        top = self.here()
+        for_iter = self.emit(FOR_ITER)
+        self.emit_store(node.var_name)
+        if node.condition is not None:
+            self.compile_expr(node.condition)
+            self.emit(POP_JUMP_IF_FALSE, top)
+        self.compile_expr(node.expr)
+        self.emit(LIST_APPEND, 2)
+        self.emit(JUMP, top)
+        self.patch(for_iter, self.here())
+        self.emit(EXIT_SCOPE)
+        self.emit(POP_TOP)
+    def stmt_If(self, node: If):
+        self._compile_branch(node.condition, node.body, node.else_body, POP_JUMP_IF_FALSE)
+    def stmt_Unless(self, node: Unless):
+        self._compile_branch(node.condition, node.body, node.else_body, POP_JUMP_IF_TRUE)
+    def _compile_branch(self, condition: Node, body: List[Node], else_body: Optional[List[Node]], jump_op: int):
+        self.compile_expr(condition)
+        jump_else = self.emit(jump_op)
+        self.compile_block(body)
+        if else_body:
+            jump_end = self.emit(JUMP)
+            self.patch(jump_else, self.here())
+            self.compile_block(else_body)
+            self.patch(jump_end, self.here())
+        else:
+            self.patch(jump_else, self.here())
+    def stmt_When(self, node: When):
+        self.compile_expr(node.value)
+        end_jumps = []
+        for match_val, body in node.cases:
+            self.emit(DUP_TOP)
+            self.compile_expr(match_val)
+            self.emit(COMPARE_EQ)
+            jump_next = self.emit(POP_JUMP_IF_FALSE)
+            self.emit(POP_TOP)
+            self.compile_block(body)
+            end_jumps.append(self.emit(JUMP))
+            self.patch(jump_next, self.here())
+        self.emit(POP_TOP)
+        self.compile_block(node.otherwise)
+        for j in end_jumps:
+            self.patch(j, self.here())
+    def _loop(self, body: List[Node], before_body=None, condition: Optional[Node] = None, jump_op: int = POP_JUMP_IF_FALSE, counted: bool = False):
+        setup = self.emit(SETUP_LOOP)
+        cont = self.here()
+        exit_jump = None
+        if counted:
+            exit_jump = self.emit(FOR_ITER)
+            if before_body:
+                before_body()
+            else:
+                self.emit(POP_TOP)
+        elif condition is not None:
+            self.compile_expr(condition)
+            exit_jump = self.emit(jump_op)
+        self.compile_block(body)
+        self.emit(JUMP, cont)
+        if exit_jump is not None:
+            self.patch(exit_jump, self.here())
+        self.emit(POP_BLOCK)
+        brk = self.here()
+        self.patch(setup, self.const((brk, cont)))
+    def stmt_While(self, node: While):
+        self._loop(node.body, condition=node.condition, jump_op=POP_JUMP_IF_FALSE)
+    def stmt_Until(self, node: Until):
+        self._loop(node.body, condition=node.condition, jump_op=POP_JUMP_IF_TRUE)
+    def stmt_Forever(self, node: Forever):
+        self._loop(node.body)
+    def stmt_For(self, node: For):
+        self.compile_expr(node.count)
+        self.emit(COUNT_ITER, 0)
+        self._loop(node.body, counted=True)
+        self.emit(POP_TOP)
+    def stmt_Repeat(self, node: Repeat):
+        self.require_names()
+        self.compile_expr(node.count)
+        self.emit(COUNT_ITER, 1)
+        self.emit(ENTER_SCOPE)
+        self._loop(node.body, before_body=lambda: self.emit_store('index'), counted=True)
+        self.emit(EXIT_SCOPE)
+        self.emit(POP_TOP)
+    def stmt_ForIn(self, node: ForIn):
+        self.require_names()
+        self.compile_expr(node.iterable)
+        self.emit(GET_ITER)
+        self.emit(ENTER_SCOPE)
+        top = self.here()
+        for_iter = self.emit(FOR_ITER)
+        self.emit_store(node.var_name)
+        self.compile_block(node.body)
+        self.emit(JUMP, top)
+        self.patch(for_iter, self.here())
+        self.emit(EXIT_SCOPE)
+        self.emit(POP_TOP)
+    def stmt_Stop(self, node: Stop):
+        self.emit(BREAK_LOOP)
+    def stmt_Skip(self, node: Skip):
+        self.emit(CONTINUE_LOOP)
+    def stmt_Return(self, node: Return):
+        if not self.code.is_function:
+            self.emit_fallback(node)
+            self.emit(POP_TOP)
+            return
+        self.compile_expr(node.value)
+        self.emit(RETURN_VALUE)
+    def stmt_Throw(self, node: Throw):
+        self.compile_expr(node.message)
+        self.emit(THROW)
+    def stmt_FunctionDef(self, node: FunctionDef):
+        self.emit(MAKE_FUNCTION, self.const((node, self.compile_function(node))))
+def _assigned_names(statements: Optional[List[Node]]) -> List[str]:
+    names = []
+    for stmt in statements or []:
+        if isinstance(stmt, Assign):
+            names.append(stmt.name)
+        elif isinstance(stmt, (If, Unless)):
+            names.extend(_assigned_names(stmt.body))
+            names.extend(_assigned_names(stmt.else_body))
+        elif isinstance(stmt, (While, Until, Forever, For)):
+            names.extend(_assigned_names(stmt.body))
+        elif isinstance(stmt, When):
+            for _, body in stmt.cases:
+                names.extend(_assigned_names(body))
+            names.extend(_assigned_names(stmt.otherwise))
+    return names
+class CompiledModule:
+    def __init__(self, statements: List[Node], code: CodeObject, source_hash: str, parser: str, opt_level: int = 0):
+        self.statements = statements
+        self.code = code
+        self.source_hash = source_hash
+        self.parser = parser
+        self.opt_level = opt_level
+def parse_source(source: str, parser: str = 'gbp', jobs: Optional[int] = None) -> List[Node]:
+    """Parse `source` with the named parser. `jobs` > 1 (default: the
+    SHL_PARSE_JOBS environment variable) binds a large file's top-level
+    statements in that many processes; only the GBP parser supports it."""
+    from .lexer import Lexer
+    tokens = Lexer(source).tokenize()
+    if parser == 'legacy':
+        from .parser import Parser
+        return Parser(tokens).parse()
+    from .parser_gbp import GeometricBindingParser
+    if jobs is None:
+        jobs = int(os.environ.get('SHL_PARSE_JOBS', '1') or 1)
+    if jobs > 1:
+        return GeometricBindingParser(tokens).parse_parallel(jobs)
+    return GeometricBindingParser(tokens).parse()
+def stream_source(source: str, parser: str = 'gbp') -> Iterator[Node]:
+    """Like parse_source, but tokens are lexed on demand and top-level
+    statements are yielded as soon as they are parsed."""
+    from .lexer import Lexer
+    tokens = Lexer(source).stream()
+    if parser == 'legacy':
+        from .parser import StreamingParser
+        return StreamingParser(tokens).iter_parse()
+    from .parser_gbp import GeometricBindingParser
+    return GeometricBindingParser(tokens).iter_parse()
+def source_hash(source: str) -> str:
+    return hashlib.sha256(source.encode('utf-8')).hexdigest()
+def cache_path(path: str, parser: str = 'gbp', opt_level: int = DEFAULT_OPT_LEVEL) -> str:
+    directory, filename = os.path.split(os.path.abspath(path))
+    stem = os.path.splitext(filename)[0]
+    return os.path.join(directory, CACHE_DIR, f"{stem}.{parser}.o{opt_level}.shlc")
+def compile_source(source: str, filename: str = '<string>', parser: str = 'gbp', opt_level: int = DEFAULT_OPT_LEVEL) -> CompiledModule:
+    from .optimizer import optimize
+    from .resolver import resolve
+    statements = resolve(optimize(parse_source(source, parser), opt_level))
+    code = BytecodeCompiler(filename).compile(statements)
+    return CompiledModule(statements, code, source_hash(source), parser, opt_level)
+def read_cache(path: str, digest: str, parser: str, opt_level: int = DEFAULT_OPT_LEVEL) -> Optional[CompiledModule]:
+    return read_cache_file(cache_path(path, parser, opt_level), digest, parser, opt_level)
+def read_cache_file(cache_file: str, digest: str, parser: str, opt_level: int = DEFAULT_OPT_LEVEL) -> Optional[CompiledModule]:
+    try:
+        with open(cache_file, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                return None
+            header = pickle.load(f)
+            if header != (BYTECODE_VERSION, __version__, digest, parser, opt_level):
+                return None
+            return pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError, TypeError, ValueError):
+        return None
+def write_cache(path: str, module: CompiledModule):
+    write_cache_file(cache_path(path, module.parser, module.opt_level), module)
+def write_cache_file(target: str, module: CompiledModule):
+    tmp = f"{target}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(tmp, 'wb') as f:
+            f.write(MAGIC)
+            pickle.dump((BYTECODE_VERSION, __version__, module.source_hash, module.parser, module.opt_level), f, pickle.HIGHEST_PROTOCOL)
+            pickle.dump(module, f, pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, target)
+    except (OSError, pickle.PicklingError, RecursionError):
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+def load_module(path: str, source: Optional[str] = None, parser: str = 'gbp', opt_level: int = DEFAULT_OPT_LEVEL) -> CompiledModule:
+    """Return the parsed and compiled module for `path`.
+    The result is read from `__shlcache__/` when the cached entry matches the
+    source hash, ShellLite version and optimizer level; otherwise the file is
+    lexed, parsed, optimized and compiled, and the cache entry is rewritten. Set SHL_NO_CACHE=1 to bypass.
+    """
+    if source is None:
+        with open(path, 'r', encoding='utf-8') as f:
+            source = f.read()
+    use_cache = not os.environ.get('SHL_NO_CACHE')
+    digest = source_hash(source)
+    if use_cache:
+        module = read_cache(path, digest, parser, opt_level)
+        if module is not None:
+            return module
+    module = compile_source(source, path, parser, opt_level)
+    if use_cache:
+        write_cache(path, module)
+    return module
+def disassemble(code: CodeObject, out=None, _seen=None):
+    import sys
+    out = out or sys.stdout
+    label = 'function' if code.is_function else 'module'
+    mode = ', slots' if code.uses_slots else ''
+    print(f"Disassembly of {label} {code.name} ({code.filename}{mode}):", file=out)
+    nested = []
+    targets = set()
+    ins = code.instructions
+    for i in range(len(code.lines)):
+        if ins[i * 2] in HAS_JUMP:
+            targets.add(ins[i * 2 + 1])
+        elif ins[i * 2] == SETUP_LOOP:
+            targets.update(code.consts[ins[i * 2 + 1]])
+    last_line = None
+    for i in range(len(code.lines)):
+        op, arg = ins[i * 2], ins[i * 2 + 1]
+        line = code.lines[i]
+        line_col = f"{line:>5}" if line != last_line else "     "
+        last_line = line
+        marker = '>>' if i in targets else '  '
+        detail = ''
+        if op in (LOAD_CONST, EVAL_NODE):
+            value = code.consts[arg]
+            detail = f"({type(value).__name__})" if isinstance(value, Node) else f"({value!r})"
+        elif op in (LOAD_NAME, STORE_NAME, STORE_CONST_NAME, LOAD_GLOBAL):
+            detail = f"({code.names[arg]})"
+        elif op in (LOAD_FAST, STORE_FAST):
+            detail = f"({code.varnames[arg]})"
+        elif op == CALL_NAME:
+            name, argc, _ = code.consts[arg]
+            detail = f"({name}, {argc} args)"
+        elif op == SETUP_LOOP:
+            brk, cont = code.consts[arg]
+            detail = f"(break to {brk}, continue at {cont})"
+        elif op == MAKE_FUNCTION:
+            func_def, func_code = code.consts[arg]
+            detail = f"({func_def.name})"
+            nested.append(func_code)
+        elif op in HAS_JUMP:
+            detail = f"(to {arg})"
+        print(f"{line_col} {marker} {i:>4} {OPNAMES[op]:<18} {arg:>4} {detail}".rstrip(), file=out)
+    for func_code in nested:
+        print(file=out)
+        disassemble(func_code, out)
@@ -0,0 +1,675 @@
+from typing import Any, Callable, Dict, List, Optional
+from .ast_nodes import *
+from .interpreter import (CALL_BUILTIN, CALL_FUNCTION, Completion, Environment, Instance, LambdaFunction, ReturnException,
+                          ShellLiteError, SkipException, StopException, Tag)
+import re
+class TailCall(Exception):
+    """Raised by a self-tail `return` with the callee's already-bound scope."""
+    def __init__(self, env: Environment):
+        self.env = env
+class CompiledLambda(LambdaFunction):
+    def __init__(self, params: List[str], body, interpreter, compiled_body: Callable[[], Any]):
+        super().__init__(params, body, interpreter)
+        self.compiled_body = compiled_body
+    def __call__(self, *args):
+        if len(args) != len(self.params):
+            raise TypeError(f"Lambda expects {len(self.params)} args, got {len(args)}")
+        interp = self.interpreter
+        old_env = interp.current_env
+        new_env = Environment(parent=self.closure_env)
+        for param, arg in zip(self.params, args):
+            new_env.set(param, arg)
+        interp.current_env = new_env
+        try:
+            return self.compiled_body()
+        finally:
+            interp.current_env = old_env
+class ClosureCompiler:
+    """
+    Alternative execution engine for the tree-walking Interpreter.
+    Each AST node is translated once into a pre-bound Python closure, so
+    execution never repeats the per-node `visit_<Type>` lookup. Nodes without
+    a specialised builder are bound directly to their Interpreter visitor.
+    """
+    def __init__(self, interpreter):
+        interpreter.use_engine('closure')
+        self.interpreter = interpreter
+        self.builders: Dict[type, Callable[[Node], Callable[[], Any]]] = {}
+        for attr in dir(self):
+            if attr.startswith('compile_'):
+                node_type = globals().get(attr[len('compile_'):])
+                if isinstance(node_type, type) and issubclass(node_type, Node):
+                    self.builders[node_type] = getattr(self, attr)
+        self.function_bodies: Dict[int, tuple] = {}
+        self.running: Optional[FunctionDef] = None
+    def compile(self, node: Node, outer_line: Optional[int] = None) -> Callable[[], Any]:
+        """Compile `node` to a zero-argument closure.
+        `outer_line` is the line already reported by the enclosing closure;
+        a node only gets its own error-line wrapper when its line differs,
+        which reproduces exactly the `e.line` Interpreter.visit would set.
+        """
+        builder = self.builders.get(type(node))
+        if builder is None:
+            fn = self._bind_visitor(node)
+        else:
+            fn = builder(node)
+        line = getattr(node, 'line', 0)
+        if line != outer_line:
+            fn = self._with_line(fn, line)
+        return fn
+    def compile_block(self, statements: Optional[List[Node]]) -> List[Callable[[], Any]]:
+        if not statements:
+            return []
+        return [self.compile(stmt) for stmt in statements]
+    def compile_program(self, statements: List[Node]) -> Callable[[], Any]:
+        block = self.compile_block(statements)
+        def run_program():
+            result = None
+            for stmt in block:
+                result = stmt()
+            return result
+        return run_program
+    def run(self, statements: List[Node]) -> Any:
+        return self.compile_program(statements)()
+    def _with_line(self, fn: Callable[[], Any], line: int) -> Callable[[], Any]:
+        def run_with_line():
+            try:
+                return fn()
+            except ReturnException:
+                raise
+            except Exception as e:
+                if not hasattr(e, 'line'):
+                    e.line = line
+                raise
+        return run_with_line
+    def _bind_visitor(self, node: Node) -> Callable[[], Any]:
+        interp = self.interpreter
+        visitor = getattr(interp, f'visit_{type(node).__name__}', None)
+        if visitor is None:
+            return lambda: interp.generic_visit(node)
+        def visit_node():
+            result = visitor(node)
+            if result.__class__ is Completion:
+                result.throw()
+            return result
+        return visit_node
+    def _function_body(self, func_def: FunctionDef) -> List[Callable[[], Any]]:
+        entry = self.function_bodies.get(id(func_def))
+        if entry is None or entry[0] is not func_def:
+            entry = (func_def, self.compile_block(func_def.body))
+            self.function_bodies[id(func_def)] = entry
+        return entry[1]
+    def _bind_arguments(self, func_def: FunctionDef, arg_fns: List[Callable[[], Any]]) -> Environment:
+        interp = self.interpreter
+        if len(arg_fns) > len(func_def.args):
+            raise TypeError(f"Function '{func_def.name}' expects max {len(func_def.args)} arguments, got {len(arg_fns)}")
+        new_env = Environment(parent=interp.global_env)
+        for i, (arg_name, default_node, type_hint) in enumerate(func_def.args):
+            if i < len(arg_fns):
+                val = arg_fns[i]()
+            elif default_node is not None:
+                val = interp.visit(default_node)
+            else:
+                raise TypeError(f"Missing required argument '{arg_name}' for function '{func_def.name}'")
+            if type_hint:
+                interp._check_type(arg_name, val, type_hint)
+            new_env.set(arg_name, val)
+        return new_env
+    def _call_function_def(self, func_def: FunctionDef, arg_fns: List[Callable[[], Any]]) -> Any:
+        interp = self.interpreter
+        new_env = self._bind_arguments(func_def, arg_fns)
+        body = self._function_body(func_def)
+        old_env = interp.current_env
+        old_running = self.running
+        self.running = func_def
+        try:
+            while True:
+                interp.current_env = new_env
+                ret_val = None
+                try:
+                    for stmt in body:
+                        ret_val = stmt()
+                    return ret_val
+                except TailCall as e:
+                    new_env = e.env
+        except ReturnException as e:
+            return e.value
+        finally:
+            interp.current_env = old_env
+            self.running = old_running
+    def compile_Number(self, node: Number):
+        value = node.value
+        return lambda: value
+    def compile_String(self, node: String):
+        value = node.value
+        return lambda: value
+    def compile_Boolean(self, node: Boolean):
+        value = node.value
+        return lambda: value
+    def compile_Regex(self, node: Regex):
+        pattern = node.pattern
+        return lambda: re.compile(pattern)
+    def compile_VarAccess(self, node: VarAccess):
+        interp = self.interpreter
+        name = node.name
+        fallback = interp.visit_VarAccess
+        def var_access():
+            env = interp.current_env
+            while env is not None:
+                variables = env.variables
+                if name in variables:
+                    return variables[name]
+                env = env.parent
+            return fallback(node)
+        return var_access
+    def compile_Assign(self, node: Assign):
+        interp = self.interpreter
+        name = node.name
+        value_fn = self.compile(node.value, node.line)
+        def assign():
+            value = value_fn()
+            interp.current_env.set(name, value)
+            return value
+        return assign
+    def compile_ConstAssign(self, node: ConstAssign):
+        interp = self.interpreter
+        name = node.name
+        value_fn = self.compile(node.value, node.line)
+        def const_assign():
+            value = value_fn()
+            interp.current_env.set_const(name, value)
+            return value
+        return const_assign
+    def compile_BinOp(self, node: BinOp):
+        left = self.compile(node.left, node.line)
+        right = self.compile(node.right, node.line)
+        op = node.op
+        if op == '+':
+            def add():
+                l = left()
+                r = right()
+                if isinstance(l, str) or isinstance(r, str):
+                    return str(l) + str(r)
+                return l + r
+            return add
+        if op == '-':
+            return lambda: left() - right()
+        if op == '*':
+            return lambda: left() * right()
+        if op == '/':
+            return lambda: left() / right()
+        if op == '%':
+            return lambda: left() % right()
+        if op == '==':
+            return lambda: left() == right()
+        if op == '!=':
+            return lambda: left() != right()
+        if op == '<':
+            return lambda: left() < right()
+        if op == '>':
+            return lambda: left() > right()
+        if op == '<=':
+            return lambda: left() <= right()
+        if op == '>=':
+            return lambda: left() >= right()
+        if op == 'and':
+            def and_op():
+                l = left()
+                r = right()
+                return l and r
+            return and_op
+        if op == 'or':
+            def or_op():
+                l = left()
+                r = right()
+                return l or r
+            return or_op
+        if op == 'matches':
+            def matches():
+                l = left()
+                pattern = right()
+                if hasattr(pattern, 'search'):
+                    return bool(pattern.search(str(l)))
+                return bool(re.search(str(pattern), str(l)))
+            return matches
+        def unknown():
+            left()
+            right()
+            raise Exception(f"Unknown operator: {op}")
+        return unknown
+    def compile_UnaryOp(self, node: UnaryOp):
+        right = self.compile(node.right, node.line)
+        op = node.op
+        if op == 'not':
+            return lambda: not right()
+        def unknown():
+            right()
+            raise Exception(f"Unknown unary operator: {op}")
+        return unknown
+    def compile_Print(self, node: Print):
+        if node.color or node.style:
+            return self._bind_visitor(node)
+        expr = self.compile(node.expression, node.line)
+        def print_stmt():
+            value = expr()
+            print(value, flush=True)
+            return value
+        return print_stmt
+    def compile_ListVal(self, node: ListVal):
+        parts = []
+        for e in node.elements:
+            if isinstance(e, Spread):
+                parts.append((True, self.compile(e.value, node.line)))
+            else:
+                parts.append((False, self.compile(e, node.line)))
+        if not any(is_spread for is_spread, _ in parts):
+            fns = [fn for _, fn in parts]
+            return lambda: [fn() for fn in fns]
+        def list_val():
+            result = []
+            for is_spread, fn in parts:
+                if is_spread:
+                    spread_val = fn()
+                    if not isinstance(spread_val, list):
+                        raise TypeError(f"Spread operator requires a list, got {type(spread_val).__name__}")
+                    result.extend(spread_val)
+                else:
+                    result.append(fn())
+            return result
+        return list_val
+    def compile_Dictionary(self, node: Dictionary):
+        pairs = [(self.compile(k, node.line), self.compile(v, node.line)) for k, v in node.pairs]
+        return lambda: {k(): v() for k, v in pairs}
+    def compile_Spread(self, node: Spread):
+        return self.compile(node.value, node.line)
+    def compile_IndexAccess(self, node: IndexAccess):
+        obj_fn = self.compile(node.obj, node.line)
+        index_fn = self.compile(node.index, node.line)
+        def index_access():
+            obj = obj_fn()
+            index = index_fn()
+            if isinstance(obj, list):
+                if not isinstance(index, int):
+                    raise TypeError(f"List indices must be integers, got {type(index).__name__}")
+                return obj[index]
+            elif isinstance(obj, dict):
+                return obj[index]
+            elif isinstance(obj, str):
+                if not isinstance(index, int):
+                    raise TypeError(f"String indices must be integers, got {type(index).__name__}")
+                return obj[index]
+            raise TypeError(f"'{type(obj).__name__}' object is not subscriptable")
+        return index_access
+    def compile_Ternary(self, node: Ternary):
+        cond = self.compile(node.condition, node.line)
+        true_fn = self.compile(node.true_expr, node.line)
+        false_fn = self.compile(node.false_expr, node.line)
+        return lambda: true_fn() if cond() else false_fn()
+    def compile_If(self, node: If):
+        cond = self.compile(node.condition, node.line)
+        body = self.compile_block(node.body)
+        else_body = self.compile_block(node.else_body)
+        def if_stmt():
+            if cond():
+                for stmt in body:
+                    stmt()
+            elif else_body:
+                for stmt in else_body:
+                    stmt()
+        return if_stmt
+    def compile_Unless(self, node: Unless):
+        cond = self.compile(node.condition, node.line)
+        body = self.compile_block(node.body)
+        else_body = self.compile_block(node.else_body)
+        def unless_stmt():
+            if not cond():
+                for stmt in body:
+                    stmt()
+            elif else_body:
+                for stmt in else_body:
+                    stmt()
+        return unless_stmt
+    def compile_When(self, node: When):
+        value_fn = self.compile(node.value, node.line)
+        cases = [(self.compile(match, node.line), self.compile_block(body)) for match, body in node.cases]
+        otherwise = self.compile_block(node.otherwise)
+        def when_stmt():
+            value = value_fn()
+            for match_fn, body in cases:
+                if match_fn() == value:
+                    for stmt in body:
+                        stmt()
+                    return
+            for stmt in otherwise:
+                stmt()
+        return when_stmt
+    def compile_While(self, node: While):
+        cond = self.compile(node.condition, node.line)
+        body = self.compile_block(node.body)
+        def while_loop():
+            while cond():
+                try:
+                    for stmt in body:
+                        stmt()
+                except StopException:
+                    break
+                except SkipException:
+                    continue
+        return while_loop
+    def compile_Until(self, node: Until):
+        cond = self.compile(node.condition, node.line)
+        body = self.compile_block(node.body)
+        def until_loop():
+            while not cond():
+                try:
+                    for stmt in body:
+                        stmt()
+                except StopException:
+                    break
+                except SkipException:
+                    continue
+        return until_loop
+    def compile_Forever(self, node: Forever):
+        body = self.compile_block(node.body)
+        def forever_loop():
+            while True:
+                try:
+                    for stmt in body:
+                        stmt()
+                except StopException:
+                    break
+                except SkipException:
+                    continue
+        return forever_loop
+    def compile_For(self, node: For):
+        count_fn = self.compile(node.count, node.line)
+        body = self.compile_block(node.body)
+        def for_loop():
+            count = count_fn()
+            if not isinstance(count, int):
+                raise TypeError(f"Loop count must be an integer, got {type(count)}")
+            for _ in range(count):
+                try:
+                    for stmt in body:
+                        stmt()
+                except StopException:
+                    break
+                except SkipException:
+                    continue
+        return for_loop
+    def compile_Repeat(self, node: Repeat):
+        interp = self.interpreter
+        count_fn = self.compile(node.count, node.line)
+        body = self.compile_block(node.body)
+        def repeat_loop():
+            count = count_fn()
+            if not isinstance(count, int):
+                raise TypeError(f"repeat count must be an integer, got {type(count).__name__}")
+            old_env = interp.current_env
+            loop_env = Environment(parent=old_env)
+            interp.current_env = loop_env
+            try:
+                for i in range(count):
+                    loop_env.set('index', i)
+                    try:
+                        for stmt in body:
+                            stmt()
+                    except StopException:
+                        break
+                    except SkipException:
+                        continue
+            finally:
+                interp.current_env = old_env
+        return repeat_loop
+    def compile_ForIn(self, node: ForIn):
+        interp = self.interpreter
+        iterable_fn = self.compile(node.iterable, node.line)
+        var_name = node.var_name
+        body = self.compile_block(node.body)
+        def for_in_loop():
+            iterable = iterable_fn()
+            if not hasattr(iterable, '__iter__'):
+                raise TypeError(f"Cannot iterate over {type(iterable).__name__}")
+            old_env = interp.current_env
+            loop_env = Environment(parent=old_env)
+            interp.current_env = loop_env
+            try:
+                for item in iterable:
+                    loop_env.set(var_name, item)
+                    for stmt in body:
+                        stmt()
+            finally:
+                interp.current_env = old_env
+        return for_in_loop
+    def compile_ListComprehension(self, node: ListComprehension):
+        interp = self.interpreter
+        iterable_fn = self.compile(node.iterable, node.line)
+        expr_fn = self.compile(node.expr, node.line)
+        cond_fn = self.compile(node.condition, node.line) if node.condition else None
+        var_name = node.var_name
+        def list_comprehension():
+            iterable = iterable_fn()
+            if not hasattr(iterable, '__iter__'):
+                raise TypeError(f"Cannot iterate over {type(iterable).__name__}")
+            result = []
+            old_env = interp.current_env
+            new_env = Environment(parent=old_env)
+            interp.current_env = new_env
+            try:
+                for item in iterable:
+                    new_env.set(var_name, item)
+                    if cond_fn is not None and not cond_fn():
+                        continue
+                    result.append(expr_fn())
+            finally:
+                interp.current_env = old_env
+            return result
+        return list_comprehension
+    def compile_Stop(self, node: Stop):
+        def stop():
+            raise StopException()
+        return stop
+    def compile_Skip(self, node: Skip):
+        def skip():
+            raise SkipException()
+        return skip
+    def compile_Return(self, node: Return):
+        value_fn = self.compile(node.value, node.line)
+        if not node.tail:
+            def return_stmt():
+                raise ReturnException(value_fn())
+            return return_stmt
+        interp = self.interpreter
+        name = node.value.name
+        arg_fns = [self.compile(a, node.value.line) for a in node.value.args]
+        cache_valid = interp.call_cache_valid
+        resolve_call = interp.resolve_call
+        site = [None]
+        def tail_return():
+            cache = site[0]
+            if not cache_valid(cache, name):
+                cache = site[0] = resolve_call(name)
+            if cache[0] == CALL_FUNCTION and cache[1] is self.running:
+                raise TailCall(self._bind_arguments(cache[1], arg_fns))
+            raise ReturnException(value_fn())
+        return tail_return
+    def compile_Throw(self, node: Throw):
+        message_fn = self.compile(node.message, node.line)
+        def throw():
+            raise ShellLiteError(str(message_fn()))
+        return throw
+    def compile_Try(self, node: Try):
+        interp = self.interpreter
+        try_body = self.compile_block(node.try_body)
+        catch_body = self.compile_block(node.catch_body)
+        catch_var = node.catch_var
+        def try_stmt():
+            try:
+                for stmt in try_body:
+                    stmt()
+            except (ReturnException, StopException, SkipException):
+                raise
+            except Exception as e:
+                error_msg = str(e)
+                if hasattr(e, 'message'):
+                    error_msg = e.message
+                interp.current_env.set(catch_var, error_msg)
+                for stmt in catch_body:
+                    stmt()
+        return try_stmt
+    def compile_TryAlways(self, node: TryAlways):
+        interp = self.interpreter
+        try_body = self.compile_block(node.try_body)
+        catch_body = self.compile_block(node.catch_body)
+        always_body = self.compile_block(node.always_body)
+        catch_var = node.catch_var
+        def try_always_stmt():
+            try:
+                try:
+                    for stmt in try_body:
+                        stmt()
+                except (ReturnException, StopException, SkipException):
+                    raise
+                except Exception as e:
+                    error_msg = str(e)
+                    if hasattr(e, 'message'):
+                        error_msg = e.message
+                    interp.current_env.set(catch_var, error_msg)
+                    for stmt in catch_body:
+                        stmt()
+            finally:
+                for stmt in always_body:
+                    stmt()
+        return try_always_stmt
+    def compile_FunctionDef(self, node: FunctionDef):
+        interp = self.interpreter
+        functions = interp.functions
+        name = node.name
+        def function_def():
+            functions[name] = node
+            interp.call_version += 1
+        return function_def
+    def compile_Lambda(self, node: Lambda):
+        interp = self.interpreter
+        body_fn = self.compile(node.body, node.line)
+        params = node.params
+        body = node.body
+        return lambda: CompiledLambda(params, body, interp, body_fn)
+    def compile_Call(self, node: Call):
+        interp = self.interpreter
+        name = node.name
+        arg_fns = [self.compile(a, node.line) for a in node.args]
+        kwarg_fns = [(k, self.compile(v, node.line)) for k, v in node.kwargs] if node.kwargs else None
+        tag_body = self.compile_block(node.body)
+        call_function_def = self._call_function_def
+        cache_valid = interp.call_cache_valid
+        resolve_call = interp.resolve_call
+        site = [None]
+        def call():
+            kwargs = {}
+            if kwarg_fns:
+                for k, fn in kwarg_fns:
+                    kwargs[k] = fn()
+            cache = site[0]
+            if not cache_valid(cache, name):
+                cache = site[0] = resolve_call(name)
+            kind = cache[0]
+            if kind == CALL_FUNCTION:
+                return call_function_def(cache[1], arg_fns)
+            if kind == CALL_BUILTIN:
+                args = [fn() for fn in arg_fns]
+                if kwargs:
+                    result = cache[1](*args, **kwargs)
+                else:
+                    result = cache[1](*args)
+                if isinstance(result, Tag) and tag_body:
+                    web = interp.web
+                    web.push(result)
+                    try:
+                        for stmt in tag_body:
+                            res = stmt()
+                            if res is not None and (isinstance(res, str) or isinstance(res, Tag)):
+                                web.add_text(res)
+                    finally:
+                        web.pop()
+                return result
+            try:
+                func = interp.current_env.get(name)
+                if callable(func):
+                    args = [fn() for fn in arg_fns]
+                    if kwargs:
+                        return func(*args, **kwargs)
+                    return func(*args)
+                curr_obj = func
+                if isinstance(curr_obj, (list, dict, str)) or isinstance(curr_obj, Instance):
+                    valid_chain = True
+                    for fn in arg_fns:
+                        val = fn()
+                        if isinstance(val, list) and len(val) == 1:
+                            idx = val[0]
+                            try:
+                                curr_obj = curr_obj[idx]
+                            except (IndexError, KeyError) as e:
+                                raise RuntimeError(f"Index/Key error: {e}")
+                            except TypeError:
+                                valid_chain = False
+                                break
+                        else:
+                            valid_chain = False
+                            break
+                    if valid_chain:
+                        return curr_obj
+            except NameError:
+                pass
+            func_def = interp.functions.get(name)
+            if func_def is None:
+                raise NameError(f"Function '{name}' not defined (and not a variable).")
+            return call_function_def(func_def, arg_fns)
+        return call
+    def compile_MethodCall(self, node: MethodCall):
+        interp = self.interpreter
+        arg_fns = [self.compile(a, node.line) for a in node.args]
+        instance_name = node.instance_name
+        method_name = node.method_name
+        generic = self._bind_visitor(node)
+        method_bodies: Dict[int, tuple] = {}
+        def method_call():
+            instance = interp.current_env.get(instance_name)
+            if not isinstance(instance, Instance) or hasattr(instance, method_name):
+                return generic()
+            method_node = interp._find_method(instance.class_def, method_name)
+            if not method_node:
+                raise AttributeError(f"Structure '{instance.class_def.name}' has no method '{method_name}'")
+            entry = method_bodies.get(id(method_node))
+            if entry is None or entry[0] is not method_node:
+                entry = (method_node, self.compile_block(method_node.body))
+                method_bodies[id(method_node)] = entry
+            body = entry[1]
+            old_env = interp.current_env
+            new_env = Environment(parent=interp.global_env)
+            for k, v in instance.data.items():
+                new_env.set(k, v)
+            if len(arg_fns) > len(method_node.args):
+                raise TypeError(f"Method '{method_name}' expects max {len(method_node.args)} arguments.")
+            for i, (arg_name, default_node, type_hint) in enumerate(method_node.args):
+                if i < len(arg_fns):
+                    val = arg_fns[i]()
+                elif default_node is not None:
+                    val = interp.visit(default_node)
+                else:
+                    raise TypeError(f"Missing required argument '{arg_name}' for method '{method_name}'")
+                new_env.set(arg_name, val)
+            interp.current_env = new_env
+            ret_val = None
+            try:
+                for stmt in body:
+                    stmt()
+            except ReturnException as e:
+                ret_val = e.value
+            finally:
+                for k in instance.data.keys():
+                    if k in new_env.variables:
+                        instance.data[k] = new_env.variables[k]
+                interp.current_env = old_env
+            return ret_val
+        return method_call
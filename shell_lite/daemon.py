@@ -0,0 +1,294 @@
+import array
+import json
+import os
+import socket
+import struct
+import sys
+import time
+from typing import Any, Dict, List, Optional
+IN_CHILD = False
+HEADER = struct.Struct('!I')
+PEERCRED = struct.Struct('3i')
+MAX_FDS = 3
+def timeout() -> float:
+    """Seconds either side waits for the other before giving up; a stalled
+    client cannot hold the daemon, and a stalled daemon makes `shl run` fall
+    back to running locally."""
+    return float(os.environ.get('SHL_DAEMON_TIMEOUT') or 5)
+def default_socket_path() -> str:
+    return os.environ.get('SHL_DAEMON_SOCKET') or os.path.join(os.path.expanduser("~"), ".shell_lite", "daemon.sock")
+def supported() -> bool:
+    return hasattr(socket, 'AF_UNIX') and hasattr(os, 'fork')
+def peer_uid(sock: socket.socket) -> Optional[int]:
+    """uid of the process at the other end of a Unix socket, or None where
+    the platform cannot tell (the socket's 0600 mode still applies)."""
+    try:
+        if hasattr(socket, 'SO_PEERCRED'):
+            return PEERCRED.unpack(sock.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, PEERCRED.size))[1]
+        if hasattr(socket, 'LOCAL_PEERCRED'):
+            return struct.unpack('2I', sock.getsockopt(0, socket.LOCAL_PEERCRED, 76)[:8])[1]
+    except OSError:
+        pass
+    return None
+def send_message(sock: socket.socket, message: Dict[str, Any], fds: List[int] = ()):
+    payload = json.dumps(message).encode('utf-8')
+    data = HEADER.pack(len(payload)) + payload
+    ancillary = [(socket.SOL_SOCKET, socket.SCM_RIGHTS, array.array('i', fds).tobytes())] if fds else []
+    sent = sock.sendmsg([data], ancillary)
+    if sent < len(data):
+        sock.sendall(data[sent:])
+def recv_message(sock: socket.socket):
+    """Read one length-prefixed JSON message; returns (message, fds) or (None, [])
+    when the peer has closed the connection."""
+    fds = array.array('i')
+    data, ancdata, _, _ = sock.recvmsg(HEADER.size, socket.CMSG_SPACE(MAX_FDS * fds.itemsize))
+    for level, kind, cmsg in ancdata:
+        if level == socket.SOL_SOCKET and kind == socket.SCM_RIGHTS:
+            fds.frombytes(cmsg[:len(cmsg) - len(cmsg) % fds.itemsize])
+    if not data:
+        return None, []
+    data += recv_exact(sock, HEADER.size - len(data))
+    payload = recv_exact(sock, HEADER.unpack(data)[0])
+    return json.loads(payload.decode('utf-8')), list(fds)
+def recv_exact(sock: socket.socket, size: int) -> bytes:
+    chunks = []
+    while size > 0:
+        chunk = sock.recv(size)
+        if not chunk:
+            raise ConnectionError("shl daemon connection closed mid-message")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b''.join(chunks)
+def connect(path: Optional[str] = None) -> Optional[socket.socket]:
+    if not supported():
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout())
+    try:
+        sock.connect(path or default_socket_path())
+    except OSError:
+        sock.close()
+        return None
+    return sock
+def forward(argv: List[str], path: Optional[str] = None) -> Optional[int]:
+    """
+    Hand a `shl` invocation to a running daemon: argv, environment, working
+    directory and the stdin/stdout/stderr descriptors are sent over the
+    socket, and Ctrl-C is relayed to the forked child. Returns the child's
+    exit code, or None if no daemon is listening or it does not start the
+    run within timeout() seconds (the caller runs locally).
+    """
+    if IN_CHILD or os.environ.get('SHL_NO_DAEMON'):
+        return None
+    sock = connect(path)
+    if sock is None:
+        return None
+    with sock:
+        try:
+            for stream in (sys.stdout, sys.stderr):
+                stream.flush()
+            send_message(sock, {'command': 'run', 'argv': argv, 'env': dict(os.environ), 'cwd': os.getcwd()}, [0, 1, 2])
+            started, _ = recv_message(sock)
+        except OSError:
+            return None
+        if not started or 'pid' not in started:
+            return None
+        sock.settimeout(None)
+        while True:
+            try:
+                message, _ = recv_message(sock)
+                break
+            except KeyboardInterrupt:
+                import signal
+                try:
+                    os.kill(started['pid'], signal.SIGINT)
+                except OSError:
+                    pass
+        if message is None:
+            return 1
+        return message.get('exit', 1)
+def request(command: str, path: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    sock = connect(path)
+    if sock is None:
+        return None
+    with sock:
+        try:
+            send_message(sock, {'command': command})
+            message, _ = recv_message(sock)
+        except (OSError, ValueError):
+            return None
+        return message
+WARM_MODULES = ('bytecode', 'closure_compiler', 'lexer', 'main', 'optimizer', 'parser', 'parser_gbp', 'resolver', 'vm')
+COLD_START = 'import shell_lite.main; from shell_lite.interpreter import Interpreter; Interpreter()'
+CLIENT_START = 'import shell_lite.main, shell_lite.daemon'
+def measure_startup(code: str, repeat: int = 3) -> float:
+    """Best wall-clock milliseconds for a fresh Python process to run `code`."""
+    import subprocess
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [root, os.environ.get('PYTHONPATH')])))
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', code], env=env, check=False)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+class Daemon:
+    """
+    Long-lived `shl` process. The runtime is imported and warmed once; every
+    run request is served by a fork() of this process, so the child starts
+    with the interpreter modules, builtin tables and parse cache already in
+    memory (shared copy-on-write with the parent). The socket is created
+    with mode 0600, and connections from other users are refused.
+    """
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or default_socket_path()
+        self.started = time.time()
+        self.requests = 0
+        self.fork_ms = 0.0
+        self.cold_start_ms = 0.0
+        self.client_start_ms = 0.0
+        self.warmup_ms = 0.0
+        self.running = False
+    def warm_up(self):
+        import importlib
+        start = time.perf_counter()
+        for name in WARM_MODULES:
+            importlib.import_module(f'.{name}', __package__)
+        from .interpreter import Interpreter
+        Interpreter()
+        self.warmup_ms = (time.perf_counter() - start) * 1000
+        self.cold_start_ms = measure_startup(COLD_START)
+        self.client_start_ms = measure_startup(CLIENT_START)
+    def stats(self) -> Dict[str, Any]:
+        """Startup cost of a standalone `shl run` (cold_start_ms) against a
+        forwarded one (client_start_ms + avg_fork_ms), both measured on this
+        machine when the daemon started."""
+        fork_ms = self.fork_ms / self.requests if self.requests else 0.0
+        saved_ms = max(self.cold_start_ms - self.client_start_ms - fork_ms, 0.0)
+        return {'pid': os.getpid(), 'socket': self.path, 'uptime_s': round(time.time() - self.started, 1),
+                'requests': self.requests, 'cold_start_ms': round(self.cold_start_ms, 2),
+                'client_start_ms': round(self.client_start_ms, 2), 'warmup_ms': round(self.warmup_ms, 2),
+                'avg_fork_ms': round(fork_ms, 2),
+                'saved_per_run_ms': round(saved_ms, 2), 'saved_total_ms': round(saved_ms * self.requests, 2)}
+    def serve(self):
+        import signal
+        self.warm_up()
+        os.makedirs(os.path.dirname(self.path) or '.', mode=0o700, exist_ok=True)
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        umask = os.umask(0o177)
+        try:
+            listener.bind(self.path)
+        finally:
+            os.umask(umask)
+        listener.listen(64)
+        signal.signal(signal.SIGCHLD, signal.SIG_IGN)
+        self.running = True
+        print(f"shl daemon listening on {self.path} (pid {os.getpid()})")
+        sys.stdout.flush()
+        try:
+            while self.running:
+                conn, _ = listener.accept()
+                with conn:
+                    self.handle(conn, listener)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            listener.close()
+            if os.path.exists(self.path):
+                os.remove(self.path)
+    def handle(self, conn: socket.socket, listener: socket.socket):
+        uid = peer_uid(conn)
+        if uid is not None and uid != os.getuid():
+            return
+        conn.settimeout(timeout())
+        try:
+            message, fds = recv_message(conn)
+        except (OSError, ValueError):
+            return
+        command = message.get('command') if message else None
+        if command == 'run' and len(fds) == 3:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            start = time.perf_counter()
+            pid = os.fork()
+            if pid == 0:
+                listener.close()
+                os._exit(run_child(conn, message, fds))
+            self.fork_ms += (time.perf_counter() - start) * 1000
+            self.requests += 1
+        elif command == 'stats':
+            send_message(conn, self.stats())
+        elif command == 'stop':
+            self.running = False
+            send_message(conn, {'stopped': os.getpid()})
+        for fd in fds:
+            os.close(fd)
+def run_child(conn: socket.socket, message: Dict[str, Any], fds: List[int]) -> int:
+    """Body of a forked child: adopt the client's stdio, cwd, env and argv,
+    then run `shl` as if it had been started directly."""
+    global IN_CHILD
+    import signal
+    IN_CHILD = True
+    os.setsid()
+    signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.default_int_handler)
+    code = 1
+    try:
+        for target, fd in enumerate(fds):
+            os.dup2(fd, target)
+            os.close(fd)
+        os.chdir(message['cwd'])
+        os.environ.clear()
+        os.environ.update(message['env'])
+        sys.argv = list(message['argv'])
+        conn.settimeout(None)
+        try:
+            send_message(conn, {'pid': os.getpid()})
+        except OSError:
+            return code
+        from .main import main
+        try:
+            main()
+            code = 0
+        except SystemExit as e:
+            code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+            if not isinstance(e.code, (int, type(None))):
+                print(e.code, file=sys.stderr)
+        except KeyboardInterrupt:
+            code = 130
+    except BaseException:
+        import traceback
+        traceback.print_exc()
+    finally:
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            send_message(conn, {'exit': code})
+        except (OSError, ValueError):
+            pass
+    return code
+def daemon_command(args: List[str]):
+    """`shl daemon [--socket PATH] [--stats | --stop]`"""
+    path = None
+    if '--socket' in args:
+        index = args.index('--socket')
+        if index + 1 >= len(args):
+            print("Error: --socket requires a path")
+            return
+        path = args[index + 1]
+    if not supported():
+        print("Error: shl daemon needs Unix sockets and fork(), which this platform does not provide.")
+        return
+    if '--stats' in args or '--stop' in args:
+        reply = request('stats' if '--stats' in args else 'stop', path)
+        if reply is None:
+            print(f"No shl daemon is listening on {path or default_socket_path()}")
+        elif '--stats' in args:
+            for key, value in reply.items():
+                print(f"{key:<18} {value}")
+        else:
+            print(f"Stopped shl daemon (pid {reply['stopped']})")
+        return
+    Daemon(path).serve()
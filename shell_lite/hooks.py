@@ -0,0 +1,126 @@
+from typing import Any, Callable, Dict, List
+from .interpreter import Interpreter
+from .profiler import restore_methods, saved_methods
+EVENTS = ('statement', 'call_enter', 'call_exit', 'builtin', 'http_request', 'db_query')
+CALL_EVENTS = ('statement', 'call_enter', 'call_exit')
+METHOD_EVENTS = {
+    'visit': ('statement',),
+    'execute_block': ('statement',),
+    'run_statements': ('statement',),
+    '_run_function': CALL_EVENTS,
+    '_run_method': CALL_EVENTS,
+    'begin_request': ('http_request',),
+    '_db_execute': ('db_query',),
+}
+HOOKED_METHODS = tuple(METHOD_EVENTS)
+def install(interpreter: Interpreter):
+    """
+    Rebuild the hooked methods of `interpreter` from its registered hooks.
+    Each event swaps in instance-level wrappers for only the methods it
+    needs (shadowing the class methods, or wrapping a profiler's override);
+    with no hooks left the overrides that were there before are put back,
+    so the dispatch path is exactly the unhooked one and nothing checks a
+    flag per node. A wrapper that another instrument has since wrapped in
+    turn is left in place: it reads the hooks at call time, so it stays
+    correct, and is removed once it is on top again.
+    """
+    installed = interpreter.__dict__.pop('hooked_methods', {})
+    kept = {}
+    for name, (wrapper, previous) in installed.items():
+        if interpreter.__dict__.get(name) is wrapper:
+            restore_methods(interpreter, previous)
+        else:
+            kept[name] = (wrapper, previous)
+    plain = interpreter.__dict__.pop('plain_builtins', None)
+    if plain is not None:
+        interpreter.builtins = plain
+        interpreter.call_version += 1
+    hooks = {event for event, callbacks in interpreter.hooks.items() if callbacks}
+    for name, events in METHOD_EVENTS.items():
+        if name not in kept and hooks.intersection(events):
+            previous = saved_methods(interpreter, (name,))
+            wrapper = WRAPPERS[name](interpreter, getattr(interpreter, name))
+            setattr(interpreter, name, wrapper)
+            kept[name] = (wrapper, previous)
+    if kept:
+        interpreter.hooked_methods = kept
+    if 'builtin' in hooks:
+        hook_builtins(interpreter, interpreter.hooks['builtin'])
+def note(interpreter: Interpreter, body: List[Any]):
+    """A statement is a node of a statement list: the lists are noted as the
+    block, function and method runners reach them, and `visit` fires the
+    hooks for their members. Noted lists are kept referenced so their node
+    ids cannot be reused by other nodes."""
+    lists, statements = interpreter.__dict__.setdefault('hooked_statements', ({}, set()))
+    if id(body) not in lists:
+        lists[id(body)] = body
+        statements.update(map(id, body))
+def hook_visit(interpreter: Interpreter, visit: Callable):
+    statements = interpreter.__dict__.setdefault('hooked_statements', ({}, set()))[1]
+    def hooked_visit(node):
+        callbacks = interpreter.hooks.get('statement')
+        if callbacks and id(node) in statements:
+            for callback in callbacks:
+                callback(node)
+        return visit(node)
+    return hooked_visit
+def hook_block(interpreter: Interpreter, run: Callable):
+    def hooked_block(body):
+        if interpreter.hooks.get('statement'):
+            note(interpreter, body)
+        return run(body)
+    return hooked_block
+def traced(interpreter: Interpreter, name: str, body: List[Any], run: Callable, *args):
+    hooks = interpreter.hooks
+    if hooks.get('statement'):
+        note(interpreter, body)
+    for callback in hooks.get('call_enter', ()):
+        callback(name)
+    exit = hooks.get('call_exit', ())
+    if not exit:
+        return run(*args)
+    value = None
+    try:
+        value = run(*args)
+        return value
+    finally:
+        for callback in exit:
+            callback(name, value)
+def hook_run_function(interpreter: Interpreter, run_function: Callable):
+    return lambda func_def, env: traced(interpreter, func_def.name, func_def.body, run_function, func_def, env)
+def hook_run_method(interpreter: Interpreter, run_method: Callable):
+    return lambda instance, method_node, env: traced(
+        interpreter, f"{instance.class_def.name}.{method_node.name}", method_node.body, run_method, instance, method_node, env)
+def hook_begin_request(interpreter: Interpreter, begin_request: Callable):
+    def hooked_begin_request(request):
+        for callback in interpreter.hooks.get('http_request', ()):
+            callback(request)
+        return begin_request(request)
+    return hooked_begin_request
+def hook_db_execute(interpreter: Interpreter, db_execute: Callable):
+    def hooked_db_execute(sql, params):
+        for callback in interpreter.hooks.get('db_query', ()):
+            callback(sql, params)
+        return db_execute(sql, params)
+    return hooked_db_execute
+WRAPPERS: Dict[str, Callable] = {
+    'visit': hook_visit,
+    'execute_block': hook_block,
+    'run_statements': hook_block,
+    '_run_function': hook_run_function,
+    '_run_method': hook_run_method,
+    'begin_request': hook_begin_request,
+    '_db_execute': hook_db_execute,
+}
+def hook_builtins(interpreter: Interpreter, callbacks: tuple):
+    """Swap the interpreter's builtin table for one of wrappers; bumping
+    call_version makes cached call sites resolve to the wrappers."""
+    def wrap(name, function):
+        def hooked(*args, **kwargs):
+            for callback in callbacks:
+                callback(name, args)
+            return function(*args, **kwargs)
+        return hooked
+    interpreter.plain_builtins = plain = interpreter.builtins
+    interpreter.builtins = {name: wrap(name, value) if callable(value) else value for name, value in plain.items()}
+    interpreter.call_version += 1
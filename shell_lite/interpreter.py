@@ -1,41 +1,38 @@
-from typing import Any, Dict, List, Callable
+from typing import Any, Dict, List, Callable, Optional
 from .ast_nodes import *
 from .lexer import Token, Lexer
 from .parser import Parser
+from .parse_cache import PARSE_CACHE
 import importlib
 import types
 import operator
 import re
 import os
 import sys
-import subprocess
 import json
 import math
 import time
 import random
-import urllib.request
-import urllib.parse
 import shutil
 import functools
+import itertools
 from datetime import datetime
 import threading
-import concurrent.futures
-import tkinter as tk
-from tkinter import messagebox, simpledialog
-from http.server import HTTPServer, BaseHTTPRequestHandler, ThreadingHTTPServer
-import csv
-import zipfile
 from datetime import timedelta
-import calendar
-import sqlite3
-try:
-    import keyboard
-    import mouse
-    import pyperclip
-    from plyer import notification
-except ImportError:
-    pass
+UNSET = object()
+def optional_import(name: str, message: str):
+    """Import an optional third-party module on first use (keyboard, mouse,
+    pyperclip, plyer), raising RuntimeError(message) if it is missing."""
+    try:
+        return importlib.import_module(name)
+    except ImportError:
+        raise RuntimeError(message)
+VERSIONS = itertools.count(1)
 class Environment:
+    layout = None
+    slots = None
+    extra = None
+    version = 0
     def __init__(self, parent=None):
         self.variables: Dict[str, Any] = {}
         self.constants: set = set()
@@ -51,12 +48,68 @@ class Environment:
             raise RuntimeError(f"Cannot reassign constant '{name}'")
         if self.parent and name in self.parent.constants:
             raise RuntimeError(f"Cannot reassign constant '{name}'")
+        if name not in self.variables:
+            self.version = next(VERSIONS)
         self.variables[name] = value
     def set_const(self, name: str, value: Any):
         if name in self.variables:
             raise RuntimeError(f"Constant '{name}' already declared")
+        self.version = next(VERSIONS)
         self.variables[name] = value
         self.constants.add(name)
+class Frame(Environment):
+    """
+    Array-backed scope for function bodies and `for each` / `repeat` blocks.
+    `layout` maps each statically bound name to its slot (see resolver.py);
+    names bound dynamically (e.g. by `execute`) land in `extra`.
+    """
+    def __init__(self, layout: Dict[str, int], parent=None):
+        self.layout = layout
+        self.slots = [UNSET] * len(layout)
+        self.extra: Dict[str, Any] = {}
+        self.constants: set = set()
+        self.parent = parent
+    @property
+    def variables(self) -> Dict[str, Any]:
+        found = {name: self.slots[slot] for name, slot in self.layout.items() if self.slots[slot] is not UNSET}
+        found.update(self.extra)
+        return found
+    def get(self, name: str) -> Any:
+        slot = self.layout.get(name)
+        if slot is not None and self.slots[slot] is not UNSET:
+            return self.slots[slot]
+        if name in self.extra:
+            return self.extra[name]
+        if self.parent:
+            return self.parent.get(name)
+        raise NameError(f"Variable '{name}' is not defined.")
+    def set(self, name: str, value: Any):
+        if name in self.constants:
+            raise RuntimeError(f"Cannot reassign constant '{name}'")
+        if self.parent and name in self.parent.constants:
+            raise RuntimeError(f"Cannot reassign constant '{name}'")
+        slot = self.layout.get(name)
+        if slot is None:
+            self.extra[name] = value
+        else:
+            self.slots[slot] = value
+    def set_slot(self, slot: int, name: str, value: Any):
+        if name in self.constants or (self.parent and name in self.parent.constants):
+            raise RuntimeError(f"Cannot reassign constant '{name}'")
+        self.slots[slot] = value
+    def set_const(self, name: str, value: Any):
+        slot = self.layout.get(name)
+        if name in self.extra or (slot is not None and self.slots[slot] is not UNSET):
+            raise RuntimeError(f"Constant '{name}' already declared")
+        if slot is None:
+            self.extra[name] = value
+        else:
+            self.slots[slot] = value
+        self.constants.add(name)
+def new_scope(layout: Optional[Dict[str, int]], parent: Environment) -> Environment:
+    if layout is None:
+        return Environment(parent=parent)
+    return Frame(layout, parent=parent)
 class ReturnException(Exception):
     def __init__(self, value):
         self.value = value
@@ -64,6 +117,32 @@ class StopException(Exception):
     pass
 class SkipException(Exception):
     pass
+BREAK = 0
+CONTINUE = 1
+RETURN = 2
+TAIL_CALL = 3
+CALL_BUILTIN = 0
+CALL_FUNCTION = 1
+CALL_DYNAMIC = 2
+class Completion:
+    """
+    Result of `stop`, `skip` or `return`. Block visitors hand it back up
+    instead of raising, until a loop or function call consumes it.
+    A TAIL_CALL completion carries the bound frame for a self-tail-call;
+    kinds >= RETURN always leave the enclosing function.
+    """
+    __slots__ = ('kind', 'value', 'line')
+    def __init__(self, kind: int, value: Any = None, line: int = 0):
+        self.kind = kind
+        self.value = value
+        self.line = line
+    def throw(self):
+        """Re-raise as the legacy exception where a completion cannot propagate."""
+        if self.kind == RETURN:
+            raise ReturnException(self.value)
+        error = StopException() if self.kind == BREAK else SkipException()
+        error.line = self.line
+        raise error
 class ShellLiteError(Exception):
     def __init__(self, message):
         self.message = message
@@ -127,57 +206,72 @@ class WebBuilder:
             self.stack[-1].add(text)
         else:
             pass
-class Interpreter:
-    def __init__(self):
-        self.global_env = Environment()
-        self.global_env.set('str', str)
-        self.global_env.set('int', int)
-        self.global_env.set('float', float)
-        self.global_env.set('list', list)
-        self.global_env.set('len', len)
-        self.global_env.set('input', input)
-        self.global_env.set('range', range)
-        self.global_env.set('wait', time.sleep)
-        self.global_env.set('append', self._builtin_smart_add)
-        self.global_env.set('push', self._builtin_smart_add)
-        self.global_env.set('remove', lambda l, x: l.remove(x))
-        self.global_env.set('empty', lambda l: len(l) == 0)
-        self.global_env.set('contains', lambda l, x: x in l)
-        self.current_env = self.global_env
-        self.functions: Dict[str, FunctionDef] = {}
-        self.classes: Dict[str, ClassDef] = {}
-        self.http_routes = []
-        self.middleware_routes = []
-        self.static_routes = {}
-        self.web = WebBuilder(self)
-        self.db_conn = None
-        self.builtins = {
+def make_tag_fn(tag_name):
+    def tag_fn(*args, **kwargs):
+        attrs = {}
+        attrs.update(kwargs)
+        content = []
+        for arg in args:
+            if isinstance(arg, dict):
+                attrs.update(arg)
+            elif isinstance(arg, str):
+                if '=' in arg and not ' ' in arg and arg.split('=')[0].isalnum():
+                    k, v = arg.split('=', 1)
+                    attrs[k] = v
+                else:
+                    content.append(arg)
+            else:
+                content.append(str(arg))
+        t = Tag(tag_name, attrs)
+        for c in content:
+            t.add(c)
+        return t
+    return tag_fn
+class TimeWrapper:
+    def now(self):
+        return str(int(time.time()))
+def _http_get(url):
+    import urllib.request
+    with urllib.request.urlopen(url) as response:
+        return response.read().decode('utf-8')
+def _http_post(url, data):
+    if isinstance(data, str):
+        json_data = data.encode('utf-8')
+    else:
+        json_data = json.dumps(data).encode('utf-8')
+    import urllib.request
+    req = urllib.request.Request(url, data=json_data, headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(req) as response:
+        return response.read().decode('utf-8')
+TAGS = [
+    'div', 'p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
+    'span', 'a', 'img', 'button', 'input', 'form',
+    'ul', 'li', 'ol', 'table', 'tr', 'td', 'th',
+    'html', 'head', 'body', 'title', 'meta', 'link',
+    'script', 'style', 'br', 'hr',
+    'header', 'footer', 'section', 'article', 'nav', 'aside', 'main',
+    'strong', 'em', 'code', 'pre', 'blockquote', 'iframe', 'canvas', 'svg',
+    'css', 'textarea', 'label'
+]
+def build_builtins() -> Dict[str, Any]:
+    """Builtins that do not depend on an Interpreter; built once per process."""
+    builtins = {
             'str': str, 'int': int, 'float': float, 'bool': bool,
             'list': list, 'len': len,
             'range': lambda *args: list(range(*args)),
             'typeof': lambda x: type(x).__name__,
-            'run': self.builtin_run,
-            'read': self.builtin_read,
-            'write': self.builtin_write,
-            'json_parse': self.builtin_json_parse,
-            'json_stringify': self.builtin_json_stringify,
             'print': print,
             'abs': abs, 'min': min, 'max': max,
             'round': round, 'pow': pow, 'sum': sum,
             'split': lambda s, d=" ": s.split(d),
             'join': lambda lst, d="": d.join(str(x) for x in lst),
             'replace': lambda s, old, new: s.replace(old, new),
-            'upper': self._builtin_upper,
             'lower': lambda s: s.lower(),
             'trim': lambda s: s.strip(),
             'startswith': lambda s, p: s.startswith(p),
             'endswith': lambda s, p: s.endswith(p),
-            'sum_range': self._builtin_sum_range,
-            'range_list': self._builtin_range_list,
             'find': lambda s, sub: s.find(sub),
             'char': chr, 'ord': ord,
-            'append': self._builtin_smart_add,
-            'push': self._builtin_smart_add,
             'count': len,
             'remove': lambda l, x: l.remove(x),
             'pop': lambda l, idx=-1: l.pop(idx),
@@ -194,8 +288,6 @@ class Interpreter:
             'rename': os.rename,
             'mkdir': lambda p: os.makedirs(p, exist_ok=True),
             'listdir': os.listdir,
-            'http_get': self.builtin_http_get,
-            'http_post': self.builtin_http_post,
             'random': random.random,
             'randint': random.randint,
             'sleep': time.sleep,
@@ -210,56 +302,148 @@ class Interpreter:
             'items': lambda d: list(d.items()),
             'wait': time.sleep,
             'wait': time.sleep,
-            'push': self._builtin_push,
             'remove': lambda lst, item: lst.remove(item),
             'Set': set,
             'show': print,
             'say': print,
             'today': lambda: datetime.now().strftime("%Y-%m-%d"),
+    }
+    for t in TAGS:
+        builtins[t] = make_tag_fn(t)
+    builtins['env'] = lambda name: os.environ.get(str(name), None)
+    builtins['int'] = lambda x: int(float(x)) if x else 0
+    builtins['str'] = lambda x: str(x)
+    builtins['time'] = TimeWrapper()
+    return builtins
+BUILTINS = types.MappingProxyType(build_builtins())
+def _sampler(name: str):
+    def call(*args):
+        from . import profiler
+        return getattr(profiler, name)(*args)
+    return call
+STD_MODULES = {
+        'math': {
+            'sin': math.sin,
+            'cos': math.cos,
+            'tan': math.tan,
+            'sqrt': math.sqrt,
+            'floor': math.floor,
+            'ceil': math.ceil,
+            'abs': abs,
+            'pow': pow,
+            'log': math.log,
+            'log10': math.log10,
+            'exp': math.exp,
+            'random': random.random,
+            'randint': random.randint,
+            'pi': math.pi,
+            'e': math.e,
+        },
+        'time': {
+            'time': time.time,
+            'sleep': time.sleep,
+            'date': lambda: datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            'year': lambda: datetime.now().year,
+            'month': lambda: datetime.now().month,
+            'day': lambda: datetime.now().day,
+            'hour': lambda: datetime.now().hour,
+            'minute': lambda: datetime.now().minute,
+            'second': lambda: datetime.now().second,
+        },
+        'http': {
+            'get': _http_get,
+            'post': _http_post
+        },
+        'env': {
+            'get': lambda k, d=None: os.environ.get(k, d),
+            'set': lambda k, v: os.environ.__setitem__(k, str(v)),
+            'all': lambda: dict(os.environ),
+            'has': lambda k: k in os.environ,
+        },
+        'args': {
+            'get': lambda i: sys.argv[i+1] if i+1 < len(sys.argv) else None,
+            'all': lambda: sys.argv[1:],
+            'count': lambda: len(sys.argv) - 1,
+        },
+        'path': {
+            'join': os.path.join,
+            'basename': os.path.basename,
+            'dirname': os.path.dirname,
+            'exists': os.path.exists,
+            'isfile': os.path.isfile,
+            'isdir': os.path.isdir,
+            'abspath': os.path.abspath,
+            'split': os.path.split,
+            'ext': lambda p: os.path.splitext(p)[1],
+        },
+        'color': {
+            'red': lambda s: f"\033[91m{s}\033[0m",
+            'green': lambda s: f"\033[92m{s}\033[0m",
+            'yellow': lambda s: f"\033[93m{s}\033[0m",
+            'blue': lambda s: f"\033[94m{s}\033[0m",
+            'magenta': lambda s: f"\033[95m{s}\033[0m",
+            'cyan': lambda s: f"\033[96m{s}\033[0m",
+            'bold': lambda s: f"\033[1m{s}\033[0m",
+            'underline': lambda s: f"\033[4m{s}\033[0m",
+            'reset': "\033[0m",
+        },
+        'profiler': {
+            'start': _sampler('start_sampling'),
+            'stop': _sampler('stop_sampling'),
+        },
+        're': {
+            'match': lambda p, s: bool(re.match(p, s)),
+            'search': lambda p, s: re.search(p, s).group() if re.search(p, s) else None,
+            'replace': lambda p, r, s: re.sub(p, r, s),
+            'findall': lambda p, s: re.findall(p, s),
+            'split': lambda p, s: re.split(p, s),
+        },
+}
+BUILTIN_ENV = Environment()
+BUILTIN_ENV.variables.update(BUILTINS)
+class Interpreter:
+    """
+    Tree-walking evaluator. The builtin table and standard modules are built
+    once per process (BUILTINS, STD_MODULES); each interpreter's globals are
+    an overlay on the shared BUILTIN_ENV, so assigning a builtin's name only
+    shadows it for that interpreter, and `use "math"` hands out a private copy
+    of the module on first import.
+    """
+    def __init__(self):
+        self.global_env = Environment(parent=BUILTIN_ENV)
+        self.current_env = self.global_env
+        self.functions: Dict[str, FunctionDef] = {}
+        self.modules: Dict[str, Dict[str, Any]] = {}
+        self.call_version = 0
+        self.tail_target: Optional[FunctionDef] = None
+        self.classes: Dict[str, ClassDef] = {}
+        self.http_routes = []
+        self.middleware_routes = []
+        self.static_routes = {}
+        self.web = WebBuilder(self)
+        self.db_conn = None
+        self.std_modules: Dict[str, Dict[str, Any]] = {}
+        self.hooks: Dict[str, tuple] = {}
+        self.engine = 'tree'
+        bound = {
+            'run': self.builtin_run,
+            'read': self.builtin_read,
+            'write': self.builtin_write,
+            'json_parse': self.builtin_json_parse,
+            'reload_module': self.reload_module,
+            'json_stringify': self.builtin_json_stringify,
+            'upper': self._builtin_upper,
+            'sum_range': self._builtin_sum_range,
+            'range_list': self._builtin_range_list,
+            'append': self._builtin_smart_add,
+            'push': self._builtin_push,
+            'http_get': self.builtin_http_get,
+            'http_post': self.builtin_http_post,
         }
-        tags = [
-            'div', 'p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
-            'span', 'a', 'img', 'button', 'input', 'form',
-            'ul', 'li', 'ol', 'table', 'tr', 'td', 'th',
-            'html', 'head', 'body', 'title', 'meta', 'link',
-            'script', 'style', 'br', 'hr',
-            'header', 'footer', 'section', 'article', 'nav', 'aside', 'main',
-            'strong', 'em', 'code', 'pre', 'blockquote', 'iframe', 'canvas', 'svg',
-            'css', 'textarea', 'label'
-        ]
-        for t in tags:
-            self.builtins[t] = self._make_tag_fn(t)
-        self.builtins['env'] = lambda name: os.environ.get(str(name), None)
-        self.builtins['int'] = lambda x: int(float(x)) if x else 0
-        self.builtins['str'] = lambda x: str(x)
-        class TimeWrapper:
-            def now(self):
-                return str(int(time.time()))
-        self.builtins['time'] = TimeWrapper()
-        self._init_std_modules()
-        for k, v in self.builtins.items():
-            self.global_env.set(k, v)
-    def _make_tag_fn(self, tag_name):
-        def tag_fn(*args, **kwargs):
-            attrs = {}
-            attrs.update(kwargs)
-            content = []
-            for arg in args:
-                if isinstance(arg, dict):
-                    attrs.update(arg)
-                elif isinstance(arg, str):
-                    if '=' in arg and not ' ' in arg and arg.split('=')[0].isalnum():
-                        k, v = arg.split('=', 1)
-                        attrs[k] = v
-                    else:
-                        content.append(arg)
-                else:
-                    content.append(str(arg))
-            t = Tag(tag_name, attrs)
-            for c in content:
-                t.add(c)
-            return t
-        return tag_fn
+        self.builtins = dict(BUILTINS)
+        self.builtins.update(bound)
+        self.global_env.variables.update(bound)
+        self.global_env.version = next(VERSIONS)
     def _builtin_map(self, lst, func):
         if callable(func):
             return [func(x) for x in lst]
@@ -291,92 +475,63 @@ class Interpreter:
             return target + val
         else:
             raise TypeError(f"Cannot add to {type(target).__name__}")
-    def _init_std_modules(self):
-        self.std_modules = {
-            'math': {
-                'sin': math.sin,
-                'cos': math.cos,
-                'tan': math.tan,
-                'sqrt': math.sqrt,
-                'floor': math.floor,
-                'ceil': math.ceil,
-                'abs': abs,
-                'pow': pow,
-                'log': math.log,
-                'log10': math.log10,
-                'exp': math.exp,
-                'random': random.random,
-                'randint': random.randint,
-                'pi': math.pi,
-                'e': math.e,
-            },
-            'time': {
-                'time': time.time,
-                'sleep': time.sleep,
-                'date': lambda: datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                'year': lambda: datetime.now().year,
-                'month': lambda: datetime.now().month,
-                'day': lambda: datetime.now().day,
-                'hour': lambda: datetime.now().hour,
-                'minute': lambda: datetime.now().minute,
-                'second': lambda: datetime.now().second,
-            },
-            'http': {
-                'get': self._http_get,
-                'post': self._http_post
-            },
-            'env': {
-                'get': lambda k, d=None: os.environ.get(k, d),
-                'set': lambda k, v: os.environ.__setitem__(k, str(v)),
-                'all': lambda: dict(os.environ),
-                'has': lambda k: k in os.environ,
-            },
-            'args': {
-                'get': lambda i: sys.argv[i+1] if i+1 < len(sys.argv) else None,
-                'all': lambda: sys.argv[1:],
-                'count': lambda: len(sys.argv) - 1,
-            },
-            'path': {
-                'join': os.path.join,
-                'basename': os.path.basename,
-                'dirname': os.path.dirname,
-                'exists': os.path.exists,
-                'isfile': os.path.isfile,
-                'isdir': os.path.isdir,
-                'abspath': os.path.abspath,
-                'split': os.path.split,
-                'ext': lambda p: os.path.splitext(p)[1],
-            },
-            'color': {
-                'red': lambda s: f"\033[91m{s}\033[0m",
-                'green': lambda s: f"\033[92m{s}\033[0m",
-                'yellow': lambda s: f"\033[93m{s}\033[0m",
-                'blue': lambda s: f"\033[94m{s}\033[0m",
-                'magenta': lambda s: f"\033[95m{s}\033[0m",
-                'cyan': lambda s: f"\033[96m{s}\033[0m",
-                'bold': lambda s: f"\033[1m{s}\033[0m",
-                'underline': lambda s: f"\033[4m{s}\033[0m",
-                'reset': "\033[0m",
-            },
-            're': {
-                'match': lambda p, s: bool(re.match(p, s)),
-                'search': lambda p, s: re.search(p, s).group() if re.search(p, s) else None,
-                'replace': lambda p, r, s: re.sub(p, r, s),
-                'findall': lambda p, s: re.findall(p, s),
-                'split': lambda p, s: re.split(p, s),
-            },
-        }
-    def _http_get(self, url):
-        with urllib.request.urlopen(url) as response:
-            return response.read().decode('utf-8')
-    def _http_post(self, url, data):
-        if isinstance(data, str):
-            json_data = data.encode('utf-8')
-        else:
-            json_data = json.dumps(data).encode('utf-8')
-        req = urllib.request.Request(url, data=json_data, headers={'Content-Type': 'application/json'})
-        with urllib.request.urlopen(req) as response:
-            return response.read().decode('utf-8')
+    def std_module(self, name: str) -> Optional[Dict[str, Any]]:
+        """This interpreter's copy of a standard module, or None if `name` is not one."""
+        module = self.std_modules.get(name)
+        if module is None and name in STD_MODULES:
+            module = self.std_modules[name] = dict(STD_MODULES[name])
+        return module
+    def add_hook(self, event: str, callback: Callable) -> Callable:
+        """
+        Call `callback` on `event` (see hooks.EVENTS); returns it, so the
+        on_* methods below work as decorators. Exceptions raised by a hook
+        propagate into the script, which is how a host enforces quotas.
+        Hooked methods are installed on this instance only while some hook
+        is registered; an interpreter without hooks runs the plain methods.
+        """
+        from .hooks import EVENTS, install
+        if event not in EVENTS:
+            raise ValueError(f"Unknown hook '{event}'. Choose one of: " + ", ".join(EVENTS))
+        if self.engine != 'tree':
+            raise ValueError(f"hooks are only supported by the 'tree' engine, not '{self.engine}'")
+        self.hooks[event] = self.hooks.get(event, ()) + (callback,)
+        install(self)
+        return callback
+    def remove_hook(self, event: str, callback: Callable):
+        from .hooks import install
+        callbacks = list(self.hooks.get(event, ()))
+        if callback in callbacks:
+            callbacks.remove(callback)
+            self.hooks[event] = tuple(callbacks)
+            install(self)
+    def clear_hooks(self):
+        from .hooks import install
+        self.hooks = {}
+        install(self)
+    def use_engine(self, engine: str):
+        """Called by the closure and VM engines when they take over this
+        interpreter; hooks only see the tree-walker's methods."""
+        if engine != 'tree' and any(self.hooks.values()):
+            raise ValueError(f"hooks are only supported by the 'tree' engine, not '{engine}'")
+        self.engine = engine
+    def on_statement(self, callback: Callable) -> Callable:
+        """callback(node) before each statement runs."""
+        return self.add_hook('statement', callback)
+    def on_call_enter(self, callback: Callable) -> Callable:
+        """callback(name) when a user function or `Structure.method` starts."""
+        return self.add_hook('call_enter', callback)
+    def on_call_exit(self, callback: Callable) -> Callable:
+        """callback(name, value) when it returns (value is None if it raised)."""
+        return self.add_hook('call_exit', callback)
+    def on_builtin(self, callback: Callable) -> Callable:
+        """callback(name, args) before a builtin function is called."""
+        return self.add_hook('builtin', callback)
+    def on_http_request(self, callback: Callable) -> Callable:
+        """callback(request) for each request a `listen on port` server handles."""
+        return self.add_hook('http_request', callback)
+    def on_db_query(self, callback: Callable) -> Callable:
+        """callback(sql, params) before `db exec` / `db query` runs a statement."""
+        return self.add_hook('db_query', callback)
     def visit(self, node: Node) -> Any:
         try:
             method_name = f'visit_{type(node).__name__}'
@@ -390,6 +545,19 @@ class Interpreter:
             raise e
     def generic_visit(self, node: Node):
         raise Exception(f'No visit_{type(node).__name__} method')
+    def execute_block(self, statements: List[Node]) -> Optional[Completion]:
+        for stmt in statements:
+            result = self.visit(stmt)
+            if result.__class__ is Completion:
+                return result
+        return None
+    def run_statements(self, statements: List[Node]) -> Any:
+        result = None
+        for stmt in statements:
+            result = self.visit(stmt)
+            if result.__class__ is Completion:
+                result.throw()
+        return result
     def visit_Number(self, node: Number):
         return node.value
     def visit_String(self, node: String):
@@ -421,6 +589,19 @@ class Interpreter:
         else:
              raise TypeError(f"Cannot assign property '{node.property_name}' of non-object '{node.instance_name}'")
     def visit_VarAccess(self, node: VarAccess):
+        scope = node.scope
+        if scope is not None:
+            depth, slot, layout = scope
+            env = self.current_env
+            while depth and env is not None:
+                if env.extra and node.name in env.extra:
+                    return env.extra[node.name]
+                env = env.parent
+                depth -= 1
+            if env is not None and env.layout is layout:
+                value = env.slots[slot]
+                if value is not UNSET:
+                    return value
         try:
             return self.current_env.get(node.name)
         except NameError:
@@ -434,7 +615,12 @@ class Interpreter:
             raise
     def visit_Assign(self, node: Assign):
         value = self.visit(node.value)
-        self.current_env.set(node.name, value)
+        scope = node.scope
+        env = self.current_env
+        if scope is not None and env.layout is scope[1]:
+            env.set_slot(scope[0], node.name, value)
+        else:
+            env.set(node.name, value)
         return value
     def visit_BinOp(self, node: BinOp):
         left = self.visit(node.left)
@@ -496,25 +682,25 @@ class Interpreter:
     def visit_If(self, node: If):
         condition = self.visit(node.condition)
         if condition:
-            for stmt in node.body:
-                self.visit(stmt)
+            return self.execute_block(node.body)
         elif node.else_body:
-            for stmt in node.else_body:
-                self.visit(stmt)
+            return self.execute_block(node.else_body)
     def visit_For(self, node: For):
         count = self.visit(node.count)
         if not isinstance(count, int):
             raise TypeError(f"Loop count must be an integer, got {type(count)}")
         for _ in range(count):
             try:
-                for stmt in node.body:
-                    self.visit(stmt)
+                completion = self.execute_block(node.body)
             except StopException:
                 break
             except SkipException:
                 continue
-            except ReturnException:
-                raise
+            if completion is not None:
+                if completion.kind == BREAK:
+                    break
+                if completion.kind >= RETURN:
+                    return completion
     def visit_Input(self, node: Input):
         if node.prompt:
             return input(node.prompt)
@@ -522,40 +708,42 @@ class Interpreter:
     def visit_While(self, node: While):
         while self.visit(node.condition):
             try:
-                for stmt in node.body:
-                    self.visit(stmt)
+                completion = self.execute_block(node.body)
             except StopException:
                 break
             except SkipException:
                 continue
-            except ReturnException:
-                raise
+            if completion is not None:
+                if completion.kind == BREAK:
+                    break
+                if completion.kind >= RETURN:
+                    return completion
     def visit_Try(self, node: Try):
         try:
-            for stmt in node.try_body:
-                self.visit(stmt)
+            return self.execute_block(node.try_body)
+        except (ReturnException, StopException, SkipException):
+            raise
         except Exception as e:
             error_msg = str(e)
             if hasattr(e, 'message'):
                 error_msg = e.message
             self.current_env.set(node.catch_var, error_msg)
-            for stmt in node.catch_body:
-                self.visit(stmt)
+            return self.execute_block(node.catch_body)
     def visit_TryAlways(self, node: TryAlways):
         try:
             try:
-                for stmt in node.try_body:
-                    self.visit(stmt)
+                completion = self.execute_block(node.try_body)
+            except (ReturnException, StopException, SkipException):
+                raise
             except Exception as e:
                 error_msg = str(e)
                 if hasattr(e, 'message'):
                     error_msg = e.message
                 self.current_env.set(node.catch_var, error_msg)
-                for stmt in node.catch_body:
-                    self.visit(stmt)
+                completion = self.execute_block(node.catch_body)
         finally:
-            for stmt in node.always_body:
-                self.visit(stmt)
+            always = self.execute_block(node.always_body)
+        return always if always is not None else completion
     def visit_UnaryOp(self, node: UnaryOp):
         val = self.visit(node.right)
         if node.op == 'not':
@@ -563,14 +751,20 @@ class Interpreter:
         raise Exception(f"Unknown unary operator: {node.op}")
     def visit_FunctionDef(self, node: FunctionDef):
         self.functions[node.name] = node
+        self.call_version += 1
     def visit_Return(self, node: Return):
-        value = self.visit(node.value)
-        raise ReturnException(value)
-    def _call_function_def(self, func_def: FunctionDef, args: List[Node]):
+        if node.tail and self.tail_target is not None:
+            call = node.value
+            cache = call.cache
+            if not self.call_cache_valid(cache, call.name):
+                cache = call.cache = self.resolve_call(call.name)
+            if cache[0] == CALL_FUNCTION and cache[1] is self.tail_target:
+                return Completion(TAIL_CALL, self._bind_arguments(cache[1], call.args))
+        return Completion(RETURN, self.visit(node.value))
+    def _bind_arguments(self, func_def: FunctionDef, args: List[Node]) -> Environment:
         if len(args) > len(func_def.args):
              raise TypeError(f"Function '{func_def.name}' expects max {len(func_def.args)} arguments, got {len(args)}")
-        old_env = self.current_env
-        new_env = Environment(parent=self.global_env)
+        new_env = new_scope(func_def.layout, self.global_env)
         for i, (arg_name, default_node, type_hint) in enumerate(func_def.args):
             if i < len(args):
                 val = self.visit(args[i])
@@ -581,39 +775,95 @@ class Interpreter:
             if type_hint:
                 self._check_type(arg_name, val, type_hint)
             new_env.set(arg_name, val)
-        self.current_env = new_env
-        ret_val = None
+        return new_env
+    def _call_function_def(self, func_def: FunctionDef, args: List[Node]):
+        return self._run_function(func_def, self._bind_arguments(func_def, args))
+    def _run_function(self, func_def: FunctionDef, new_env: Environment):
+        old_env = self.current_env
+        old_target = self.tail_target
+        self.tail_target = func_def
         try:
-            for stmt in func_def.body:
-                val = self.visit(stmt)
-                ret_val = val
+            while True:
+                self.current_env = new_env
+                ret_val = None
+                for stmt in func_def.body:
+                    ret_val = self.visit(stmt)
+                    if ret_val.__class__ is Completion:
+                        break
+                else:
+                    return ret_val
+                if ret_val.kind == TAIL_CALL:
+                    new_env = ret_val.value
+                    continue
+                if ret_val.kind != RETURN:
+                    ret_val.throw()
+                return ret_val.value
         except ReturnException as e:
-            ret_val = e.value
+            return e.value
         finally:
             self.current_env = old_env
-        return ret_val
+            self.tail_target = old_target
+    def _shadowed(self, name: str) -> bool:
+        """True if a scope between the current one and the globals binds `name`."""
+        env = self.current_env
+        global_env = self.global_env
+        while env is not global_env and env is not None:
+            layout = env.layout
+            if layout is None:
+                if name in env.variables:
+                    return True
+            elif name in env.extra or (name in layout and env.slots[layout[name]] is not UNSET):
+                return True
+            env = env.parent
+        return False
+    def resolve_call(self, name: str) -> tuple:
+        """
+        Classify what a call to `name` reaches: a builtin, a user function that
+        no variable shadows, or anything else (looked up in full every time).
+        The result carries the versions it was computed under; it stays valid
+        until a function is defined or removed, or a new global is bound.
+        """
+        builtin = self.builtins.get(name)
+        if builtin is not None:
+            kind, target = CALL_BUILTIN, builtin
+        elif name in self.functions and name not in self.global_env.variables and not self._shadowed(name):
+            kind, target = CALL_FUNCTION, self.functions[name]
+        else:
+            kind, target = CALL_DYNAMIC, None
+        return (kind, target, self.call_version, self.global_env.version)
+    def call_cache_valid(self, cache: Optional[tuple], name: str) -> bool:
+        if cache is None or cache[2] != self.call_version or cache[3] != self.global_env.version:
+            return False
+        return cache[0] != CALL_FUNCTION or self.current_env is self.global_env or not self._shadowed(name)
     def visit_Call(self, node: Call):
         kwargs = {}
         if node.kwargs:
             for k, v in node.kwargs:
                 kwargs[k] = self.visit(v)
-        if node.name in self.builtins:
+        cache = node.cache
+        if not self.call_cache_valid(cache, node.name):
+            cache = node.cache = self.resolve_call(node.name)
+        kind = cache[0]
+        if kind == CALL_FUNCTION:
+            return self._call_function_def(cache[1], node.args)
+        if kind == CALL_BUILTIN:
              args = [self.visit(a) for a in node.args]
              if kwargs:
-                 result = self.builtins[node.name](*args, **kwargs)
+                 result = cache[1](*args, **kwargs)
              else:
-                 result = self.builtins[node.name](*args)
-             if isinstance(result, Tag):
-                 if node.body:
-                     self.web.push(result)
-                     try:
-                         for stmt in node.body:
-                             res = self.visit(stmt)
-                             if res is not None and (isinstance(res, str) or isinstance(res, Tag)):
-                                 self.web.add_text(res)
-                     finally:
-                         self.web.pop()
-                 return result
+                 result = cache[1](*args)
+             if isinstance(result, Tag) and node.body:
+                 self.web.push(result)
+                 try:
+                     for stmt in node.body:
+                         res = self.visit(stmt)
+                         if res.__class__ is Completion:
+                             res.throw()
+                         if res is not None and (isinstance(res, str) or isinstance(res, Tag)):
+                             self.web.add_text(res)
+                 finally:
+                     self.web.pop()
+             return result
         try:
             func = self.current_env.get(node.name)
             if callable(func):
@@ -639,9 +889,6 @@ class Interpreter:
                         break
                 if valid_chain:
                     return curr_obj
-                pass
-        except NameError:
-            pass
         except NameError:
             pass
         if node.name not in self.functions:
@@ -716,7 +963,6 @@ class Interpreter:
         method_node = self._find_method(instance.class_def, node.method_name)
         if not method_node:
             raise AttributeError(f"Structure '{instance.class_def.name}' has no method '{node.method_name}'")
-        old_env = self.current_env
         new_env = Environment(parent=self.global_env)
         for k, v in instance.data.items():
             new_env.set(k, v)
@@ -730,11 +976,19 @@ class Interpreter:
              else:
                  raise TypeError(f"Missing required argument '{arg_name}' for method '{node.method_name}'")
              new_env.set(arg_name, val)
+        return self._run_method(instance, method_node, new_env)
+    def _run_method(self, instance: Instance, method_node: FunctionDef, new_env: Environment):
+        old_env = self.current_env
         self.current_env = new_env
         ret_val = None
         try:
             for stmt in method_node.body:
-                self.visit(stmt)
+                result = self.visit(stmt)
+                if result.__class__ is Completion:
+                    if result.kind != RETURN:
+                        result.throw()
+                    ret_val = result.value
+                    break
         except ReturnException as e:
             ret_val = e.value
         finally:
@@ -763,47 +1017,18 @@ class Interpreter:
              return getattr(instance, node.property_name)
         raise TypeError(f"Object '{node.instance_name}' (type {type(instance).__name__}) has no property '{node.property_name}'")
     def visit_Import(self, node: Import):
-        if node.path in self.std_modules:
-            self.current_env.set(node.path, self.std_modules[node.path])
+        module = self.std_module(node.path)
+        if module is not None:
+            self.current_env.set(node.path, module)
             return
-        import os
         import importlib
-        target_path = None
-        if os.path.exists(node.path):
-             target_path = node.path
-        else:
-             home = os.path.expanduser("~")
-             global_path = os.path.join(home, ".shell_lite", "modules", node.path)
-             if os.path.exists(global_path):
-                 target_path = global_path
-             else:
-                 if not node.path.endswith('.shl'):
-                     global_path_ext = global_path + ".shl"
-                     if os.path.exists(global_path_ext):
-                         target_path = global_path_ext
+        target_path = self._find_module_file(node.path)
         if target_path:
-            if os.path.isdir(target_path):
-                 main_shl = os.path.join(target_path, "main.shl")
-                 pkg_shl = os.path.join(target_path, f"{os.path.basename(target_path)}.shl")
-                 if os.path.exists(main_shl):
-                     target_path = main_shl
-                 elif os.path.exists(pkg_shl):
-                     target_path = pkg_shl
-                 else:
-                      raise FileNotFoundError(f"Package '{node.path}' is a folder but has no 'main.shl' or '{os.path.basename(target_path)}.shl'.")
             try:
-                with open(target_path, 'r', encoding='utf-8') as f:
-                    code = f.read()
+                statements = PARSE_CACHE.load(target_path).statements
             except FileNotFoundError:
                 raise FileNotFoundError(f"Could not find imported file: {node.path}")
-            from .lexer import Lexer
-            from .parser import Parser
-            lexer = Lexer(code)
-            tokens = lexer.tokenize()
-            parser = Parser(tokens)
-            statements = parser.parse()
-            for stmt in statements:
-                self.visit(stmt)
+            self.run_statements(statements)
             return
         try:
             py_module = importlib.import_module(node.path)
@@ -812,6 +1037,38 @@ class Interpreter:
         except ImportError:
             pass
         raise FileNotFoundError(f"Could not find module '{node.path}'. Searched:\n - ShellLite Local/Global\n - Python Site-Packages (The Bridge)")
+    def _find_module_file(self, path: str) -> Optional[str]:
+        """Resolve a `use` path to a .shl file: the path itself, then
+        ~/.shell_lite/modules (with or without .shl); folders resolve to their
+        main.shl or <name>.shl. Returns None if nothing matches."""
+        target_path = None
+        if os.path.exists(path):
+             target_path = path
+        else:
+             home = os.path.expanduser("~")
+             global_path = os.path.join(home, ".shell_lite", "modules", path)
+             if os.path.exists(global_path):
+                 target_path = global_path
+             elif not path.endswith('.shl') and os.path.exists(global_path + ".shl"):
+                 target_path = global_path + ".shl"
+        if target_path and os.path.isdir(target_path):
+             main_shl = os.path.join(target_path, "main.shl")
+             pkg_shl = os.path.join(target_path, f"{os.path.basename(target_path)}.shl")
+             if os.path.exists(main_shl):
+                 target_path = main_shl
+             elif os.path.exists(pkg_shl):
+                 target_path = pkg_shl
+             else:
+                  raise FileNotFoundError(f"Package '{path}' is a folder but has no 'main.shl' or '{os.path.basename(target_path)}.shl'.")
+        return target_path
+    def reload_module(self, path: Optional[str] = None) -> bool:
+        """Forget an initialized `use ... as` module (or all of them with no
+        path) so the next import runs its body again."""
+        if path is None:
+            self.modules.clear()
+            return True
+        target_path = self._find_module_file(path)
+        return target_path is not None and self.modules.pop(os.path.abspath(target_path), None) is not None
     def _get_class_properties(self, class_def: ClassDef) -> List[tuple[str, Optional[Node]]]:
         if not hasattr(class_def, 'properties'): return []
         props = []
@@ -837,6 +1094,7 @@ class Interpreter:
              return self._find_method(parent_def, method_name)
         return None
     def builtin_run(self, cmd):
+        import subprocess
         try:
             result = subprocess.run(cmd, shell=True, capture_output=True, text=True)
             if result.returncode != 0:
@@ -870,12 +1128,14 @@ class Interpreter:
         except Exception as e:
             raise RuntimeError(f"JSON stringify failed: {e}")
     def builtin_http_get(self, url):
+        import urllib.request
         try:
             with urllib.request.urlopen(url) as response:
                 return response.read().decode('utf-8')
         except Exception as e:
             raise RuntimeError(f"HTTP GET failed for '{url}': {e}")
     def builtin_http_post(self, url, data_dict):
+        import urllib.request
         try:
             if isinstance(data_dict, Instance):
                 data_dict = data_dict.data
@@ -899,7 +1159,7 @@ class Interpreter:
             raise TypeError(f"Cannot iterate over {type(iterable).__name__}")
         result = []
         old_env = self.current_env
-        new_env = Environment(parent=self.current_env)
+        new_env = new_scope(node.layout, self.current_env)
         self.current_env = new_env
         try:
             for item in iterable:
@@ -914,6 +1174,8 @@ class Interpreter:
     def visit_Spread(self, node: Spread):
         return self.visit(node.value)
     def visit_Alert(self, node: Alert):
+        import tkinter as tk
+        from tkinter import messagebox
         msg = self.visit(node.message)
         root = tk.Tk()
         root.withdraw()
@@ -921,6 +1183,8 @@ class Interpreter:
         messagebox.showinfo("Alert", str(msg))
         root.destroy()
     def visit_Prompt(self, node: Prompt):
+        import tkinter as tk
+        from tkinter import simpledialog
         prompt = self.visit(node.prompt)
         root = tk.Tk()
         root.withdraw()
@@ -929,6 +1193,8 @@ class Interpreter:
         root.destroy()
         return val if val is not None else ""
     def visit_Confirm(self, node: Confirm):
+        import tkinter as tk
+        from tkinter import messagebox
         prompt = self.visit(node.prompt)
         root = tk.Tk()
         root.withdraw()
@@ -937,10 +1203,12 @@ class Interpreter:
         root.destroy()
         return val
     def visit_Spawn(self, node: Spawn):
+        import concurrent.futures
         executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
         future = executor.submit(self.visit, node.call)
         return future
     def visit_Await(self, node: Await):
+        import concurrent.futures
         task = self.visit(node.task)
         if isinstance(task, concurrent.futures.Future):
             return task.result()
@@ -961,13 +1229,15 @@ class Interpreter:
                     current_mtime = os.path.getmtime(path)
                     if current_mtime != last_mtime:
                         last_mtime = current_mtime
-                        for stmt in node.body:
-                            self.visit(stmt)
+                        completion = self.execute_block(node.body)
+                        if completion is not None:
+                            if completion.kind == BREAK:
+                                break
+                            if completion.kind >= RETURN:
+                                return completion
                 time.sleep(1)
         except StopException:
             pass
-        except ReturnException:
-            raise
     def _check_type(self, arg_name, val, type_hint):
         if type_hint == 'int' and not isinstance(val, int):
             raise TypeError(f"Argument '{arg_name}' expects int, got {type(val).__name__}")
@@ -988,15 +1258,14 @@ class Interpreter:
         if not hasattr(iterable, '__iter__'):
             raise TypeError(f"Cannot iterate over {type(iterable).__name__}")
         old_env = self.current_env
-        new_env = Environment(parent=self.current_env)
+        new_env = new_scope(node.layout, self.current_env)
         self.current_env = new_env
         try:
             for item in iterable:
                 new_env.set(node.var_name, item)
-                for stmt in node.body:
-                    self.visit(stmt)
-        except ReturnException:
-            raise
+                completion = self.execute_block(node.body)
+                if completion is not None:
+                    return completion
         finally:
             self.current_env = old_env
     def visit_IndexAccess(self, node: IndexAccess):
@@ -1015,9 +1284,9 @@ class Interpreter:
         else:
             raise TypeError(f"'{type(obj).__name__}' object is not subscriptable")
     def visit_Stop(self, node: Stop):
-        raise StopException()
+        return Completion(BREAK, line=node.line)
     def visit_Skip(self, node: Skip):
-        raise SkipException()
+        return Completion(CONTINUE, line=node.line)
     def visit_PythonImport(self, node: PythonImport):
         try:
             mod = importlib.import_module(node.module_name)
@@ -1042,117 +1311,82 @@ class Interpreter:
     def visit_Unless(self, node: Unless):
         condition = self.visit(node.condition)
         if not condition:
-            for stmt in node.body:
-                self.visit(stmt)
+            return self.execute_block(node.body)
         elif node.else_body:
-            for stmt in node.else_body:
-                self.visit(stmt)
+            return self.execute_block(node.else_body)
     def visit_Until(self, node: Until):
         while not self.visit(node.condition):
             try:
-                for stmt in node.body:
-                    self.visit(stmt)
+                completion = self.execute_block(node.body)
             except StopException:
                 break
             except SkipException:
                 continue
-            except ReturnException:
-                raise
+            if completion is not None:
+                if completion.kind == BREAK:
+                    break
+                if completion.kind >= RETURN:
+                    return completion
     def visit_Repeat(self, node: Repeat):
         count = self.visit(node.count)
         if not isinstance(count, int):
             raise TypeError(f"repeat count must be an integer, got {type(count).__name__}")
         old_env = self.current_env
-        self.current_env = Environment(parent=self.current_env)
+        self.current_env = new_scope(node.layout, self.current_env)
         try:
             for i in range(count):
                 self.current_env.set('index', i)
                 try:
-                    for stmt in node.body:
-                        self.visit(stmt)
+                    completion = self.execute_block(node.body)
                 except StopException:
                     break
                 except SkipException:
                     continue
-        except ReturnException:
-            raise
+                if completion is not None:
+                    if completion.kind == BREAK:
+                        break
+                    if completion.kind >= RETURN:
+                        return completion
         finally:
             self.current_env = old_env
     def visit_When(self, node: When):
         value = self.visit(node.value)
         for match_val, body in node.cases:
             if self.visit(match_val) == value:
-                for stmt in body:
-                    self.visit(stmt)
-                return
+                return self.execute_block(body)
         if node.otherwise:
-            for stmt in node.otherwise:
-                self.visit(stmt)
+            return self.execute_block(node.otherwise)
     def visit_Execute(self, node: Execute):
         code = self.visit(node.code)
         if not isinstance(code, str):
             raise TypeError(f"execute requires a string, got {type(code).__name__}")
-        from .lexer import Lexer
-        from .parser import Parser
-        lexer = Lexer(code)
-        tokens = lexer.tokenize()
-        parser = Parser(tokens)
-        statements = parser.parse()
-        result = None
-        for stmt in statements:
-            result = self.visit(stmt)
+        result = self.run_statements(PARSE_CACHE.parse(code))
         self.current_env.set('__exec_result__', result)
         return result
     def visit_ImportAs(self, node: ImportAs):
-        if node.path in self.std_modules:
-            self.current_env.set(node.alias, self.std_modules[node.path])
+        module = self.std_module(node.path)
+        if module is not None:
+            self.current_env.set(node.alias, module)
             return
+        target_path = self._find_module_file(node.path)
+        if target_path is None:
+            raise FileNotFoundError(f"Could not find imported file: {node.path} (searched local and global modules)")
+        key = os.path.abspath(target_path)
+        module_exports = self.modules.get(key)
+        if module_exports is None:
+            module_exports = self._init_module(target_path, node.path)
+            self.modules[key] = module_exports
+        self.current_env.set(node.alias, module_exports)
+    def _init_module(self, target_path: str, path: str) -> Dict[str, Any]:
+        """Run a module body in its own scope and collect its variables and
+        functions; its functions are removed from the global table again."""
         old_funcs_keys = set(self.functions.keys())
         module_env = Environment(parent=self.global_env)
         old_env = self.current_env
         self.current_env = module_env
-        module_env = Environment(parent=self.global_env)
-        old_env = self.current_env
-        self.current_env = module_env
-        if os.path.exists(node.path):
-             target_path = node.path
-        else:
-             home = os.path.expanduser("~")
-             global_path = os.path.join(home, ".shell_lite", "modules", node.path)
-             if os.path.exists(global_path):
-                 target_path = global_path
-             else:
-                  if not node.path.endswith('.shl'):
-                       global_path_ext = global_path + ".shl"
-                       if os.path.exists(global_path_ext):
-                            target_path = global_path_ext
-                       else:
-                            self.current_env = old_env
-                            raise FileNotFoundError(f"Could not find imported file: {node.path} (searched local and global modules)")
-                  else:
-                       self.current_env = old_env
-                       raise FileNotFoundError(f"Could not find imported file: {node.path} (searched local and global modules)")
-        if os.path.isdir(target_path):
-             main_shl = os.path.join(target_path, "main.shl")
-             pkg_shl = os.path.join(target_path, f"{os.path.basename(target_path)}.shl")
-             if os.path.exists(main_shl):
-                 target_path = main_shl
-             elif os.path.exists(pkg_shl):
-                 target_path = pkg_shl
-             else:
-                  self.current_env = old_env
-                  raise FileNotFoundError(f"Package '{node.path}' is a folder but has no 'main.shl' or '{os.path.basename(target_path)}.shl'.")
         try:
-            with open(target_path, 'r', encoding='utf-8') as f:
-                code = f.read()
-            from .lexer import Lexer
-            from .parser import Parser
-            lexer = Lexer(code)
-            tokens = lexer.tokenize()
-            parser = Parser(tokens)
-            statements = parser.parse()
-            for stmt in statements:
-                self.visit(stmt)
+            statements = PARSE_CACHE.load(target_path).statements
+            self.run_statements(statements)
             module_exports = {}
             module_exports.update(module_env.variables)
             current_funcs_keys = set(self.functions.keys())
@@ -1161,22 +1395,25 @@ class Interpreter:
                 func_node = self.functions[fname]
                 module_exports[fname] = func_node
                 del self.functions[fname]
-            self.current_env = old_env
-            self.current_env.set(node.alias, module_exports)
+            self.call_version += 1
+            return module_exports
         except Exception as e:
+            raise RuntimeError(f"Failed to import '{path}': {e}")
+        finally:
             self.current_env = old_env
-            raise RuntimeError(f"Failed to import '{node.path}': {e}")
     def visit_Forever(self, node: Forever):
         while True:
             try:
-                for stmt in node.body:
-                    self.visit(stmt)
+                completion = self.execute_block(node.body)
             except StopException:
                 break
             except SkipException:
                 continue
-            except ReturnException:
-                raise
+            if completion is not None:
+                if completion.kind == BREAK:
+                    break
+                if completion.kind >= RETURN:
+                    return completion
     def visit_Exit(self, node: Exit):
         code = 0
         if node.code:
@@ -1194,22 +1431,22 @@ class Interpreter:
             messagebox.showinfo("Message", str(msg))
         self.current_env.set("alert", ui_alert)
         try:
-            for child in node.body:
-                self.visit(child)
+            self.run_statements(node.body)
         finally:
             self.ui_parent_stack.pop()
         root.mainloop()
     def visit_Layout(self, node: Layout):
+        import tkinter as tk
         parent = self.ui_parent_stack[-1]
         frame = tk.Frame(parent)
         frame.pack(side=tk.TOP, fill=tk.BOTH, expand=True, padx=5, pady=5)
         self.ui_parent_stack.append((frame, node.layout_type))
         try:
-            for child in node.body:
-                self.visit(child)
+            self.run_statements(node.body)
         finally:
             self.ui_parent_stack.pop()
     def visit_Widget(self, node: Widget):
+        import tkinter as tk
         from tkinter import messagebox
         parent_ctx = self.ui_parent_stack[-1]
         if isinstance(parent_ctx, tuple):
@@ -1222,8 +1459,7 @@ class Interpreter:
             def on_click():
                 if node.event_handler:
                     try:
-                        for stmt in node.event_handler:
-                            self.visit(stmt)
+                        self.run_statements(node.event_handler)
                     except Exception as e:
                         messagebox.showerror("Error", str(e))
             widget = tk.Button(parent, text=node.label, command=on_click)
@@ -1295,8 +1531,7 @@ class Interpreter:
                  bar = '=' * int(percent / 5)
                  print(f"Progress: [{bar:<20}] {percent}%", end='\r')
                  try:
-                     for stmt in loop.body:
-                         self.visit(stmt)
+                     self.execute_block(loop.body)
                  except: pass
              print(f"Progress: [{'='*20}] 100%           ")
         elif isinstance(loop, For):
@@ -1306,8 +1541,7 @@ class Interpreter:
                  bar = '=' * int(percent / 5)
                  print(f"Progress: [{bar:<20}] {percent}%", end='\r')
                  try:
-                    for stmt in loop.body:
-                        self.visit(stmt)
+                    self.execute_block(loop.body)
                  except: pass
              print(f"Progress: [{'='*20}] 100%           ")
         elif isinstance(loop, ForIn):
@@ -1321,13 +1555,13 @@ class Interpreter:
                     print(f"Progress: [{bar:<20}] {percent}%", end='\r')
                 self.current_env.set(loop.var_name, item)
                 try:
-                    for stmt in loop.body:
-                        self.visit(stmt)
+                    self.execute_block(loop.body)
                 except: pass
                 i += 1
             if total > 0:
                 print(f"Progress: [{'='*20}] 100%           ")
     def visit_DatabaseOp(self, node: DatabaseOp):
+        import sqlite3
         if node.op == 'open':
             path = self.visit(node.args[0])
             self.db_conn = sqlite3.connect(path, check_same_thread=False)
@@ -1371,14 +1605,14 @@ class Interpreter:
         if node.unit == 'minutes': interval *= 60
         try:
             while True:
-                for stmt in node.body: self.visit(stmt)
+                self.run_statements(node.body)
                 time.sleep(interval)
         except KeyboardInterrupt: pass
     def visit_After(self, node: After):
         delay = self.visit(node.delay)
         if node.unit == 'minutes': delay *= 60
         time.sleep(delay)
-        for stmt in node.body: self.visit(stmt)
+        self.run_statements(node.body)
     def visit_OnRequest(self, node: OnRequest):
         path_str = self.visit(node.path)
         if path_str == '__middleware__':
@@ -1389,7 +1623,20 @@ class Interpreter:
             regex_pattern = "^" + re.sub(r':(\w+)', r'(?P<\1>[^/]+)', path_str) + "$"
         compiled = re.compile(regex_pattern)
         self.http_routes.append((path_str, compiled, node.body))
+    def match_route(self, path: str) -> tuple:
+        """The body and path parameters of the first route matching `path`,
+        or (None, {})."""
+        for pattern, regex, body in self.http_routes:
+            match = regex.match(path)
+            if match:
+                return body, match.groupdict()
+        return None, {}
+    def begin_request(self, request: Dict[str, Any]):
+        self.global_env.set("request", request)
+        self.global_env.set("REQUEST_METHOD", request["method"])
     def visit_Listen(self, node: Listen):
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        import urllib.parse
         port_val = self.visit(node.port)
         interpreter_ref = self
         class ReusableHTTPServer(ThreadingHTTPServer):
@@ -1437,8 +1684,7 @@ class Interpreter:
                         "form": post_params,
                         "json": json_data
                     }
-                    interpreter_ref.global_env.set("request", req_obj)
-                    interpreter_ref.global_env.set("REQUEST_METHOD", self.command)
+                    interpreter_ref.begin_request(req_obj)
                     for prefix, folder in interpreter_ref.static_routes.items():
                         if path.startswith(prefix):
                             clean_path = path[len(prefix):]
@@ -1458,17 +1704,10 @@ class Interpreter:
                                          with open(file_path, 'rb') as f: self.wfile.write(f.read())
                                      except (BrokenPipeError, ConnectionResetError): pass
                                  return
-                    matched_body = None
-                    path_params = {}
-                    for pattern, regex, body in interpreter_ref.http_routes:
-                        match = regex.match(path)
-                        if match:
-                            matched_body = body
-                            path_params = match.groupdict()
-                            break
+                    matched_body, path_params = interpreter_ref.match_route(path)
                     if matched_body:
                         for mw in interpreter_ref.middleware_routes:
-                             for stmt in mw: interpreter_ref.visit(stmt)
+                             interpreter_ref.run_statements(mw)
                         for k, v in path_params.items():
                             interpreter_ref.global_env.set(k, v)
                         for k, v in post_params.items():
@@ -1477,8 +1716,7 @@ class Interpreter:
                         response_body = ""
                         result = None
                         try:
-                            for stmt in matched_body:
-                                result = interpreter_ref.visit(stmt)
+                            result = interpreter_ref.run_statements(matched_body)
                         except ReturnException as re:
                             result = re.value
                         if interpreter_ref.web.stack:
@@ -1517,6 +1755,7 @@ class Interpreter:
             print("\n  Server stopped.")
             pass
     def visit_DatabaseOp(self, node: DatabaseOp):
+        import sqlite3
         if node.op == 'open':
             path = self.visit(node.args[0])
             self.db_conn = sqlite3.connect(path)
@@ -1532,7 +1771,7 @@ class Interpreter:
             if len(node.args) > 1:
                 val = self.visit(node.args[1])
                 params = val if isinstance(val, list) else [val]
-            c = self.db_conn.cursor(); c.execute(sql, params); self.db_conn.commit()
+            c = self._db_execute(sql, params); self.db_conn.commit()
             return c.lastrowid
         elif node.op == 'query':
             if not self.db_conn: raise RuntimeError("Database not open")
@@ -1541,10 +1780,15 @@ class Interpreter:
             if len(node.args) > 1:
                 val = self.visit(node.args[1])
                 params = val if isinstance(val, list) else [val]
-            c = self.db_conn.cursor(); c.execute(sql, params)
+            c = self._db_execute(sql, params)
             return c.fetchall()
+    def _db_execute(self, sql: str, params: list):
+        c = self.db_conn.cursor()
+        c.execute(sql, params)
+        return c
     def visit_Download(self, node: Download):
         url = self.visit(node.url)
+        import urllib.request
         filename = url.split('/')[-1] or "downloaded_file"
         print(f"Downloading {filename}...")
         try:
@@ -1559,6 +1803,7 @@ class Interpreter:
         except Exception as e:
              print(f"Error: Download failed: {e}")
     def visit_ArchiveOp(self, node: ArchiveOp):
+        import zipfile
         source = str(self.visit(node.source))
         target = str(self.visit(node.target))
         try:
@@ -1586,6 +1831,7 @@ class Interpreter:
         except Exception as e:
              print(f"Error: Archive operation failed: {e}")
     def visit_CsvOp(self, node: CsvOp):
+        import csv
         path = self.visit(node.path)
         if node.op == 'load':
             with open(path, 'r', newline='') as f:
@@ -1618,8 +1864,7 @@ class Interpreter:
                 except Exception as e:
                     print(f"Error saving CSV: {e}")
     def visit_ClipboardOp(self, node: ClipboardOp):
-        if 'pyperclip' not in sys.modules:
-             raise RuntimeError("Install 'pyperclip' for clipboard support.")
+        pyperclip = optional_import('pyperclip', "Install 'pyperclip' for clipboard support.")
         if node.op == 'copy':
              content = str(self.visit(node.content))
              pyperclip.copy(content)
@@ -1628,18 +1873,18 @@ class Interpreter:
     def visit_AutomationOp(self, node: AutomationOp):
         args = [self.visit(a) for a in node.args]
         if node.action == 'press':
-             if 'keyboard' not in sys.modules: raise RuntimeError("Install 'keyboard'")
+             keyboard = optional_import('keyboard', "Install 'keyboard'")
              keyboard.press_and_release(args[0])
         elif node.action == 'type':
-             if 'keyboard' not in sys.modules: raise RuntimeError("Install 'keyboard'")
+             keyboard = optional_import('keyboard', "Install 'keyboard'")
              keyboard.write(str(args[0]))
         elif node.action == 'click':
-             if 'mouse' not in sys.modules: raise RuntimeError("Install 'mouse'")
+             mouse = optional_import('mouse', "Install 'mouse'")
              mouse.move(args[0], args[1], absolute=True, duration=0.2)
              mouse.click('left')
         elif node.action == 'notify':
-             if 'plyer' not in sys.modules: raise RuntimeError("Install 'plyer'")
-             notification.notify(title=str(args[0]), message=str(args[1]))
+             plyer = optional_import('plyer', "Install 'plyer'")
+             plyer.notification.notify(title=str(args[0]), message=str(args[1]))
     def visit_DateOp(self, node: DateOp):
         if node.expr == 'today':
             return datetime.now().strftime("%Y-%m-%d")
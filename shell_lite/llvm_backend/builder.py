@@ -2,15 +2,16 @@ import llvmlite.binding as llvm
 from .codegen import LLVMCompiler
 from ..lexer import Lexer
 from ..parser import Parser
+from ..optimizer import DEFAULT_OPT_LEVEL, optimize
 import os
-def build_llvm(filename: str):
+def build_llvm(filename: str, opt_level: int = DEFAULT_OPT_LEVEL):
     print(f"Compiling {filename} with LLVM Backend...")
     with open(filename, 'r', encoding='utf-8') as f:
         source = f.read()
     lexer = Lexer(source)
     tokens = lexer.tokenize()
     parser = Parser(tokens)
-    statements = parser.parse()
+    statements = optimize(parser.parse(), opt_level)
     compiler = LLVMCompiler()
     module = compiler.compile(statements)
     llvm_ir = str(module)
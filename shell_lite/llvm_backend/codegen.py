@@ -69,6 +69,8 @@ class LLVMCompiler:
         return ir.Constant(self.int32, int(node.value))
     def visit_String(self, node: String):
         return self._get_string_constant(node.value)
+    def visit_Boolean(self, node: Boolean):
+        return ir.Constant(ir.IntType(1), int(node.value))
     def visit_BinOp(self, node: BinOp):
         left = self.visit(node.left)
         right = self.visit(node.right)
@@ -1,29 +1,46 @@
 import sys
 import os
-import shutil
-import urllib.request
-import zipfile
 import io
-import subprocess
-from .lexer import Lexer
-from .parser import Parser
-from .interpreter import Interpreter
-from .ast_nodes import *
 import json
-def execute_source(source: str, interpreter: Interpreter):
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    from .interpreter import Interpreter
+def execute_source(source: str, interpreter: 'Interpreter', engine: str = 'tree', filename: str = None, opt_level: int = None):
     lines = source.split('\n')
+    if opt_level is None:
+        from .optimizer import DEFAULT_OPT_LEVEL
+        opt_level = DEFAULT_OPT_LEVEL
     import difflib
     try:
-        lexer = Lexer(source)
-        tokens = lexer.tokenize()
-        if os.environ.get('USE_LEGACY_PARSER') == '1':
-            parser = Parser(tokens)
+        module = None
+        if filename:
+            from .bytecode import load_module
+            parser_name = 'legacy' if os.environ.get('USE_LEGACY_PARSER') == '1' else 'gbp'
+            module = load_module(filename, source, parser_name, opt_level)
+            statements = module.statements
         else:
-            from .parser_gbp import GeometricBindingParser
-            parser = GeometricBindingParser(tokens)
-        statements = parser.parse()
-        for stmt in statements:
-            interpreter.visit(stmt)
+            from .lexer import Lexer
+            lexer = Lexer(source)
+            tokens = lexer.tokenize()
+            if os.environ.get('USE_LEGACY_PARSER') == '1':
+                from .parser import Parser
+                parser = Parser(tokens)
+            else:
+                from .parser_gbp import GeometricBindingParser
+                parser = GeometricBindingParser(tokens)
+            from .optimizer import optimize
+            from .resolver import resolve
+            statements = resolve(optimize(parser.parse(), opt_level))
+        if engine == 'closure':
+            from .closure_compiler import ClosureCompiler
+            ClosureCompiler(interpreter).run(statements)
+        elif engine == 'vm':
+            from .bytecode import BytecodeCompiler
+            from .vm import VM
+            code = module.code if module else BytecodeCompiler().compile(statements)
+            VM(interpreter).run(code)
+        else:
+            interpreter.run_statements(statements)
     except Exception as e:
         if hasattr(e, 'line') and e.line > 0:
             print(f"\n[ShellLite Error] on line {e.line}:")
@@ -36,7 +53,7 @@ def execute_source(source: str, interpreter: Interpreter):
                  match = re.search(r"'(.*?)'", str(e))
                  if match:
                      missing_var = match.group(1)
-                     candidates = list(interpreter.global_env.variables.keys()) + list(interpreter.functions.keys())
+                     candidates = list(interpreter.global_env.variables.keys()) + list(interpreter.builtins.keys()) + list(interpreter.functions.keys())
                      suggestions = difflib.get_close_matches(missing_var, candidates, n=1, cutoff=0.6)
                      if suggestions:
                          print(f"Did you mean: '{suggestions[0]}'?")
@@ -45,17 +62,231 @@ def execute_source(source: str, interpreter: Interpreter):
         if os.environ.get("SHL_DEBUG"):
             import traceback
             traceback.print_exc()
-def run_file(filename: str):
+        return False
+    return True
+ENGINES = ('tree', 'closure', 'vm')
+RUN_OPTIONS = {'--engine': "/".join(ENGINES), '--opt-level': "0/1/2", '--manifest': "a file listing scripts", '--jobs': "number of worker processes",
+               '--profile-output': "a file for collapsed stacks", '--sample': "a file for sampled stacks",
+               '--sample-interval': "milliseconds between samples"}
+RUN_FLAGS = ('--profile', '--stats', '--memprofile')
+def parse_opt_level(value: str) -> int:
+    from .optimizer import OPT_LEVELS
+    if not value.isdigit() or int(value) not in OPT_LEVELS:
+        raise ValueError(f"Unknown optimization level '{value}'. Choose one of: " + ", ".join(map(str, OPT_LEVELS)))
+    return int(value)
+def parse_run_options(args):
+    from .optimizer import DEFAULT_OPT_LEVEL
+    files = []
+    options = {'engine': 'tree', 'opt_level': DEFAULT_OPT_LEVEL, 'jobs': 1, 'profile': False, 'profile_output': None, 'stats': False, 'memprofile': False,
+               'sample': None, 'sample_interval': 5.0}
+    i = 0
+    while i < len(args):
+        arg = args[i]
+        name = arg.split('=', 1)[0]
+        if arg in RUN_FLAGS:
+            options[arg[2:]] = True
+        elif name in RUN_OPTIONS:
+            if '=' in arg:
+                value = arg.split('=', 1)[1]
+            elif i + 1 < len(args):
+                i += 1
+                value = args[i]
+            else:
+                raise ValueError(f"{name} requires an argument ({RUN_OPTIONS[name]})")
+            if name == '--opt-level':
+                options['opt_level'] = parse_opt_level(value)
+            elif name == '--manifest':
+                files.extend(read_manifest(value))
+            elif name == '--jobs':
+                if not value.isdigit() or int(value) < 1:
+                    raise ValueError(f"--jobs expects a positive number, got '{value}'")
+                options['jobs'] = int(value)
+            elif name == '--sample':
+                options['sample'] = value
+            elif name == '--sample-interval':
+                try:
+                    options['sample_interval'] = float(value)
+                except ValueError:
+                    raise ValueError(f"--sample-interval expects milliseconds, got '{value}'")
+            elif name == '--profile-output':
+                options['profile'] = True
+                options['profile_output'] = value
+            elif value not in ENGINES:
+                raise ValueError(f"Unknown engine '{value}'. Choose one of: " + ", ".join(ENGINES))
+            else:
+                options['engine'] = value
+        elif arg.startswith('--'):
+            raise ValueError(f"Unknown option '{arg}'")
+        else:
+            files.append(arg)
+        i += 1
+    return files, options
+def read_manifest(path: str) -> list:
+    """Script paths listed in a --manifest file, one per line; blank lines and
+    lines starting with # are skipped, relative paths are taken from the
+    manifest's directory."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            lines = [line.strip() for line in f]
+    except OSError as e:
+        raise ValueError(f"Cannot read manifest '{path}': {e}")
+    base = os.path.dirname(path)
+    return [os.path.join(base, line) for line in lines if line and not line.startswith('#')]
+def run_file(filename: str, engine: str = 'tree', opt_level: int = None) -> bool:
+    """Run one script in a fresh Interpreter; False if it failed."""
     if not os.path.exists(filename):
         print(f"Error: File '{filename}' not found.")
-        return
+        return False
     import sys
     from .interpreter import Interpreter
+    with open(filename, 'r', encoding='utf-8') as f:
+        source = f.read()
+    if opt_level is None:
+        from .optimizer import DEFAULT_OPT_LEVEL
+        opt_level = DEFAULT_OPT_LEVEL
+    interpreter = Interpreter()
+    return execute_source(source, interpreter, engine=engine, filename=filename, opt_level=opt_level)
+def run_instrumented(filename: str, options: dict) -> bool:
+    """Run one script on the tree-walking interpreter with the instruments
+    asked for (--profile, --stats, --memprofile), then print their reports
+    to stderr."""
+    if not os.path.exists(filename):
+        print(f"Error: File '{filename}' not found.")
+        return False
+    from .interpreter import Interpreter
+    from .profiler import ExecutionStats, MemoryProfiler, Profiler
+    if options['engine'] != 'tree':
+        print(f"[profile] instrumented runs use the tree-walking interpreter; ignoring --engine={options['engine']}", file=sys.stderr)
     with open(filename, 'r', encoding='utf-8') as f:
         source = f.read()
     interpreter = Interpreter()
-    execute_source(source, interpreter)
+    instruments = []
+    if options['stats']:
+        instruments.append(ExecutionStats().attach(interpreter))
+    if options['memprofile']:
+        instruments.append(MemoryProfiler(filename).attach(interpreter))
+    profiler = Profiler(filename).attach(interpreter) if options['profile'] else None
+    if profiler:
+        instruments.append(profiler)
+    try:
+        ok = execute_source(source, interpreter, filename=filename, opt_level=options['opt_level'])
+    finally:
+        for instrument in reversed(instruments):
+            instrument.detach()
+        sys.stdout.flush()
+        for instrument in instruments:
+            instrument.report()
+        if profiler and options['profile_output']:
+            profiler.write_collapsed(options['profile_output'])
+            print(f"\nCollapsed stacks written to {options['profile_output']}", file=sys.stderr)
+    return ok
+def run_sampled(filename: str, options: dict) -> bool:
+    """Run one script with the sampling profiler on from the start; SIGUSR2
+    switches it off (writing the stacks file) and on again while it runs."""
+    import signal
+    from . import profiler
+    if options['engine'] != 'tree':
+        print(f"[sample] the sampler reads the tree-walking interpreter's frames; ignoring --engine={options['engine']}", file=sys.stderr)
+    output = options['sample']
+    if hasattr(signal, 'SIGUSR2'):
+        profiler.sampling_on_signal(output, options['sample_interval'])
+    profiler.start_sampling(output, options['sample_interval'])
+    try:
+        return run_file(filename, engine='tree', opt_level=options['opt_level'])
+    finally:
+        samples = profiler.stop_sampling()
+        print(f"\n[sample] {samples} samples written to {output}", file=sys.stderr)
+def run_batch_item(job) -> tuple:
+    """Run one script of a batch; returns (ok, seconds, output). Output is
+    captured when running in a worker process so scripts do not interleave."""
+    filename, engine, opt_level, capture = job
+    import time
+    from contextlib import redirect_stderr, redirect_stdout
+    cwd = os.getcwd()
+    buffer = io.StringIO() if capture else None
+    start = time.perf_counter()
+    try:
+        if capture:
+            with redirect_stdout(buffer), redirect_stderr(buffer):
+                ok = run_file(filename, engine, opt_level)
+        else:
+            ok = run_file(filename, engine, opt_level)
+    except SystemExit as e:
+        ok = e.code in (None, 0)
+    finally:
+        os.chdir(cwd)
+    return ok, time.perf_counter() - start, buffer.getvalue() if capture else ''
+def run_batch(files: list, engine: str = 'tree', opt_level: int = None, jobs: int = 1) -> int:
+    """
+    Run several scripts in this process, each with its own Interpreter (so no
+    globals leak between them) while builtins, parsed imports and compiled
+    regexes stay warm. With jobs > 1 the scripts are spread over a pool of
+    worker processes and their output is printed in order. Returns the
+    number of scripts that failed.
+    """
+    import time
+    start = time.perf_counter()
+    failed = []
+    if jobs > 1:
+        import multiprocessing
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context('fork' if 'fork' in methods else None)
+        with context.Pool(min(jobs, len(files))) as pool:
+            results = pool.imap(run_batch_item, [(f, engine, opt_level, True) for f in files])
+            for filename, (ok, _, output) in zip(files, results):
+                sys.stdout.write(output)
+                sys.stdout.flush()
+                if not ok:
+                    failed.append(filename)
+    else:
+        for filename in files:
+            ok, _, _ = run_batch_item((filename, engine, opt_level, False))
+            if not ok:
+                failed.append(filename)
+    elapsed = time.perf_counter() - start
+    print(f"\n[batch] {len(files)} scripts in {elapsed:.2f}s, {len(failed)} failed", file=sys.stderr)
+    for filename in failed:
+        print(f"[batch] failed: {filename}", file=sys.stderr)
+    return len(failed)
+def parse_disasm_options(args):
+    """`shl disasm <file> [--opt-level N]`; returns (files, opt_level)."""
+    files = []
+    opt_level = None
+    i = 0
+    while i < len(args):
+        arg = args[i]
+        if arg.split('=', 1)[0] == '--opt-level':
+            if '=' in arg:
+                value = arg.split('=', 1)[1]
+            elif i + 1 < len(args):
+                i += 1
+                value = args[i]
+            else:
+                raise ValueError(f"--opt-level requires an argument ({RUN_OPTIONS['--opt-level']})")
+            opt_level = parse_opt_level(value)
+        elif arg.startswith('--'):
+            raise ValueError(f"Unknown option '{arg}'")
+        else:
+            files.append(arg)
+        i += 1
+    return files, opt_level
+def disasm_file(filename: str, opt_level: int = None):
+    """Print the bytecode `shl run` executes for `filename` at `opt_level`
+    (the default optimization level unless given)."""
+    if not os.path.exists(filename):
+        print(f"Error: File '{filename}' not found.")
+        return
+    from .bytecode import disassemble, load_module
+    from .optimizer import DEFAULT_OPT_LEVEL
+    parser_name = 'legacy' if os.environ.get('USE_LEGACY_PARSER') == '1' else 'gbp'
+    try:
+        module = load_module(filename, parser=parser_name, opt_level=DEFAULT_OPT_LEVEL if opt_level is None else opt_level)
+    except Exception as e:
+        print(f"Error: {e}")
+        return
+    disassemble(module.code)
 def run_repl():
+    from .interpreter import Interpreter
     interpreter = Interpreter()
     print("\n" + "="*40)
     print("="*40)
@@ -135,6 +366,7 @@ def install_globally():
     target_exe = os.path.join(install_dir, 'shl.exe')
     current_path = sys.executable
     is_frozen = getattr(sys, 'frozen', False)
+    import shutil
     try:
         if is_frozen:
             if os.path.abspath(current_path).lower() != os.path.abspath(target_exe).lower():
@@ -148,6 +380,7 @@ def install_globally():
         else:
             print("Error: Installation requires the shl.exe file.")
             return
+        import subprocess
         ps_cmd = f'$oldPath = [Environment]::GetEnvironmentVariable("Path", "User"); if ($oldPath -notlike "*ShellLite*") {{ [Environment]::SetEnvironmentVariable("Path", "$oldPath;{install_dir}", "User") }}'
         subprocess.run(["powershell", "-Command", ps_cmd], capture_output=True)
         print(f"\n[SUCCESS] ShellLite (v0.5.3.3) is installed!")
@@ -219,7 +452,10 @@ def install_package(package_name: str, branch: str = "main"):
         pass
     zip_url = f"https://github.com/{user}/{repo}/archive/refs/heads/{branch}.zip"
     try:
+        import shutil
         import tempfile
+        import urllib.request
+        import zipfile
         print(f"Downloading {zip_url}...")
         try:
             with urllib.request.urlopen(zip_url) as response:
@@ -243,20 +479,23 @@ def install_package(package_name: str, branch: str = "main"):
         print(f"[SUCCESS] Installed '{package_name}' to {target_dir}")
     except Exception as e:
         print(f"Installation failed for {package_name}: {e}")
-def compile_file(filename: str, target: str = 'llvm'):
+def compile_file(filename: str, target: str = 'llvm', opt_level: int = None):
     if not os.path.exists(filename):
         print(f"Error: File '{filename}' not found.")
         return
     print(f"Compiling {filename} to {target.upper()}...")
     with open(filename, 'r', encoding='utf-8') as f:
         source = f.read()
+    from .optimizer import DEFAULT_OPT_LEVEL, optimize
+    if opt_level is None:
+        opt_level = DEFAULT_OPT_LEVEL
     try:
         from .parser import Parser
         from .lexer import Lexer
         lexer = Lexer(source)
         tokens = lexer.tokenize()
         parser = Parser(tokens)
-        statements = parser.parse()
+        statements = optimize(parser.parse(), opt_level)
         if target.lower() == 'js':
             from .js_compiler import JSCompiler
             compiler = JSCompiler()
@@ -265,7 +504,7 @@ def compile_file(filename: str, target: str = 'llvm'):
         elif target.lower() == 'llvm':
             try:
                 from .llvm_backend.builder import build_llvm
-                build_llvm(filename)
+                build_llvm(filename, opt_level)
                 return
             except ImportError:
                 print("Error: 'llvmlite' is required for LLVM compilation.")
@@ -302,6 +541,8 @@ def lint_file(filename: str):
     try:
         with open(filename, 'r', encoding='utf-8') as f:
             source = f.read()
+        from .lexer import Lexer
+        from .parser import Parser
         lexer = Lexer(source)
         tokens = lexer.tokenize()
         parser = Parser(tokens)
@@ -317,6 +558,9 @@ def resolve_cursor(filename: str, line: int, col: int):
     try:
         with open(filename, 'r', encoding='utf-8') as f:
             source = f.read()
+        from .ast_nodes import Assign, ClassDef, For, FunctionDef, If, While
+        from .lexer import Lexer
+        from .parser import Parser
         lexer = Lexer(source)
         tokens = lexer.tokenize()
         parser = Parser(tokens)
@@ -393,7 +637,39 @@ def format_file(filename: str):
         print(f"[SUCCESS] Formatted {filename}")
     except Exception as e:
         print(f"Formatting failed: {e}")
+STARTUP_IMPORTS = 'import shell_lite.main, shell_lite.interpreter, shell_lite.parser_gbp, shell_lite.optimizer, shell_lite.resolver'
+def startup_report(limit: int = 15):
+    """Print where `shl run` spends its import time, from `python -X importtime`
+    run on the CLI and runtime modules in a fresh process."""
+    import subprocess
+    if getattr(sys, 'frozen', False):
+        print("Error: --startup-report needs a Python interpreter (not available in the frozen shl executable).")
+        return
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [root, os.environ.get('PYTHONPATH')])))
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', STARTUP_IMPORTS],
+                            capture_output=True, text=True, env=env)
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        rows.append((int(self_us), int(cumulative_us), name.strip(), name[1:2] != ' '))
+    if not rows:
+        print(result.stderr.strip() or "Error: no import timings were reported.")
+        return
+    total = sum(row[1] for row in rows if row[3])
+    print(f"shl startup: {total / 1000:.1f} ms importing {len(rows)} modules\n")
+    print(f"{'self ms':>9} {'total ms':>9}  module")
+    own = [row for row in rows if row[2].startswith('shell_lite')]
+    for self_us, cumulative_us, name, _ in own:
+        print(f"{self_us / 1000:9.1f} {cumulative_us / 1000:9.1f}  {name}")
+    print("\nSlowest other imports (self time):")
+    others = sorted((row for row in rows if not row[2].startswith('shell_lite')), reverse=True)[:limit]
+    for self_us, cumulative_us, name, _ in others:
+        print(f"{self_us / 1000:9.1f} {cumulative_us / 1000:9.1f}  {name}")
 def self_install_check():
+    import shutil
     if not shutil.which("shl"):
         print("\nShellLite is not installed globally.")
         choice = input("Would you like to install it so 'shl' works everywhere? (y/n): ").lower()
@@ -404,22 +680,46 @@ def show_help():
 ShellLite - The English-Like Programming Language
 Usage:
   shl <filename.shl>    Run a ShellLite script
+  shl run <file> [--engine=tree|closure|vm] [--opt-level=0|1|2]
+                        Run a script with the chosen execution engine
+  shl run a.shl b.shl [--manifest jobs.txt] [--jobs N]
+                        Run many scripts in one warm process (or N workers)
+  shl bench [--filter NAME] [--repeat N] [--compare baseline.json]
+                        Run the microbenchmark suite (JSON report)
+  shl run <file> --profile [--profile-output out.folded]
+                        Report time per function and line; write flame graph stacks
+  shl run <file> --sample out.folded [--sample-interval MS]
+                        Sample the running script (kill -USR2 toggles sampling)
+  shl run <file> --stats  Count AST nodes, scopes, builtin calls and regexes at exit
+  shl run <file> --memprofile
+                        Report net and peak memory per line and function
+  shl disasm <file> [--opt-level=0|1|2]
+                        Show the bytecode compiled for a script
+  shl daemon [--stats | --stop]
+                        Keep a warm runtime running; `shl run` forwards to it
   shl                   Start the interactive REPL
   shl help              Show this help message
-  shl compile <file>    Compile a script (Options: --target js)
+  shl compile <file>    Compile a script (Options: --target js, --opt-level N)
   shl fmt <file>        Format a script
   shl check <file>      Lint a file (JSON output)
   shl resolve <file> <line> <col>  Resolve symbol (JSON output)
   shl install           Install ShellLite globally to your system PATH
+  shl --startup-report  Show how long `shl` spends importing each module
 For documentation, visit: https://github.com/Shrey-N/ShellDesk
 """)
 def main():
+    if len(sys.argv) > 1 and (sys.argv[1] == "run" or sys.argv[1].endswith(".shl")):
+        from .daemon import forward
+        code = forward(sys.argv)
+        if code is not None:
+            sys.exit(code)
     if len(sys.argv) > 1:
         cmd = sys.argv[1]
         if cmd == "compile" or cmd == "build":
             if len(sys.argv) > 2:
                 filename = sys.argv[2]
                 target = 'llvm'
+                opt_level = None
                 if '--target' in sys.argv:
                     try:
                         idx = sys.argv.index('--target')
@@ -427,9 +727,19 @@ def main():
                     except IndexError:
                         print("Error: --target requires an argument (js/python/llvm)")
                         return
-                compile_file(filename, target)
+                if '--opt-level' in sys.argv:
+                    try:
+                        idx = sys.argv.index('--opt-level')
+                        opt_level = parse_opt_level(sys.argv[idx+1])
+                    except IndexError:
+                        print("Error: --opt-level requires an argument (0/1/2)")
+                        return
+                    except ValueError as e:
+                        print(f"Error: {e}")
+                        return
+                compile_file(filename, target, opt_level)
             else:
-                print("Usage: shl compile <filename> [--target js]")
+                print("Usage: shl compile <filename> [--target js] [--opt-level N]")
         elif cmd == "llvm":
              if len(sys.argv) > 2:
                  try:
@@ -443,6 +753,8 @@ def main():
                  print("Usage: shl llvm <filename>")
         elif cmd == "help" or cmd == "--help" or cmd == "-h":
             show_help()
+        elif cmd == "--startup-report":
+            startup_report()
         elif cmd == "--version" or cmd == "-v":
             try:
                 from importlib.metadata import version
@@ -482,10 +794,50 @@ def main():
                 col = int(sys.argv[4])
                 resolve_cursor(filename, line, col)
         elif cmd == "run":
-            if len(sys.argv) > 2:
-                run_file(sys.argv[2])
+            try:
+                files, options = parse_run_options(sys.argv[2:])
+            except ValueError as e:
+                print(f"Error: {e}")
+                return
+            if options['profile'] or options['stats'] or options['memprofile']:
+                if len(files) != 1:
+                    print("Error: --profile, --stats and --memprofile take exactly one script")
+                    return
+                run_instrumented(files[0], options)
+            elif options['sample']:
+                if len(files) != 1:
+                    print("Error: --sample takes exactly one script")
+                    return
+                run_sampled(files[0], options)
+            elif len(files) == 1 and options['jobs'] == 1:
+                run_file(files[0], engine=options['engine'], opt_level=options['opt_level'])
+            elif files:
+                if run_batch(files, options['engine'], options['opt_level'], options['jobs']):
+                    sys.exit(1)
+            else:
+                print("Usage: shl run <filename>... [--manifest jobs.txt] [--jobs N] [--engine=tree|closure|vm] [--opt-level=0|1|2] [--profile]")
+        elif cmd == "bench":
+            from .bench import bench_command
+            try:
+                code = bench_command(sys.argv[2:])
+            except (ValueError, OSError) as e:
+                print(f"Error: {e}")
+                code = 2
+            if code:
+                sys.exit(code)
+        elif cmd == "daemon":
+            from .daemon import daemon_command
+            daemon_command(sys.argv[2:])
+        elif cmd == "disasm":
+            try:
+                files, opt_level = parse_disasm_options(sys.argv[2:])
+            except ValueError as e:
+                print(f"Error: {e}")
+                return
+            if len(files) == 1:
+                disasm_file(files[0], opt_level)
             else:
-                print("Usage: shl run <filename>")
+                print("Usage: shl disasm <filename> [--opt-level=0|1|2]")
         else:
             run_file(sys.argv[1])
     else:
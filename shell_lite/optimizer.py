@@ -0,0 +1,275 @@
+import math
+from dataclasses import fields
+from typing import Callable, Dict, List, Optional
+from .ast_nodes import *
+from .resolver import SKIP_FIELDS, bound_names
+DEFAULT_OPT_LEVEL = 1
+OPT_LEVELS = (0, 1, 2)
+MAX_FOLDED_LENGTH = 4096
+TERMINATORS = (Return, Stop, Skip, Throw, Exit)
+FOLDABLE_OPS = {
+    '-': lambda a, b: a - b,
+    '*': lambda a, b: a * b,
+    '/': lambda a, b: a / b,
+    '%': lambda a, b: a % b,
+    '==': lambda a, b: a == b,
+    '!=': lambda a, b: a != b,
+    '<': lambda a, b: a < b,
+    '>': lambda a, b: a > b,
+    '<=': lambda a, b: a <= b,
+    '>=': lambda a, b: a >= b,
+}
+def make_literal(value, line: int = 0) -> Optional[Node]:
+    if isinstance(value, bool):
+        node = Boolean(value)
+    elif isinstance(value, (int, float)):
+        if isinstance(value, float) and not math.isfinite(value):
+            return None
+        node = Number(value)
+    elif isinstance(value, str):
+        if len(value) > MAX_FOLDED_LENGTH:
+            return None
+        node = String(value)
+    else:
+        return None
+    node.line = line
+    return node
+def is_literal(node) -> bool:
+    return isinstance(node, (Number, String, Boolean))
+def repeated_length(a, b) -> int:
+    if isinstance(a, str) and isinstance(b, int):
+        return len(a) * b
+    if isinstance(b, str) and isinstance(a, int):
+        return len(b) * a
+    return 0
+class Transformer:
+    """
+    Base class for optimizer passes. `transform_<NodeType>` methods return the
+    replacement node, or a list of statements to splice into the enclosing
+    block. Nodes without a method have their children transformed in place.
+    """
+    def transform_block(self, statements: Optional[List[Node]]) -> Optional[List[Node]]:
+        if statements is None:
+            return None
+        result = []
+        for stmt in statements:
+            new = self.transform(stmt)
+            if isinstance(new, list):
+                result.extend(new)
+            else:
+                result.append(new)
+        return result
+    def transform(self, node):
+        if isinstance(node, list):
+            return self.transform_block(node)
+        if isinstance(node, tuple):
+            return tuple(self.transform(item) if isinstance(item, (Node, list, tuple)) else item for item in node)
+        if not isinstance(node, Node):
+            return node
+        method = getattr(self, f'transform_{type(node).__name__}', None)
+        if method is not None:
+            return method(node)
+        return self.transform_children(node)
+    def transform_children(self, node: Node) -> Node:
+        for f in fields(node):
+            if f.name not in SKIP_FIELDS:
+                value = getattr(node, f.name)
+                if isinstance(value, (Node, list, tuple)):
+                    new = self.transform(value)
+                    if isinstance(value, Node) and isinstance(new, list):
+                        new = value
+                    setattr(node, f.name, new)
+        return node
+class ConstantFolder(Transformer):
+    """Evaluates operators whose operands are all literals, using the same
+    rules as Interpreter.visit_BinOp. Anything that would raise is left alone
+    so the error still surfaces at run time with its line number."""
+    def transform_BinOp(self, node: BinOp):
+        self.transform_children(node)
+        left, right = node.left, node.right
+        if not (is_literal(left) and is_literal(right)):
+            return node
+        if node.op == 'and':
+            return right if left.value else left
+        if node.op == 'or':
+            return left if left.value else right
+        a, b = left.value, right.value
+        try:
+            if node.op == '+':
+                value = str(a) + str(b) if isinstance(a, str) or isinstance(b, str) else a + b
+            elif node.op in FOLDABLE_OPS:
+                if node.op == '*' and repeated_length(a, b) > MAX_FOLDED_LENGTH:
+                    return node
+                value = FOLDABLE_OPS[node.op](a, b)
+            else:
+                return node
+        except Exception:
+            return node
+        return make_literal(value, node.line) or node
+    def transform_UnaryOp(self, node: UnaryOp):
+        self.transform_children(node)
+        if node.op == 'not' and is_literal(node.right):
+            return make_literal(not node.right.value, node.line)
+        return node
+    def transform_Ternary(self, node: Ternary):
+        self.transform_children(node)
+        if is_literal(node.condition):
+            return node.true_expr if node.condition.value else node.false_expr
+        return node
+class DeadCodeEliminator(Transformer):
+    """Drops branches whose condition is a literal and statements that follow
+    a `return`, `stop`, `skip`, `error` or `exit` in the same block."""
+    def transform_block(self, statements):
+        if statements is None:
+            return None
+        result = []
+        for stmt in statements:
+            new = self.transform(stmt)
+            for item in (new if isinstance(new, list) else [new]):
+                result.append(item)
+                if isinstance(item, TERMINATORS):
+                    return result
+        return result
+    def transform_If(self, node: If):
+        self.transform_children(node)
+        if is_literal(node.condition):
+            return node.body if node.condition.value else (node.else_body or [])
+        return node
+    def transform_Unless(self, node: Unless):
+        self.transform_children(node)
+        if is_literal(node.condition):
+            return (node.else_body or []) if node.condition.value else node.body
+        return node
+    def transform_While(self, node: While):
+        self.transform_children(node)
+        if is_literal(node.condition) and not node.condition.value:
+            return []
+        return node
+    def transform_Until(self, node: Until):
+        self.transform_children(node)
+        if is_literal(node.condition) and node.condition.value:
+            return []
+        return node
+EXTRA_BINDERS = {PythonImport: 'alias', Widget: 'var_name'}
+def rebound_names(body) -> set:
+    """Names a scope binds more than once, or through a binder the resolver
+    does not track. A `const` with one of these names is never propagated."""
+    seen, unsafe = set(), set()
+    for name in bound_names(body):
+        if name in seen:
+            unsafe.add(name)
+        seen.add(name)
+    stack = list(body or [])
+    while stack:
+        node = stack.pop()
+        if isinstance(node, (list, tuple)):
+            stack.extend(node)
+            continue
+        if not isinstance(node, Node):
+            continue
+        attr = EXTRA_BINDERS.get(type(node))
+        if attr is not None and getattr(node, attr):
+            unsafe.add(getattr(node, attr))
+        if isinstance(node, FromImport):
+            unsafe.update(alias or name for name, alias in node.names)
+        stack.extend(getattr(node, f.name) for f in fields(node) if f.name not in SKIP_FIELDS)
+    return unsafe
+class ConstantPropagator(ConstantFolder):
+    """
+    Replaces reads of a `const` whose value folds to a literal with the
+    literal itself, folding as it goes so constants can build on each other. A constant is only visible to statements after its definition in
+    the same block (and their nested blocks), and never inside a scope that
+    binds a name of its own with the same spelling.
+    """
+    def __init__(self):
+        self.known: Dict[str, Node] = {}
+        self.unsafe: set = set()
+    def transform_block(self, statements):
+        saved = self.known
+        self.known = dict(saved)
+        try:
+            return super().transform_block(statements)
+        finally:
+            self.known = saved
+    def run_scope(self, node: Node, shadowed) -> Node:
+        saved = self.known
+        self.known = {k: v for k, v in saved.items() if k not in shadowed}
+        try:
+            return self.transform_children(node)
+        finally:
+            self.known = saved
+    def transform_ConstAssign(self, node: ConstAssign):
+        self.transform_children(node)
+        if is_literal(node.value) and node.name not in self.unsafe:
+            self.known[node.name] = node.value
+        return node
+    def transform_VarAccess(self, node: VarAccess):
+        value = self.known.get(node.name)
+        if value is None:
+            return node
+        return make_literal(value.value, node.line)
+    def transform_FunctionDef(self, node: FunctionDef):
+        names = [arg_name for arg_name, _, _ in node.args]
+        saved = self.unsafe
+        self.unsafe = rebound_names(node.body)
+        try:
+            return self.run_scope(node, {*names, *bound_names(node.body)})
+        finally:
+            self.unsafe = saved
+    def transform_ClassDef(self, node: ClassDef):
+        return self.run_scope(node, set(self.known))
+    def transform_Lambda(self, node: Lambda):
+        return self.run_scope(node, set(node.params))
+    def transform_ForIn(self, node: ForIn):
+        node.iterable = self.transform(node.iterable)
+        return self.run_loop_scope(node, node.var_name)
+    def transform_Repeat(self, node: Repeat):
+        node.count = self.transform(node.count)
+        return self.run_loop_scope(node, 'index')
+    def run_loop_scope(self, node: Node, var_name: str) -> Node:
+        saved = self.known
+        shadowed = {var_name, *bound_names(node.body)}
+        self.known = {k: v for k, v in saved.items() if k not in shadowed}
+        try:
+            node.body = self.transform_block(node.body)
+        finally:
+            self.known = saved
+        return node
+    def transform_ListComprehension(self, node: ListComprehension):
+        node.iterable = self.transform(node.iterable)
+        saved_known = self.known
+        self.known = {k: v for k, v in saved_known.items() if k != node.var_name}
+        try:
+            node.expr = self.transform(node.expr)
+            node.condition = self.transform(node.condition)
+        finally:
+            self.known = saved_known
+        return node
+    def propagate(self, statements: List[Node]) -> List[Node]:
+        self.unsafe = rebound_names(statements)
+        return self.transform_block(statements)
+PASSES: List[tuple] = []
+def register_pass(name: str, level: int, func: Optional[Callable] = None):
+    """Register `func(statements) -> statements` to run at opt levels >= `level`.
+    Passes run in registration order; re-registering a name replaces it."""
+    if func is None:
+        return lambda f: register_pass(name, level, f)
+    PASSES[:] = [p for p in PASSES if p[0] != name] + [(name, level, func)]
+    return func
+@register_pass('const-propagation', 2)
+def propagate_constants(statements: List[Node]) -> List[Node]:
+    return ConstantPropagator().propagate(statements)
+@register_pass('constant-folding', 1)
+def fold_constants(statements: List[Node]) -> List[Node]:
+    return ConstantFolder().transform_block(statements)
+@register_pass('dead-code', 1)
+def eliminate_dead_code(statements: List[Node]) -> List[Node]:
+    return DeadCodeEliminator().transform_block(statements)
+def optimize(statements: List[Node], level: int = DEFAULT_OPT_LEVEL) -> List[Node]:
+    """Run every registered pass enabled at `level` over `statements`.
+    Level 0 returns the tree untouched, level 1 folds constants and removes
+    dead code, level 2 also propagates `const` bindings."""
+    for _, min_level, func in PASSES:
+        if level >= min_level:
+            statements = func(statements)
+    return statements
@@ -0,0 +1,141 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from .ast_nodes import Node
+from .bytecode import CompiledModule, compile_source, parse_source, read_cache_file, source_hash, write_cache_file
+from .optimizer import DEFAULT_OPT_LEVEL
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".shell_lite", "cache")
+DEFAULT_MAX_ENTRIES = 256
+DEFAULT_MAX_DISK_BYTES = 64 * 1024 * 1024
+class ParseCache:
+    """
+    Parsed modules for `use`/`import` and `execute`, shared by every
+    interpreter in the process. Entries are keyed by content hash (with a
+    path + mtime + size shortcut that skips re-reading unchanged files) and
+    evicted least-recently-used beyond `max_entries`. Imported files are also
+    written to `directory` (~/.shell_lite/cache), which is trimmed to
+    `max_disk_bytes` oldest-first; SHL_NO_CACHE=1 turns the disk layer off.
+    """
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, directory: Optional[str] = DEFAULT_CACHE_DIR,
+                 max_disk_bytes: int = DEFAULT_MAX_DISK_BYTES):
+        self.max_entries = max_entries
+        self.directory = directory
+        self.max_disk_bytes = max_disk_bytes
+        self.entries: "OrderedDict[tuple, object]" = OrderedDict()
+        self.by_stat: Dict[tuple, tuple] = {}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+    def get(self, key: tuple):
+        with self.lock:
+            value = self.entries.get(key)
+            if value is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+            return value
+    def put(self, key: tuple, value):
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+    def load(self, path: str, parser: str = 'legacy', opt_level: int = DEFAULT_OPT_LEVEL) -> CompiledModule:
+        """Return the compiled module for the file at `path`."""
+        info = os.stat(path)
+        stat_key = (os.path.abspath(path), info.st_mtime_ns, info.st_size, parser, opt_level)
+        key = self.by_stat.get(stat_key)
+        if key is not None:
+            module = self.get(key)
+            if module is not None:
+                return module
+        with open(path, 'r', encoding='utf-8') as f:
+            source = f.read()
+        digest = source_hash(source)
+        key = ('module', digest, parser, opt_level)
+        if len(self.by_stat) >= self.max_entries * 4:
+            self.by_stat.clear()
+        self.by_stat[stat_key] = key
+        module = self.get(key)
+        if module is not None:
+            return module
+        module = self.read_disk(digest, parser, opt_level)
+        if module is None:
+            with self.lock:
+                self.misses += 1
+            module = compile_source(source, path, parser, opt_level)
+            self.write_disk(module)
+        else:
+            with self.lock:
+                self.disk_hits += 1
+        self.put(key, module)
+        return module
+    def parse(self, source: str, parser: str = 'legacy') -> List[Node]:
+        """Return resolved statements for a source string (memory only)."""
+        key = ('source', source_hash(source), parser)
+        statements = self.get(key)
+        if statements is not None:
+            return statements
+        from .resolver import resolve
+        with self.lock:
+            self.misses += 1
+        statements = resolve(parse_source(source, parser))
+        self.put(key, statements)
+        return statements
+    def disk_path(self, digest: str, parser: str, opt_level: int) -> Optional[str]:
+        if not self.directory or os.environ.get('SHL_NO_CACHE'):
+            return None
+        return os.path.join(self.directory, f"{digest}.{parser}.{opt_level}.shlc")
+    def read_disk(self, digest: str, parser: str, opt_level: int) -> Optional[CompiledModule]:
+        target = self.disk_path(digest, parser, opt_level)
+        if target is None:
+            return None
+        module = read_cache_file(target, digest, parser, opt_level)
+        if module is not None:
+            try:
+                os.utime(target)
+            except OSError:
+                pass
+        return module
+    def write_disk(self, module: CompiledModule):
+        target = self.disk_path(module.source_hash, module.parser, module.opt_level)
+        if target is None:
+            return
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+        except OSError:
+            return
+        write_cache_file(target, module)
+        self.trim_disk()
+    def trim_disk(self):
+        files: List[Tuple[float, int, str]] = []
+        try:
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    if entry.name.endswith('.shlc'):
+                        info = entry.stat()
+                        files.append((info.st_mtime, info.st_size, entry.path))
+        except OSError:
+            return
+        total = sum(size for _, size, _ in files)
+        for _, size, file_path in sorted(files):
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(file_path)
+                total -= size
+            except OSError:
+                pass
+    def stats(self) -> Dict[str, int]:
+        with self.lock:
+            return {'hits': self.hits, 'disk_hits': self.disk_hits, 'misses': self.misses,
+                    'evictions': self.evictions, 'entries': len(self.entries)}
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.by_stat.clear()
+            self.hits = self.disk_hits = self.misses = self.evictions = 0
+PARSE_CACHE = ParseCache()
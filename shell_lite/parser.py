@@ -1,4 +1,5 @@
-from typing import List, Optional
+from collections import deque
+from typing import Iterable, Iterator, List, Optional
 from .lexer import Token, Lexer
 from .ast_nodes import *
 import re
@@ -19,7 +20,9 @@ class Parser:
     def check(self, token_type: str) -> bool:
         return self.peek().type == token_type
     def parse(self) -> List[Node]:
-        statements = []
+        return list(self.iter_parse())
+    def iter_parse(self) -> Iterator[Node]:
+        """Yield top-level statements one at a time as they are parsed."""
         while not self.check('EOF'):
             while self.check('NEWLINE'):
                 self.consume()
@@ -27,8 +30,7 @@ class Parser:
             if self.check('EOF'): break
             stmt = self.parse_statement()
             if stmt:
-                statements.append(stmt)
-        return statements
+                yield stmt
     def parse_statement(self) -> Node:
         if self.check('USE') or self.check('IMPORT'):
             return self.parse_import()
@@ -2163,4 +2165,29 @@ class Parser:
         self.consume('DEDENT')
         node = While(condition, body)
         node.line = start_token.line
-        return node
\ No newline at end of file
+        return node
+class StreamingParser(Parser):
+    """
+    Parser over a token iterator such as Lexer.stream(). Only the tokens the
+    grammar looks ahead at (at most four) are buffered, so iter_parse() holds
+    one statement's worth of tokens at a time rather than the whole file.
+    """
+    def __init__(self, tokens: Iterable[Token]):
+        self.stream = (t for t in tokens if t.type != 'COMMENT')
+        self.buffer = deque()
+        self.last: Optional[Token] = None
+    def peek(self, offset: int = 0) -> Token:
+        buffer = self.buffer
+        while len(buffer) <= offset:
+            token = next(self.stream, None)
+            if token is None:
+                return buffer[-1] if buffer else self.last
+            buffer.append(token)
+        return buffer[offset]
+    def consume(self, expected_type: str = None) -> Token:
+        token = self.peek()
+        if expected_type and token.type != expected_type:
+            raise SyntaxError(f"Expected {expected_type} but got {token.type} on line {token.line}")
+        if self.buffer:
+            self.last = self.buffer.popleft()
+        return token
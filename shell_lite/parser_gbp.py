@@ -1,8 +1,10 @@
-from dataclasses import dataclass, field
-from typing import List, Optional, Any, Callable
+import os
+from dataclasses import field
+from typing import List, Optional, Any, Callable, Iterable, Iterator
 from .lexer import Token
 from .ast_nodes import *
-@dataclass
+from .ast_nodes import slotted
+@slotted
 class GeoNode:
     """Represents a topological node in the source code geometry."""
     head_token: Token
@@ -13,32 +15,119 @@ class GeoNode:
     parent: Optional['GeoNode'] = None
     def __repr__(self):
         return f"GeoNode(line={self.line}, indent={self.indent_level}, head={self.head_token.type})"
+PRECEDENCE = {
+    'OR': 1, 'AND': 2, 'NOT': 3,
+    'EQ': 4, 'NEQ': 4, 'LT': 5, 'GT': 5, 'LE': 5, 'GE': 5, 'IS': 5,
+    'PLUS': 6, 'MINUS': 6,
+    'MUL': 7, 'DIV': 7, 'MOD': 7,
+    'POW': 8,
+    'DOT': 9, 'LPAREN': 10, 'LBRACKET': 10
+}
+BINARY_OPS = {
+    'PLUS': '+', 'MINUS': '-', 'MUL': '*', 'DIV': '/', 'MOD': '%',
+    'LT': '<', 'GT': '>', 'LE': '<=', 'GE': '>=', 'EQ': '==', 'NEQ': '!=',
+    'AND': 'and', 'OR': 'or'
+}
+PARALLEL_MIN_ROOTS = 2000
+_shared_roots: List[GeoNode] = []
+def bind_roots(roots) -> List[Node]:
+    """
+    Bind a shard of top-level GeoNodes; the worker side of parse_parallel.
+    `roots` is a list of GeoNodes, or a (start, stop) range into the roots a
+    forked worker inherited from its parent.
+    """
+    if isinstance(roots, tuple):
+        roots = _shared_roots[roots[0]:roots[1]]
+    parser = GeometricBindingParser([])
+    return [ast_node for ast_node in map(parser.bind_node, roots) if ast_node]
+def apply_op(values: List[Node], ops: List[str]):
+    op_type = ops.pop()
+    if len(values) >= 2:
+        right = values.pop()
+        left = values.pop()
+        values.append(BinOp(left, BINARY_OPS.get(op_type, op_type), right))
+def split_items(tokens: List[Token], start: int, end: int, open_type: str, close_type: str):
+    """
+    Split tokens[start:end], which follows an opening bracket, at top-level
+    commas up to the matching close. Returns the non-empty item ranges and
+    the index of the closing token (`end` if it is missing, in which case
+    the unfinished last item is dropped).
+    """
+    ranges = []
+    depth = 1
+    item_start = start
+    j = start
+    while j < end:
+        token_type = tokens[j].type
+        if token_type == open_type:
+            depth += 1
+        elif token_type == close_type:
+            depth -= 1
+            if depth == 0:
+                if item_start < j:
+                    ranges.append((item_start, j))
+                return ranges, j
+        elif token_type == 'COMMA' and depth == 1:
+            if item_start < j:
+                ranges.append((item_start, j))
+            item_start = j + 1
+        j += 1
+    return ranges, j
 class GeometricBindingParser:
-    def __init__(self, tokens: List[Token]):
-        self.tokens = [t for t in tokens if t.type != 'COMMENT']
+    def __init__(self, tokens: Iterable[Token]):
+        self.tokens = tokens
         self.root_nodes: List[GeoNode] = []
-        self.precedence = {
-            'OR': 1, 'AND': 2, 'NOT': 3,
-            'EQ': 4, 'NEQ': 4, 'LT': 5, 'GT': 5, 'LE': 5, 'GE': 5, 'IS': 5,
-            'PLUS': 6, 'MINUS': 6,
-            'MUL': 7, 'DIV': 7, 'MOD': 7,
-            'POW': 8,
-            'DOT': 9, 'LPAREN': 10, 'LBRACKET': 10
-        }
+        self.precedence = PRECEDENCE
     def parse(self) -> List[Node]:
         """Main entry point."""
-        self.topology_scan()
-        ast_nodes = []
-        for geo_node in self.root_nodes:
+        return list(self.iter_parse())
+    def iter_parse(self) -> Iterator[Node]:
+        """Bind and yield each top-level statement as soon as its GeoNode is
+        complete, so a token stream is never held in full."""
+        for geo_node in self.iter_roots():
             ast_node = self.bind_node(geo_node)
             if ast_node:
-                ast_nodes.append(ast_node)
-        return ast_nodes
+                yield ast_node
+    def parse_parallel(self, workers: Optional[int] = None, min_roots: int = PARALLEL_MIN_ROOTS) -> List[Node]:
+        """
+        Opt-in parallel parse for very large files. Binding one root never
+        looks at another, so after the topology scan the roots are split into
+        contiguous shards, bound in a process pool and concatenated in source
+        order. Where fork is available the workers inherit the roots and only
+        index ranges are sent; the bound ASTs still come back pickled, so this
+        pays off only with several cores. Inputs with fewer than `min_roots`
+        roots, or a single worker, are bound here instead.
+        """
+        global _shared_roots
+        roots = list(self.iter_roots())
+        workers = workers or os.cpu_count() or 1
+        if workers <= 1 or len(roots) < min_roots:
+            return bind_roots(roots)
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        size = -(-len(roots) // (workers * 2))
+        bounds = [(i, min(i + size, len(roots))) for i in range(0, len(roots), size)]
+        if 'fork' in multiprocessing.get_all_start_methods():
+            context = multiprocessing.get_context('fork')
+            shards = bounds
+            _shared_roots = roots
+        else:
+            context = None
+            shards = [roots[start:stop] for start, stop in bounds]
+        try:
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+                return [ast_node for bound in pool.map(bind_roots, shards) for ast_node in bound]
+        finally:
+            _shared_roots = []
     def topology_scan(self):
+        self.root_nodes.extend(self.iter_roots())
+    def iter_roots(self) -> Iterator[GeoNode]:
         """
         Phase 1: Scans tokens to build GeoNodes.
         Phase 2: Links them into a tree based on nesting.
+        A root node is yielded once the next root starts (or at EOF).
         """
+        root: Optional[GeoNode] = None
         node_stack: List[GeoNode] = []
         current_tokens_accumulator = []
         current_node: Optional[GeoNode] = None
@@ -47,6 +136,8 @@ class GeometricBindingParser:
         for token in self.tokens:
             if token.type == 'EOF':
                 break
+            if token.type == 'COMMENT':
+                continue
             if token.type == 'INDENT':
                 parent_to_push = current_node if current_node else last_line_node
                 if parent_to_push:
@@ -73,9 +164,13 @@ class GeometricBindingParser:
                     parent.children.append(current_node)
                     current_node.parent = parent
                 else:
-                    self.root_nodes.append(current_node)
+                    if root is not None:
+                        yield root
+                    root = current_node
             else:
                 current_node.tokens.append(token)
+        if root is not None:
+            yield root
     def bind_node(self, node: GeoNode) -> Node:
         """Phase 2: Semantic Binding Dispatcher."""
         head_type = node.head_token.type
@@ -120,21 +215,19 @@ class GeometricBindingParser:
             return node.tokens[offset].type
         return ""
     def bind_if(self, node: GeoNode) -> If:
-        expr_tokens = self._extract_expr_tokens(node.tokens, start=1)
-        condition = self.parse_expr_iterative(expr_tokens)
+        condition = self.parse_expr_iterative(node.tokens, *self._expr_range(node.tokens, 1))
         body = [self.bind_node(child) for child in node.children]
         else_body = None
         return If(condition, body, else_body)
     def bind_while(self, node: GeoNode) -> While:
-        expr_tokens = self._extract_expr_tokens(node.tokens, start=1)
-        condition = self.parse_expr_iterative(expr_tokens)
+        condition = self.parse_expr_iterative(node.tokens, *self._expr_range(node.tokens, 1))
         body = [self.bind_node(child) for child in node.children]
         return While(condition, body)
     def bind_repeat(self, node: GeoNode) -> Repeat:
-        expr_tokens = self._extract_expr_tokens(node.tokens, start=1)
-        if expr_tokens and expr_tokens[-1].type == 'TIMES':
-            expr_tokens.pop()
-        count = self.parse_expr_iterative(expr_tokens)
+        start, end = self._expr_range(node.tokens, 1)
+        if start < end and node.tokens[end - 1].type == 'TIMES':
+            end -= 1
+        count = self.parse_expr_iterative(node.tokens, start, end)
         body = [self.bind_node(child) for child in node.children]
         return Repeat(count, body)
     def bind_forever(self, node: GeoNode) -> Forever:
@@ -152,30 +245,19 @@ class GeometricBindingParser:
         if in_index == -1:
              if node.head_token.type == 'LOOP':
                  if node.tokens[-1].type == 'TIMES':
-                     expr_tokens = self._extract_expr_tokens(node.tokens, start=1)
-                     expr_tokens.pop()
-                     count = self.parse_expr_iterative(expr_tokens)
+                     start, end = self._expr_range(node.tokens, 1)
+                     count = self.parse_expr_iterative(node.tokens, start, end - 1)
                      body = [self.bind_node(child) for child in node.children]
                      return Repeat(count, body)
              return None
-        range_index = -1
-        for i, t in enumerate(node.tokens):
-            if t.type == 'RANGE':
-                range_index = i
-                break
-        if range_index != -1:
-             args_tokens = node.tokens[range_index+1:]
-             pass
-        iterable_tokens = self._extract_expr_tokens(node.tokens, start=in_index+1)
-        iterable = self.parse_expr_iterative(iterable_tokens)
+        iterable = self.parse_expr_iterative(node.tokens, *self._expr_range(node.tokens, in_index + 1))
         body = [self.bind_node(child) for child in node.children]
         if node.tokens[in_index+1].type == 'RANGE':
-             args_tokens = self._extract_expr_tokens(node.tokens, start=in_index+2)
+             k, end = self._expr_range(node.tokens, in_index + 2)
              range_args = []
-             k = 0
-             while k < len(args_tokens):
-                 if args_tokens[k].type in ('NUMBER', 'STRING', 'ID'):
-                     t = args_tokens[k]
+             while k < end:
+                 if node.tokens[k].type in ('NUMBER', 'STRING', 'ID'):
+                     t = node.tokens[k]
                      val = None
                      if t.type == 'NUMBER':
                          val = Number(int(t.value) if '.' not in t.value else float(t.value))
@@ -188,12 +270,10 @@ class GeometricBindingParser:
              iterable = Call('range', range_args)
         return ForIn(var_name, iterable, body)
     def bind_print(self, node: GeoNode) -> Print:
-        expr_tokens = self._extract_expr_tokens(node.tokens, start=1)
-        expr = self.parse_expr_iterative(expr_tokens)
+        expr = self.parse_expr_iterative(node.tokens, *self._expr_range(node.tokens, 1))
         return Print(expr)
     def bind_return(self, node: GeoNode) -> Return:
-        expr_tokens = self._extract_expr_tokens(node.tokens, start=1)
-        expr = self.parse_expr_iterative(expr_tokens)
+        expr = self.parse_expr_iterative(node.tokens, *self._expr_range(node.tokens, 1))
         return Return(expr)
     def bind_assignment(self, node: GeoNode) -> Assign:
         assign_idx = -1
@@ -202,18 +282,17 @@ class GeometricBindingParser:
                 assign_idx = i
                 break
         name = node.tokens[0].value
-        expr_tokens = node.tokens[assign_idx+1:]
-        value = self.parse_expr_iterative(expr_tokens)
+        value = self.parse_expr_iterative(node.tokens, assign_idx + 1)
         return Assign(name, value)
     def bind_expression_stmt(self, node: GeoNode) -> Any:
         return self.parse_expr_iterative(node.tokens)
     def bind_start(self, node: GeoNode) -> Listen:
         return Listen(Number(8080))
     def bind_listen(self, node: GeoNode) -> Listen:
-        expr_tokens = self._extract_expr_tokens(node.tokens, start=1)
-        if expr_tokens and expr_tokens[0].type == 'PORT':
-             expr_tokens.pop(0)
-        port = self.parse_expr_iterative(expr_tokens)
+        start, end = self._expr_range(node.tokens, 1)
+        if start < end and node.tokens[start].type == 'PORT':
+             start += 1
+        port = self.parse_expr_iterative(node.tokens, start, end)
         return Listen(port)
     def bind_func(self, node: GeoNode) -> FunctionDef:
         start = 1
@@ -221,7 +300,8 @@ class GeometricBindingParser:
         name = node.tokens[start].value
         args = []
         collecting_args = False
-        for t in node.tokens[start+1:]:
+        for k in range(start + 1, len(node.tokens)):
+            t = node.tokens[k]
             if t.type == 'USING':
                 collecting_args = True
                 continue
@@ -242,9 +322,9 @@ class GeometricBindingParser:
         tokens = node.tokens
         for i, t in enumerate(tokens):
             if t.type == 'FROM' and i+1 < len(tokens):
-                folder = self.parse_expr_iterative([tokens[i+1]])
+                folder = self.parse_expr_iterative(tokens, i + 1, i + 2)
             if t.type == 'AT' and i+1 < len(tokens):
-                url = self.parse_expr_iterative([tokens[i+1]])
+                url = self.parse_expr_iterative(tokens, i + 1, i + 2)
         return ServeStatic(folder, url)
     def bind_define(self, node: GeoNode) -> FunctionDef:
         tokens = node.tokens
@@ -320,104 +400,56 @@ class GeometricBindingParser:
                 body = [self.bind_node(child) for child in node.children]
             return Call(name, args, kwargs=kwargs, body=body)
         return self.parse_expr_iterative(tokens)
-    def _extract_expr_tokens(self, tokens: List[Token], start: int = 0) -> List[Token]:
+    def _expr_range(self, tokens: List[Token], start: int = 0):
+        """(start, end) of the expression after the head keyword, without a trailing colon."""
         end = len(tokens)
         if tokens[-1].type == 'COLON':
             end -= 1
-        return tokens[start:end]
-    def parse_expr_iterative(self, tokens: List[Token]) -> Node:
+        return start, end
+    def parse_expr_iterative(self, tokens: List[Token], start: int = 0, end: Optional[int] = None) -> Node:
         """
-        Shunting-yard variant to produce AST directly.
+        Shunting-yard variant to produce AST directly from tokens[start:end].
         Two stacks: 
         1. values: [Node]
         2. ops: [Token (operator)]
+        Nested list items and call arguments are parsed as sub-ranges of the
+        same token list, so nothing is copied.
         """
-        if not tokens: return None
+        if end is None:
+            end = len(tokens)
+        if start >= end: return None
         values: List[Node] = []
         ops: List[str] = []
-        def apply_op():
-            if not ops: return
-            op_type = ops.pop()
-            if len(values) >= 2:
-                right = values.pop()
-                left = values.pop()
-                op_map = {
-                    'PLUS': '+', 'MINUS': '-', 'MUL': '*', 'DIV': '/', 'MOD': '%',
-                    'LT': '<', 'GT': '>', 'LE': '<=', 'GE': '>=', 'EQ': '==', 'NEQ': '!=',
-                    'AND': 'and', 'OR': 'or'
-                }
-                op_str = op_map.get(op_type, op_type)
-                values.append(BinOp(left, op_str, right))
-        def precedence(op_type):
-            return self.precedence.get(op_type, 0)
-        i = 0
-        while i < len(tokens):
+        precedence = self.precedence
+        i = start
+        while i < end:
             t = tokens[i]
-            if t.type == 'NUMBER':
+            token_type = t.type
+            if token_type == 'NUMBER':
                 values.append(Number(int(t.value) if '.' not in t.value else float(t.value)))
-            elif t.type == 'STRING':
+            elif token_type == 'STRING':
                 values.append(String(t.value))
-            elif t.type == 'LBRACKET':
-                depth = 1
-                j = i + 1
-                elements_tokens = []
-                current_elem = []
-                while j < len(tokens):
-                    if tokens[j].type == 'LBRACKET': depth += 1
-                    elif tokens[j].type == 'RBRACKET': depth -= 1
-                    if depth == 0:
-                        if current_elem: elements_tokens.append(current_elem)
-                        break
-                    if tokens[j].type == 'COMMA' and depth == 1:
-                        elements_tokens.append(current_elem)
-                        current_elem = []
-                    else:
-                        current_elem.append(tokens[j])
-                    j += 1
-                items = [self.parse_expr_iterative(elem) for elem in elements_tokens if elem]
-                values.append(ListVal(items))
-                i = j
-            elif t.type == 'ID':
-                if i+1 < len(tokens) and tokens[i+1].type == 'LPAREN':
-                     name = t.value
-                     depth = 1
-                     j = i + 2
-                     elements_tokens = []
-                     current_elem = []
-                     arg_tokens_start = j
-                     if j < len(tokens) and tokens[j].type == 'RPAREN':
-                         i = j
-                         values.append(Call(name, []))
-                     else:
-                         while j < len(tokens):
-                             if tokens[j].type == 'LPAREN': depth += 1
-                             elif tokens[j].type == 'RPAREN': depth -= 1
-                             if depth == 0:
-                                 if current_elem: elements_tokens.append(current_elem)
-                                 break
-                             if tokens[j].type == 'COMMA' and depth == 1:
-                                 elements_tokens.append(current_elem)
-                                 current_elem = []
-                             else:
-                                 current_elem.append(tokens[j])
-                             j += 1
-                         args = [self.parse_expr_iterative(elem) for elem in elements_tokens if elem]
-                         values.append(Call(name, args))
-                         i = j
+            elif token_type == 'LBRACKET':
+                ranges, i = split_items(tokens, i + 1, end, 'LBRACKET', 'RBRACKET')
+                values.append(ListVal([self.parse_expr_iterative(tokens, a, b) for a, b in ranges]))
+            elif token_type == 'ID':
+                if i + 1 < end and tokens[i + 1].type == 'LPAREN':
+                    ranges, i = split_items(tokens, i + 2, end, 'LPAREN', 'RPAREN')
+                    values.append(Call(t.value, [self.parse_expr_iterative(tokens, a, b) for a, b in ranges]))
                 else:
                     values.append(VarAccess(t.value))
-            elif t.type == 'LPAREN':
+            elif token_type == 'LPAREN':
                 ops.append('LPAREN')
-            elif t.type == 'RPAREN':
+            elif token_type == 'RPAREN':
                 while ops and ops[-1] != 'LPAREN':
-                    apply_op()
+                    apply_op(values, ops)
                 if ops: ops.pop()
-            elif t.type in self.precedence:
-                while (ops and ops[-1] != 'LPAREN' and
-                       precedence(ops[-1]) >= precedence(t.type)):
-                    apply_op()
-                ops.append(t.type)
+            elif token_type in precedence:
+                level = precedence[token_type]
+                while ops and ops[-1] != 'LPAREN' and precedence[ops[-1]] >= level:
+                    apply_op(values, ops)
+                ops.append(token_type)
             i += 1
         while ops:
-            apply_op()
-        return values[0] if values else None
\ No newline at end of file
+            apply_op(values, ops)
+        return values[0] if values else None
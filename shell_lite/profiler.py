@@ -0,0 +1,430 @@
+import sys
+import threading
+import time
+from typing import Dict, List, Optional, TextIO
+from .interpreter import CALL_BUILTIN, Completion, Environment, Frame, Interpreter
+MODULE_FRAME = '<module>'
+def saved_methods(interpreter: Interpreter, names) -> Dict[str, object]:
+    """Instance-level overrides of `names` (wrappers installed by another
+    instrument), so that several instruments can be stacked."""
+    return {name: interpreter.__dict__.get(name) for name in names}
+def restore_methods(interpreter: Interpreter, saved: Dict[str, object], installed: Optional[Dict[str, object]] = None):
+    """Put back `saved`. With `installed` (the instrument's own wrappers),
+    a method that has since been wrapped again by another instrument is left
+    alone: its wrapper stays in the chain, and must pass calls through."""
+    for name, method in saved.items():
+        if installed is not None and interpreter.__dict__.get(name) is not installed[name]:
+            continue
+        if method is None:
+            interpreter.__dict__.pop(name, None)
+        else:
+            interpreter.__dict__[name] = method
+class Stat:
+    __slots__ = ('count', 'self_time', 'inclusive', 'cpu', 'active')
+    def __init__(self):
+        self.count = 0
+        self.self_time = 0.0
+        self.inclusive = 0.0
+        self.cpu = 0.0
+        self.active = 0
+class Profiler:
+    """
+    Deterministic profiler for the tree-walking interpreter. `attach()` puts
+    wrappers for `visit`, `_run_function` and `_run_method` on one
+    Interpreter instance (shadowing the class methods), and `detach()`
+    removes them, so an interpreter that is not being profiled runs the
+    unmodified code. Time is attributed to ShellLite lines, keyed by the
+    user function (or `Structure.method`) they run in, and to the functions
+    themselves. Only the thread that attached is profiled; other threads
+    (HTTP handlers) pass straight through.
+    """
+    def __init__(self, filename: str = '<string>'):
+        self.filename = filename
+        self.lines: Dict[tuple, Stat] = {}
+        self.functions: Dict[str, Stat] = {}
+        self.stacks: Dict[str, float] = {}
+        self.interpreter: Optional[Interpreter] = None
+        self.thread = None
+        self.frame = MODULE_FRAME
+        self.path = MODULE_FRAME
+        self.line = 0
+        self.child_time = 0.0
+        self.callee_time = 0.0
+        self.wall = 0.0
+        self.cpu = 0.0
+    def attach(self, interpreter: Interpreter):
+        self.interpreter = interpreter
+        self.thread = threading.get_ident()
+        self.saved = saved_methods(interpreter, ('visit', '_run_function', '_run_method'))
+        visit, run_function, run_method = interpreter.visit, interpreter._run_function, interpreter._run_method
+        interpreter.visit = lambda node: self.visit(visit, node)
+        interpreter._run_function = lambda func_def, env: self.call(func_def.name, run_function, func_def, env)
+        interpreter._run_method = lambda instance, method, env: self.call(
+            f"{instance.class_def.name}.{method.name}", run_method, instance, method, env)
+        self.installed = saved_methods(interpreter, self.saved)
+        self.started = (time.perf_counter(), time.process_time())
+        return self
+    def detach(self):
+        if self.interpreter is not None:
+            restore_methods(self.interpreter, self.saved, self.installed)
+            self.thread = None
+            self.wall += time.perf_counter() - self.started[0]
+            self.cpu += time.process_time() - self.started[1]
+            self.interpreter = None
+    def __enter__(self):
+        return self
+    def __exit__(self, *exc):
+        self.detach()
+    def visit(self, visit, node):
+        line = node.line
+        if not line or line == self.line or threading.get_ident() != self.thread:
+            return visit(node)
+        key = (self.frame, line)
+        stat = self.lines.get(key)
+        if stat is None:
+            stat = self.lines[key] = Stat()
+        outer_line, outer_child = self.line, self.child_time
+        self.line, self.child_time = line, 0.0
+        stat.active += 1
+        cpu = time.process_time()
+        start = time.perf_counter()
+        try:
+            return visit(node)
+        finally:
+            elapsed = time.perf_counter() - start
+            own = elapsed - self.child_time
+            stat.count += 1
+            stat.self_time += own
+            stat.active -= 1
+            if not stat.active:
+                stat.inclusive += elapsed
+                stat.cpu += time.process_time() - cpu
+            leaf = f"{self.path};{self.frame}:{line}"
+            self.stacks[leaf] = self.stacks.get(leaf, 0.0) + own
+            self.line, self.child_time = outer_line, outer_child + elapsed
+    def call(self, name, run, *args):
+        if threading.get_ident() != self.thread:
+            return run(*args)
+        stat = self.functions.get(name)
+        if stat is None:
+            stat = self.functions[name] = Stat()
+        outer = (self.frame, self.path, self.line, self.child_time, self.callee_time)
+        self.frame, self.path, self.line = name, f"{self.path};{name}", 0
+        self.child_time = self.callee_time = 0.0
+        stat.active += 1
+        cpu = time.process_time()
+        start = time.perf_counter()
+        try:
+            return run(*args)
+        finally:
+            elapsed = time.perf_counter() - start
+            stat.count += 1
+            stat.self_time += elapsed - self.callee_time
+            stat.active -= 1
+            if not stat.active:
+                stat.inclusive += elapsed
+                stat.cpu += time.process_time() - cpu
+            self.frame, self.path, self.line = outer[0], outer[1], outer[2]
+            self.child_time, self.callee_time = outer[3] + elapsed, outer[4] + elapsed
+    def collapsed(self) -> List[str]:
+        """Folded stacks (`<module>;fib;fib:4 1234`, weights in microseconds),
+        the input format of flamegraph.pl, speedscope and inferno."""
+        return [f"{stack} {round(weight * 1e6)}" for stack, weight in sorted(self.stacks.items()) if weight >= 5e-7]
+    def write_collapsed(self, path: str):
+        with open(path, 'w', encoding='utf-8') as f:
+            f.writelines(line + "\n" for line in self.collapsed())
+    def report(self, limit: int = 20, out: Optional[TextIO] = None):
+        """Print the functions and lines with the most self time."""
+        out = out or sys.stderr
+        print(f"\nShellLite profile of {self.filename}: {self.wall:.3f}s wall, {self.cpu:.3f}s cpu", file=out)
+        for title, stats, columns, label in (("Functions", self.functions, ('calls', 'function'), str),
+                                             ("Lines", self.lines, ('hits', 'line'), lambda key: f"line {key[1]} in {key[0]}")):
+            if not stats:
+                continue
+            print(f"\n{title} by self time:", file=out)
+            print(f"  {columns[0]:>8} {'self ms':>10} {'incl ms':>10} {'cpu ms':>10}  {columns[1]}", file=out)
+            ranked = sorted(stats.items(), key=lambda item: item[1].self_time, reverse=True)
+            for key, stat in ranked[:limit]:
+                print(f"  {stat.count:>8} {stat.self_time * 1000:>10.3f} {stat.inclusive * 1000:>10.3f} "
+                      f"{stat.cpu * 1000:>10.3f}  {label(key)}", file=out)
+class MemStat:
+    __slots__ = ('count', 'net', 'peak', 'active')
+    def __init__(self):
+        self.count = 0
+        self.net = 0
+        self.peak = 0
+        self.active = 0
+class MemoryProfiler(Profiler):
+    """
+    `shl run --memprofile`: the Profiler's line and function bookkeeping,
+    measuring tracemalloc's traced memory instead of time. For every line
+    and call it records the net bytes still allocated when it finishes and
+    the highest peak above its starting point, so a statement that builds a
+    huge list (a CSV read, a `db query` fetchall) stands out even if the
+    list is dropped later. Peaks need tracemalloc.reset_peak (Python 3.9+);
+    on 3.8 the peak falls back to the larger of the start and end sizes.
+    """
+    def __init__(self, filename: str = '<string>'):
+        super().__init__(filename)
+        self.high = 0
+        self.peak = 0
+        self.tracing = False
+    def attach(self, interpreter: Interpreter):
+        import tracemalloc
+        self.tracing = not tracemalloc.is_tracing()
+        if self.tracing:
+            tracemalloc.start()
+        self.high = tracemalloc.get_traced_memory()[0]
+        return super().attach(interpreter)
+    def detach(self):
+        import tracemalloc
+        if self.interpreter is not None:
+            super().detach()
+            self.peak = max(self.high, tracemalloc.get_traced_memory()[1])
+            if self.tracing:
+                tracemalloc.stop()
+                self.tracing = False
+    def visit(self, visit, node):
+        line = node.line
+        if not line or line == self.line or threading.get_ident() != self.thread:
+            return visit(node)
+        outer_line, self.line = self.line, line
+        try:
+            return self.measure(self.lines, (self.frame, line), visit, node)
+        finally:
+            self.line = outer_line
+    def call(self, name, run, *args):
+        if threading.get_ident() != self.thread:
+            return run(*args)
+        outer = (self.frame, self.line)
+        self.frame, self.line = name, 0
+        try:
+            return self.measure(self.functions, name, run, *args)
+        finally:
+            self.frame, self.line = outer
+    def measure(self, stats: dict, key, run, *args):
+        import tracemalloc
+        stat = stats.get(key)
+        if stat is None:
+            stat = stats[key] = MemStat()
+        start, peak = tracemalloc.get_traced_memory()
+        outer_high = max(self.high, peak)
+        if hasattr(tracemalloc, 'reset_peak'):
+            tracemalloc.reset_peak()
+        self.high = start
+        stat.active += 1
+        try:
+            return run(*args)
+        finally:
+            end, peak = tracemalloc.get_traced_memory()
+            high = max(self.high, peak, end)
+            stat.count += 1
+            stat.active -= 1
+            if not stat.active:
+                stat.net += end - start
+                stat.peak = max(stat.peak, high - start)
+            self.high = max(outer_high, high)
+    def report(self, limit: int = 20, out: Optional[TextIO] = None):
+        """Print the functions and lines with the highest peaks."""
+        out = out or sys.stderr
+        print(f"\nShellLite memory profile of {self.filename}: peak {self.peak / 1024:.1f} KiB traced", file=out)
+        for title, stats, columns, label in (("Functions", self.functions, ('calls', 'function'), str),
+                                             ("Lines", self.lines, ('hits', 'line'), lambda key: f"line {key[1]} in {key[0]}")):
+            if not stats:
+                continue
+            print(f"\n{title} by peak memory:", file=out)
+            print(f"  {columns[0]:>8} {'net KiB':>12} {'peak KiB':>12}  {columns[1]}", file=out)
+            ranked = sorted(stats.items(), key=lambda item: (item[1].peak, item[1].net), reverse=True)
+            for key, stat in ranked[:limit]:
+                print(f"  {stat.count:>8} {stat.net / 1024:>12.1f} {stat.peak / 1024:>12.1f}  {label(key)}", file=out)
+class ExecutionStats:
+    """
+    Counters for `shl run --stats`: AST nodes visited by type, scopes
+    created, completions re-raised as StopException/SkipException/
+    ReturnException, builtin calls by name and regex compile requests
+    (re._compile, behind re.compile and re.search/match/sub/...). Like
+    Profiler it wraps `visit` on one interpreter only; scope, exception and
+    regex counts need class-level hooks, which are installed by attach() and
+    removed by detach(), so only use it around a single run.
+    """
+    def __init__(self):
+        self.nodes: Dict[str, int] = {}
+        self.scopes: Dict[str, int] = {}
+        self.exceptions: Dict[str, int] = {}
+        self.builtins: Dict[str, int] = {}
+        self.regexes: Dict[str, int] = {}
+        self.interpreter: Optional[Interpreter] = None
+        self.patched = []
+    def attach(self, interpreter: Interpreter):
+        import re
+        self.interpreter = interpreter
+        self.saved = saved_methods(interpreter, ('visit',))
+        visit = interpreter.visit
+        nodes, builtins = self.nodes, self.builtins
+        def counting_visit(node):
+            if self.interpreter is None:
+                return visit(node)
+            kind = type(node).__name__
+            nodes[kind] = nodes.get(kind, 0) + 1
+            result = visit(node)
+            if kind == 'Call' and node.cache is not None and node.cache[0] == CALL_BUILTIN:
+                builtins[node.name] = builtins.get(node.name, 0) + 1
+            return result
+        interpreter.visit = counting_visit
+        self.installed = {'visit': counting_visit}
+        for cls in (Environment, Frame):
+            self.patch(cls, '__init__', self.counter(self.scopes, cls.__init__, lambda env, *a, **k: type(env).__name__))
+        names = {0: 'StopException', 1: 'SkipException'}
+        self.patch(Completion, 'throw', self.counter(self.exceptions, Completion.throw,
+                                                     lambda c: names.get(c.kind, 'ReturnException')))
+        self.patch(re, '_compile', self.counter(self.regexes, re._compile, regex_key))
+        return self
+    def counter(self, counts: Dict[str, int], function, key):
+        def counted(*args, **kwargs):
+            name = key(*args, **kwargs)
+            if name is not None:
+                counts[name] = counts.get(name, 0) + 1
+            return function(*args, **kwargs)
+        return counted
+    def patch(self, owner, name: str, replacement):
+        self.patched.append((owner, name, getattr(owner, name)))
+        setattr(owner, name, replacement)
+    def detach(self):
+        for owner, name, original in reversed(self.patched):
+            setattr(owner, name, original)
+        self.patched = []
+        if self.interpreter is not None:
+            restore_methods(self.interpreter, self.saved, self.installed)
+            self.interpreter = None
+    def report(self, limit: int = 20, out: Optional[TextIO] = None):
+        out = out or sys.stderr
+        print("\nShellLite execution stats:", file=out)
+        for title, counts in (("AST nodes visited", self.nodes), ("Scopes created", self.scopes),
+                              ("Control flow raised as exceptions", self.exceptions),
+                              ("Builtin calls", self.builtins),
+                              ("Regex compiles (re.compile, re.search, ...; incl. re cache hits)", self.regexes)):
+            print(f"\n{title}: {sum(counts.values())}", file=out)
+            for name, count in sorted(counts.items(), key=lambda item: (-item[1], item[0]))[:limit]:
+                print(f"  {count:>10}  {name}", file=out)
+def regex_key(pattern, *args, **kwargs) -> Optional[str]:
+    """Count only the compilations ShellLite itself asks for, not those of
+    stdlib modules imported while the script runs. The caller is the first
+    frame outside the re module (re.search and friends call re._compile)."""
+    frame = sys._getframe(2)
+    while frame is not None and frame.f_globals.get('__name__') == 're':
+        frame = frame.f_back
+    if frame is None or not frame.f_globals.get('__name__', '').startswith('shell_lite'):
+        return None
+    return str(pattern)[:60]
+IDLE_MODULES = ('selectors.py', 'socketserver.py', 'threading.py')
+class SamplingProfiler:
+    """
+    Statistical profiler for long-running scripts (servers, `every` jobs).
+    A background thread wakes every `interval` seconds and reads every other
+    thread's Python stack with sys._current_frames(); the ShellLite stack is
+    recovered from the interpreter's own frames (`visit` holds the current
+    node, `_run_function`/`_run_method` the function chain, `handle_req` the
+    HTTP route), so nothing is added to the interpreter's hot path and it
+    costs nothing while stopped. Threads blocked in the server loop or an
+    `every` sleep are skipped. Counts are written as folded stacks.
+    """
+    def __init__(self, output: str = 'shl-profile.folded', interval: float = 0.005):
+        self.output = output
+        self.interval = interval
+        self.counts: Dict[str, int] = {}
+        self.samples = 0
+        self.lock = threading.Lock()
+        self.thread: Optional[threading.Thread] = None
+        self.stopping = threading.Event()
+        self.codes = {Interpreter.visit.__code__: 'visit', Interpreter._run_function.__code__: 'function',
+                      Interpreter._run_method.__code__: 'method', Interpreter.visit_Every.__code__: 'idle'}
+    @property
+    def running(self) -> bool:
+        return self.thread is not None
+    def start(self):
+        if self.thread is None:
+            self.stopping.clear()
+            self.thread = threading.Thread(target=self.loop, name='shl-sampler', daemon=True)
+            self.thread.start()
+        return self
+    def stop(self) -> int:
+        """Stop sampling and write the folded stacks; returns the sample count."""
+        thread, self.thread = self.thread, None
+        if thread is not None:
+            self.stopping.set()
+            if thread is not threading.current_thread():
+                thread.join()
+            self.write()
+        return self.samples
+    def loop(self):
+        me = threading.get_ident()
+        while not self.stopping.wait(self.interval):
+            stacks = [self.stack(frame) for ident, frame in sys._current_frames().items() if ident != me]
+            with self.lock:
+                for stack in stacks:
+                    if stack:
+                        self.counts[stack] = self.counts.get(stack, 0) + 1
+                        self.samples += 1
+    def stack(self, frame) -> Optional[str]:
+        """The folded ShellLite stack of one thread, or None if it is not
+        running ShellLite code (or is idle)."""
+        codes = self.codes
+        if codes.get(frame.f_code) == 'idle' or frame.f_code.co_filename.endswith(IDLE_MODULES):
+            return None
+        line = 0
+        names = []
+        root = MODULE_FRAME
+        while frame is not None:
+            kind = codes.get(frame.f_code)
+            if kind == 'visit':
+                if not line:
+                    line = getattr(frame.f_locals.get('node'), 'line', 0)
+            elif kind == 'function':
+                names.append(frame.f_locals['func_def'].name)
+            elif kind == 'method':
+                local = frame.f_locals
+                names.append(f"{local['instance'].class_def.name}.{local['method_node'].name}")
+            elif frame.f_code.co_name == 'handle_req' and frame.f_code.co_filename == Interpreter.visit.__code__.co_filename:
+                root = route_label(frame.f_locals)
+                break
+            frame = frame.f_back
+        if not line:
+            return None
+        names.reverse()
+        return ";".join([root] + names + [f"{names[-1] if names else root}:{line}"])
+    def collapsed(self) -> List[str]:
+        with self.lock:
+            return [f"{stack} {count}" for stack, count in sorted(self.counts.items())]
+    def write(self, path: Optional[str] = None):
+        with open(path or self.output, 'w', encoding='utf-8') as f:
+            f.writelines(line + "\n" for line in self.collapsed())
+def route_label(local: dict) -> str:
+    """`GET /user/:id` for a request whose route is known, else `<request>`."""
+    body = local.get('matched_body')
+    interpreter = local.get('interpreter_ref')
+    if body is not None and interpreter is not None:
+        for pattern, _, route_body in interpreter.http_routes:
+            if route_body is body:
+                return f"{local['self'].command} {pattern}"
+    return '<request>'
+SAMPLER: Optional[SamplingProfiler] = None
+def start_sampling(output: str = 'shl-profile.folded', interval_ms: float = 5) -> bool:
+    """Start the process-wide sampler (no-op if it is running)."""
+    global SAMPLER
+    if SAMPLER is not None and SAMPLER.running:
+        return False
+    SAMPLER = SamplingProfiler(str(output), interval_ms / 1000).start()
+    return True
+def stop_sampling() -> int:
+    """Stop the process-wide sampler, write its file and return the sample count."""
+    return SAMPLER.stop() if SAMPLER is not None else 0
+def sampling_on_signal(output: str, interval_ms: float = 5, signum: Optional[int] = None):
+    """Make `signum` (SIGUSR2 by default) switch the sampler on and off; each
+    switch-off rewrites `output`. Call from the main thread."""
+    import signal
+    def toggle(*_):
+        if SAMPLER is not None and SAMPLER.running:
+            stop_sampling()
+        else:
+            start_sampling(output, interval_ms)
+    signal.signal(signum or signal.SIGUSR2, toggle)
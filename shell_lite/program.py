@@ -0,0 +1,55 @@
+import os
+from typing import Any, Callable, Dict, Optional
+from .bytecode import CompiledModule, compile_source
+from .interpreter import Interpreter
+from .optimizer import DEFAULT_OPT_LEVEL
+ENGINES = ('tree', 'closure', 'vm')
+class Program:
+    """
+    A script parsed, optimized and resolved once by `compile()`, runnable any
+    number of times. Each `run()` gets a fresh Interpreter, so runs share no
+    variables, and one Program may be run from several threads at once: the
+    tree is never modified while running apart from call-site caches, which
+    are tagged with the interpreter that filled them.
+    """
+    def __init__(self, module: CompiledModule, filename: str = '<string>'):
+        self.module = module
+        self.filename = filename
+    @property
+    def statements(self):
+        return self.module.statements
+    def run(self, globals: Optional[Dict[str, Any]] = None, engine: str = 'tree',
+            hooks: Optional[Dict[str, Callable]] = None) -> Dict[str, Any]:
+        """Run the program with `globals` predefined and return the globals it
+        ends with. `hooks` maps events ('statement', 'builtin', ...; see
+        Interpreter.add_hook) to callbacks and needs the tree engine. Errors
+        propagate to the caller."""
+        if hooks and engine != 'tree':
+            raise ValueError("hooks are only supported by the 'tree' engine")
+        interpreter = Interpreter()
+        for name, value in (globals or {}).items():
+            interpreter.global_env.set(name, value)
+        for event, callback in (hooks or {}).items():
+            interpreter.add_hook(event, callback)
+        if engine == 'vm':
+            from .vm import VM
+            VM(interpreter).run(self.module.code)
+        elif engine == 'closure':
+            from .closure_compiler import ClosureCompiler
+            ClosureCompiler(interpreter).run(self.module.statements)
+        elif engine == 'tree':
+            interpreter.run_statements(self.module.statements)
+        else:
+            raise ValueError(f"Unknown engine '{engine}'. Choose one of: " + ", ".join(ENGINES))
+        if hooks:
+            interpreter.clear_hooks()
+        builtins = interpreter.builtins
+        return {name: value for name, value in interpreter.global_env.variables.items() if builtins.get(name) is not value}
+    def __repr__(self):
+        return f"<Program {self.filename} ({len(self.module.statements)} statements)>"
+def compile(source: str, filename: str = '<string>', parser: Optional[str] = None, opt_level: int = DEFAULT_OPT_LEVEL) -> Program:
+    """Parse, optimize and resolve `source` into a reusable Program.
+    `parser` defaults to 'gbp', or 'legacy' when USE_LEGACY_PARSER=1."""
+    if parser is None:
+        parser = 'legacy' if os.environ.get('USE_LEGACY_PARSER') == '1' else 'gbp'
+    return Program(compile_source(source, filename, parser, opt_level), filename)
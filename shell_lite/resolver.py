@@ -0,0 +1,141 @@
+from dataclasses import fields
+from typing import Dict, List, Optional
+from .ast_nodes import *
+SKIP_FIELDS = ('line', 'scope', 'layout', 'cache')
+class Resolver:
+    """
+    Static pass that gives function bodies and `for each` / `repeat` /
+    list-comprehension scopes a fixed slot layout, and annotates variable
+    reads with (depth, slot, layout) and writes with (slot, layout).
+    Names that are not bound in any enclosing slot scope (globals, builtins,
+    module-level variables) are left unresolved and keep using name lookup.
+    `return f(...)` statements in tail position of `f` itself are flagged so
+    the engines can run them as a loop instead of a nested call.
+    The interpreter checks the layout identity at run time, so an annotation
+    that does not match the live frame chain simply takes the slow path.
+    """
+    def resolve(self, statements: List[Node]) -> List[Node]:
+        self.resolve_block(statements, [None])
+        return statements
+    def resolve_block(self, statements: Optional[List[Node]], chain: list):
+        for stmt in statements or []:
+            self.resolve_node(stmt, chain)
+    def resolve_node(self, node: Node, chain: list):
+        if isinstance(node, list):
+            for item in node:
+                self.resolve_node(item, chain)
+            return
+        if isinstance(node, tuple):
+            for item in node:
+                if isinstance(item, (Node, list, tuple)):
+                    self.resolve_node(item, chain)
+            return
+        if not isinstance(node, Node):
+            return
+        method = getattr(self, f'resolve_{type(node).__name__}', None)
+        if method is not None:
+            method(node, chain)
+        else:
+            self.resolve_children(node, chain)
+    def resolve_children(self, node: Node, chain: list):
+        for f in fields(node):
+            if f.name not in SKIP_FIELDS:
+                value = getattr(node, f.name)
+                if isinstance(value, (Node, list, tuple)):
+                    self.resolve_node(value, chain)
+    def lookup(self, name: str, chain: list) -> Optional[tuple]:
+        for depth, scope in enumerate(chain):
+            if scope is None:
+                return None
+            if name in scope:
+                return (depth, scope[name], scope) if isinstance(scope, dict) else None
+        return None
+    def resolve_VarAccess(self, node: VarAccess, chain: list):
+        node.scope = self.lookup(node.name, chain)
+    def resolve_Assign(self, node: Assign, chain: list):
+        self.resolve_node(node.value, chain)
+        scope = chain[0]
+        if isinstance(scope, dict) and node.name in scope:
+            node.scope = (scope[node.name], scope)
+    def resolve_FunctionDef(self, node: FunctionDef, chain: list):
+        for _, default, _ in node.args:
+            if default is not None:
+                self.resolve_node(default, [None])
+        layout = new_layout([arg_name for arg_name, _, _ in node.args], node.body)
+        node.layout = layout
+        mark_tail_calls(node.name, node.body)
+        self.resolve_block(node.body, [layout, None])
+    def resolve_ClassDef(self, node: ClassDef, chain: list):
+        self.resolve_node(node.properties, [None])
+        for method in node.methods:
+            for _, default, _ in method.args:
+                if default is not None:
+                    self.resolve_node(default, [None])
+            self.resolve_block(method.body, [None])
+    def resolve_Lambda(self, node: Lambda, chain: list):
+        self.resolve_node(node.body, [frozenset(node.params)] + chain)
+    def resolve_ForIn(self, node: ForIn, chain: list):
+        self.resolve_node(node.iterable, chain)
+        node.layout = new_layout([node.var_name], node.body)
+        self.resolve_block(node.body, [node.layout] + chain)
+    def resolve_Repeat(self, node: Repeat, chain: list):
+        self.resolve_node(node.count, chain)
+        node.layout = new_layout(['index'], node.body)
+        self.resolve_block(node.body, [node.layout] + chain)
+    def resolve_ListComprehension(self, node: ListComprehension, chain: list):
+        self.resolve_node(node.iterable, chain)
+        node.layout = new_layout([node.var_name], [])
+        inner = [node.layout] + chain
+        self.resolve_node(node.expr, inner)
+        if node.condition is not None:
+            self.resolve_node(node.condition, inner)
+    def resolve_ProgressLoop(self, node: ProgressLoop, chain: list):
+        self.resolve_children(node.loop_node, [None])
+def new_layout(params: List[str], body: Optional[List[Node]]) -> Dict[str, int]:
+    layout: Dict[str, int] = {}
+    for name in params:
+        layout.setdefault(name, len(layout))
+    for name in bound_names(body):
+        layout.setdefault(name, len(layout))
+    return layout
+TAIL_BLOCKS = {
+    If: ('body', 'else_body'), Unless: ('body', 'else_body'), While: ('body',), Until: ('body',),
+    For: ('body',), Forever: ('body',), ForIn: ('body',), Repeat: ('body',),
+}
+def mark_tail_calls(name: str, body: Optional[List[Node]]):
+    """Flag `return name(...)` reachable without crossing a try or a nested scope."""
+    for stmt in body or []:
+        if isinstance(stmt, Return):
+            value = stmt.value
+            stmt.tail = isinstance(value, Call) and value.name == name and not value.kwargs and not value.body
+        elif isinstance(stmt, When):
+            for _, case_body in stmt.cases:
+                mark_tail_calls(name, case_body)
+            mark_tail_calls(name, stmt.otherwise)
+        else:
+            for attr in TAIL_BLOCKS.get(type(stmt), ()):
+                mark_tail_calls(name, getattr(stmt, attr))
+BINDERS = {
+    Assign: 'name', ConstAssign: 'name', Try: 'catch_var', TryAlways: 'catch_var',
+    Instantiation: 'var_name', ImportAs: 'alias',
+}
+SCOPE_NODES = (FunctionDef, ClassDef, Lambda, ForIn, Repeat, ListComprehension)
+def bound_names(body) -> List[str]:
+    """Names a block binds in its own scope, not counting nested scopes."""
+    names: List[str] = []
+    stack = list(reversed(body or []))
+    while stack:
+        node = stack.pop()
+        if isinstance(node, (list, tuple)):
+            stack.extend(reversed(node))
+            continue
+        if not isinstance(node, Node) or isinstance(node, SCOPE_NODES):
+            continue
+        attr = BINDERS.get(type(node))
+        if attr is not None:
+            names.append(getattr(node, attr))
+        children = [getattr(node, f.name) for f in fields(node) if f.name not in SKIP_FIELDS]
+        stack.extend(reversed([c for c in children if isinstance(c, (Node, list, tuple))]))
+    return names
+def resolve(statements: List[Node]) -> List[Node]:
+    return Resolver().resolve(statements)
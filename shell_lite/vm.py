@@ -0,0 +1,439 @@
+import re
+from typing import Any, Dict, List, Optional, Tuple
+from .ast_nodes import FunctionDef
+from .bytecode import *
+from .interpreter import (Completion, Environment, Instance, ReturnException, ShellLiteError,
+                          SkipException, StopException)
+UNSET = object()
+LOOP_BLOCK = 0
+SCOPE_BLOCK = 1
+def _lookup(env: Environment, name: str) -> Any:
+    while env is not None:
+        if name in env.variables:
+            return env.variables[name]
+        env = env.parent
+    return UNSET
+class VMFrame:
+    """Activation record for one CodeObject on the VM's explicit call stack.
+    `saved_env` is the environment to restore when a name-mode frame exits."""
+    __slots__ = ('code', 'slots', 'stack', 'blocks', 'pc', 'saved_env')
+    def __init__(self, code: CodeObject, slots: Optional[List[Any]] = None, saved_env: Any = UNSET):
+        self.code = code
+        self.slots = slots
+        self.stack: List[Any] = []
+        self.blocks: List[tuple] = []
+        self.pc = 0
+        self.saved_env = saved_env
+class VM:
+    """
+    Stack machine for CodeObjects produced by BytecodeCompiler.
+    It shares the Interpreter's environments, functions and builtins, so
+    EVAL_NODE instructions can hand any uncompiled node back to the
+    tree-walker without either side noticing.
+    Calls between ShellLite functions push a VMFrame instead of recursing
+    in Python, and a call directly followed by RETURN_VALUE replaces the
+    caller's frame, so deep and tail recursion do not hit RecursionError.
+    """
+    def __init__(self, interpreter):
+        interpreter.use_engine('vm')
+        self.interpreter = interpreter
+        self.compiler = BytecodeCompiler()
+        self.function_code: Dict[int, Tuple[FunctionDef, CodeObject]] = {}
+    def run(self, code: CodeObject) -> Any:
+        return self.execute(code)
+    def code_for(self, func_def: FunctionDef) -> CodeObject:
+        entry = self.function_code.get(id(func_def))
+        if entry is None or entry[0] is not func_def:
+            entry = (func_def, self.compiler.compile_function(func_def))
+            self.function_code[id(func_def)] = entry
+        return entry[1]
+    def call_function(self, func_def: FunctionDef, args: List[Any]) -> Any:
+        return self.run_frames(self.enter_function(func_def, args))
+    def enter_function(self, func_def: FunctionDef, args: List[Any]) -> VMFrame:
+        interp = self.interpreter
+        if len(args) > len(func_def.args):
+            raise TypeError(f"Function '{func_def.name}' expects max {len(func_def.args)} arguments, got {len(args)}")
+        code = self.code_for(func_def)
+        values = []
+        for i, (arg_name, default_node, type_hint) in enumerate(func_def.args):
+            if i < len(args):
+                val = args[i]
+            elif default_node is not None:
+                val = interp.visit(default_node)
+            else:
+                raise TypeError(f"Missing required argument '{arg_name}' for function '{func_def.name}'")
+            if type_hint:
+                interp._check_type(arg_name, val, type_hint)
+            values.append(val)
+        if code.uses_slots:
+            constants = interp.global_env.constants
+            for arg_name, _, _ in func_def.args:
+                if arg_name in constants:
+                    raise RuntimeError(f"Cannot reassign constant '{arg_name}'")
+            return VMFrame(code, values + [UNSET] * (len(code.varnames) - len(values)))
+        new_env = Environment(parent=interp.global_env)
+        for (arg_name, _, _), val in zip(func_def.args, values):
+            new_env.set(arg_name, val)
+        frame = VMFrame(code, None, interp.current_env)
+        interp.current_env = new_env
+        return frame
+    def _load_global(self, name: str) -> Any:
+        return self._load_from(self.interpreter.global_env, name)
+    def _load_from(self, env: Environment, name: str) -> Any:
+        try:
+            return env.get(name)
+        except NameError:
+            interp = self.interpreter
+            if name in interp.builtins:
+                val = interp.builtins[name]
+                if name in ('random', 'time_now', 'date_str'):
+                    return val()
+                return val
+            func_def = interp.functions.get(name)
+            if func_def is not None:
+                return self.call_function(func_def, [])
+            raise
+    def _callee(self, name: str, slots: Optional[List[Any]], local_slot: int) -> Optional[FunctionDef]:
+        """The user function a CALL_NAME reaches, or None if _call_name must decide."""
+        interp = self.interpreter
+        if name in interp.builtins:
+            return None
+        if slots is None:
+            if _lookup(interp.current_env, name) is not UNSET:
+                return None
+        elif local_slot >= 0 and slots[local_slot] is not UNSET:
+            return None
+        elif name in interp.global_env.variables:
+            return None
+        return interp.functions.get(name)
+    def _call_name(self, name: str, args: List[Any], slots: Optional[List[Any]], local_slot: int) -> Any:
+        interp = self.interpreter
+        builtin = interp.builtins.get(name)
+        if builtin is not None:
+            return builtin(*args)
+        if slots is None:
+            func = _lookup(interp.current_env, name)
+        elif local_slot >= 0 and slots[local_slot] is not UNSET:
+            func = slots[local_slot]
+        else:
+            func = interp.global_env.variables.get(name, UNSET)
+        if func is not UNSET:
+            if callable(func):
+                return func(*args)
+            curr_obj = func
+            if isinstance(curr_obj, (list, dict, str)) or isinstance(curr_obj, Instance):
+                valid_chain = True
+                for val in args:
+                    if isinstance(val, list) and len(val) == 1:
+                        idx = val[0]
+                        try:
+                            curr_obj = curr_obj[idx]
+                        except (IndexError, KeyError) as e:
+                            raise RuntimeError(f"Index/Key error: {e}")
+                        except TypeError:
+                            valid_chain = False
+                            break
+                    else:
+                        valid_chain = False
+                        break
+                if valid_chain:
+                    return curr_obj
+        func_def = interp.functions.get(name)
+        if func_def is None:
+            raise NameError(f"Function '{name}' not defined (and not a variable).")
+        return self.call_function(func_def, args)
+    def _unwind(self, blocks: List[tuple], until_loop: bool) -> Optional[tuple]:
+        while blocks:
+            block = blocks[-1]
+            if block[0] == LOOP_BLOCK:
+                if until_loop:
+                    return block
+                blocks.pop()
+            else:
+                blocks.pop()
+                self.interpreter.current_env = block[1]
+        return None
+    def execute(self, code: CodeObject, slots: Optional[List[Any]] = None) -> Any:
+        """Run `code` to completion and return its RETURN_VALUE result.
+        `slots` holds the locals of a slot-mode function frame; name-mode
+        frames read and write `interpreter.current_env` instead.
+        """
+        return self.run_frames(VMFrame(code, slots))
+    def run_frames(self, frame: VMFrame) -> Any:
+        interp = self.interpreter
+        frames = [frame]
+        error = None
+        while True:
+            try:
+                result = self.step(frame, error)
+            except BaseException as e:
+                frames.pop()
+                if frame.saved_env is not UNSET:
+                    interp.current_env = frame.saved_env
+                if not frames:
+                    raise
+                frame = frames[-1]
+                error = e
+                continue
+            error = None
+            if result.__class__ is VMFrame:
+                code = frame.code
+                if code.is_function and not frame.blocks and code.instructions[frame.pc] == RETURN_VALUE:
+                    frames.pop()
+                    if frame.saved_env is not UNSET:
+                        if result.saved_env is UNSET:
+                            interp.current_env = frame.saved_env
+                        else:
+                            result.saved_env = frame.saved_env
+                frames.append(result)
+                frame = result
+                continue
+            frames.pop()
+            if frame.saved_env is not UNSET:
+                interp.current_env = frame.saved_env
+            if not frames:
+                return result
+            frame = frames[-1]
+            frame.stack.append(result)
+    def step(self, frame: VMFrame, error: Optional[BaseException] = None) -> Any:
+        """Run `frame` until it returns (giving the value) or calls a ShellLite
+        function (giving the callee's VMFrame). A pending `error` raised by a
+        callee is re-raised first so this frame's handlers see it."""
+        interp = self.interpreter
+        code = frame.code
+        ins = code.instructions
+        consts = code.consts
+        names = code.names
+        varnames = code.varnames
+        global_env = interp.global_env
+        slots = frame.slots
+        stack = frame.stack
+        push = stack.append
+        pop = stack.pop
+        blocks = frame.blocks
+        pc = frame.pc
+        while True:
+            try:
+                if error is not None:
+                    pending, error = error, None
+                    raise pending
+                while True:
+                    op = ins[pc]
+                    arg = ins[pc + 1]
+                    pc += 2
+                    if op == LOAD_FAST:
+                        val = slots[arg]
+                        if val is UNSET:
+                            val = self._load_global(varnames[arg])
+                        push(val)
+                    elif op == LOAD_CONST:
+                        push(consts[arg])
+                    elif op == LOAD_NAME:
+                        name = names[arg]
+                        env = interp.current_env
+                        while env is not None:
+                            if name in env.variables:
+                                push(env.variables[name])
+                                break
+                            env = env.parent
+                        else:
+                            push(self._load_from(interp.current_env, name))
+                    elif op == STORE_FAST:
+                        name = varnames[arg]
+                        if name in global_env.constants:
+                            raise RuntimeError(f"Cannot reassign constant '{name}'")
+                        slots[arg] = pop()
+                    elif op == STORE_NAME:
+                        interp.current_env.set(names[arg], pop())
+                    elif op == LOAD_GLOBAL:
+                        name = names[arg]
+                        variables = global_env.variables
+                        if name in variables:
+                            push(variables[name])
+                        else:
+                            push(self._load_global(name))
+                    elif op == POP_JUMP_IF_FALSE:
+                        if not pop():
+                            pc = arg << 1
+                    elif op == POP_JUMP_IF_TRUE:
+                        if pop():
+                            pc = arg << 1
+                    elif op == JUMP:
+                        pc = arg << 1
+                    elif op == BINARY_ADD:
+                        right = pop()
+                        left = stack[-1]
+                        if isinstance(left, str) or isinstance(right, str):
+                            stack[-1] = str(left) + str(right)
+                        else:
+                            stack[-1] = left + right
+                    elif op == BINARY_SUB:
+                        right = pop()
+                        stack[-1] = stack[-1] - right
+                    elif op == COMPARE_LT:
+                        right = pop()
+                        stack[-1] = stack[-1] < right
+                    elif op == COMPARE_GT:
+                        right = pop()
+                        stack[-1] = stack[-1] > right
+                    elif op == COMPARE_LE:
+                        right = pop()
+                        stack[-1] = stack[-1] <= right
+                    elif op == COMPARE_GE:
+                        right = pop()
+                        stack[-1] = stack[-1] >= right
+                    elif op == COMPARE_EQ:
+                        right = pop()
+                        stack[-1] = stack[-1] == right
+                    elif op == COMPARE_NE:
+                        right = pop()
+                        stack[-1] = stack[-1] != right
+                    elif op == BINARY_MUL:
+                        right = pop()
+                        stack[-1] = stack[-1] * right
+                    elif op == BINARY_DIV:
+                        right = pop()
+                        stack[-1] = stack[-1] / right
+                    elif op == BINARY_MOD:
+                        right = pop()
+                        stack[-1] = stack[-1] % right
+                    elif op == CALL_NAME:
+                        name, argc, local_slot = consts[arg]
+                        if argc:
+                            args = stack[-argc:]
+                            del stack[-argc:]
+                        else:
+                            args = []
+                        func_def = self._callee(name, slots, local_slot)
+                        if func_def is None:
+                            push(self._call_name(name, args, slots, local_slot))
+                        else:
+                            frame.pc = pc
+                            return self.enter_function(func_def, args)
+                    elif op == RETURN_VALUE:
+                        val = pop()
+                        self._unwind(blocks, until_loop=False)
+                        return val
+                    elif op == POP_TOP:
+                        pop()
+                    elif op == DUP_TOP:
+                        push(stack[-1])
+                    elif op == FOR_ITER:
+                        try:
+                            push(next(stack[-1]))
+                        except StopIteration:
+                            pc = arg << 1
+                    elif op == SETUP_LOOP:
+                        brk, cont = consts[arg]
+                        blocks.append((LOOP_BLOCK, brk, cont, len(stack)))
+                    elif op == POP_BLOCK:
+                        blocks.pop()
+                    elif op == BREAK_LOOP or op == CONTINUE_LOOP:
+                        block = self._unwind(blocks, until_loop=True)
+                        if block is None:
+                            raise StopException() if op == BREAK_LOOP else SkipException()
+                        del stack[block[3]:]
+                        if op == BREAK_LOOP:
+                            blocks.pop()
+                            pc = block[1] << 1
+                        else:
+                            pc = block[2] << 1
+                    elif op == BINARY_SUBSCR:
+                        index = pop()
+                        obj = stack[-1]
+                        if isinstance(obj, list):
+                            if not isinstance(index, int):
+                                raise TypeError(f"List indices must be integers, got {type(index).__name__}")
+                        elif isinstance(obj, str):
+                            if not isinstance(index, int):
+                                raise TypeError(f"String indices must be integers, got {type(index).__name__}")
+                        elif not isinstance(obj, dict):
+                            raise TypeError(f"'{type(obj).__name__}' object is not subscriptable")
+                        stack[-1] = obj[index]
+                    elif op == BINARY_AND:
+                        right = pop()
+                        stack[-1] = stack[-1] and right
+                    elif op == BINARY_OR:
+                        right = pop()
+                        stack[-1] = stack[-1] or right
+                    elif op == UNARY_NOT:
+                        stack[-1] = not stack[-1]
+                    elif op == BINARY_MATCHES:
+                        pattern = pop()
+                        left = stack[-1]
+                        if hasattr(pattern, 'search'):
+                            stack[-1] = bool(pattern.search(str(left)))
+                        else:
+                            stack[-1] = bool(re.search(str(pattern), str(left)))
+                    elif op == PRINT:
+                        print(stack[-1], flush=True)
+                    elif op == BUILD_LIST:
+                        if arg:
+                            items = stack[-arg:]
+                            del stack[-arg:]
+                        else:
+                            items = []
+                        push(items)
+                    elif op == BUILD_DICT:
+                        items = stack[-2 * arg:] if arg else []
+                        if arg:
+                            del stack[-2 * arg:]
+                        push({items[i]: items[i + 1] for i in range(0, len(items), 2)})
+                    elif op == LIST_APPEND:
+                        val = pop()
+                        stack[-arg].append(val)
+                    elif op == GET_ITER:
+                        iterable = stack[-1]
+                        if not hasattr(iterable, '__iter__'):
+                            raise TypeError(f"Cannot iterate over {type(iterable).__name__}")
+                        stack[-1] = iter(iterable)
+                    elif op == COUNT_ITER:
+                        count = stack[-1]
+                        if not isinstance(count, int):
+                            if arg:
+                                raise TypeError(f"repeat count must be an integer, got {type(count).__name__}")
+                            raise TypeError(f"Loop count must be an integer, got {type(count)}")
+                        stack[-1] = iter(range(count))
+                    elif op == ENTER_SCOPE:
+                        blocks.append((SCOPE_BLOCK, interp.current_env))
+                        interp.current_env = Environment(parent=interp.current_env)
+                    elif op == EXIT_SCOPE:
+                        interp.current_env = blocks.pop()[1]
+                    elif op == STORE_CONST_NAME:
+                        interp.current_env.set_const(names[arg], pop())
+                    elif op == MAKE_FUNCTION:
+                        func_def, func_code = consts[arg]
+                        interp.functions[func_def.name] = func_def
+                        interp.call_version += 1
+                        self.function_code[id(func_def)] = (func_def, func_code)
+                    elif op == THROW:
+                        raise ShellLiteError(str(pop()))
+                    elif op == EVAL_NODE:
+                        val = interp.visit(consts[arg])
+                        if val.__class__ is Completion:
+                            val.throw()
+                        push(val)
+                    else:
+                        raise RuntimeError(f"Unknown opcode {op}")
+            except (StopException, SkipException) as e:
+                block = self._unwind(blocks, until_loop=True)
+                if block is None:
+                    if not hasattr(e, 'line'):
+                        e.line = code.lines[(pc >> 1) - 1]
+                    raise
+                del stack[block[3]:]
+                if isinstance(e, StopException):
+                    blocks.pop()
+                    pc = block[1] << 1
+                else:
+                    pc = block[2] << 1
+            except ReturnException as e:
+                self._unwind(blocks, until_loop=False)
+                if code.is_function:
+                    return e.value
+                raise
+            except Exception as e:
+                if not hasattr(e, 'line'):
+                    e.line = code.lines[(pc >> 1) - 1]
+                self._unwind(blocks, until_loop=False)
+                raise
@@ -0,0 +1,31 @@
+import sys
+import os
+import subprocess
+import tempfile
+import time
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+SCRIPT = "to fib n\n    if n < 2\n        return n\n    return fib(n - 1) + fib(n - 2)\nsay fib({n})\n"
+def shl(args, cwd):
+    env = dict(os.environ, PYTHONPATH=ROOT, SHL_NO_DAEMON='1', USE_LEGACY_PARSER='1')
+    start = time.perf_counter()
+    subprocess.run([sys.executable, '-m', 'shell_lite.main', 'run', *args], cwd=cwd, env=env,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=False)
+    return time.perf_counter() - start
+def benchmark(count=50, jobs=2):
+    with tempfile.TemporaryDirectory() as tmp:
+        files = []
+        for i in range(count):
+            name = f"job{i}.shl"
+            with open(os.path.join(tmp, name), 'w', encoding='utf-8') as f:
+                f.write(SCRIPT.format(n=8 + i % 5))
+            files.append(name)
+        with open(os.path.join(tmp, 'jobs.txt'), 'w', encoding='utf-8') as f:
+            f.write("\n".join(files))
+        print(f"Running {count} short scripts\n")
+        serial = sum(shl([name], tmp) for name in files)
+        print(f"One process per script: {serial:.2f}s")
+        print(f"shl run --manifest:     {shl(['--manifest', 'jobs.txt'], tmp):.2f}s")
+        print(f"  with --jobs {jobs}:        {shl(['--manifest', 'jobs.txt', '--jobs', str(jobs)], tmp):.2f}s")
+if __name__ == "__main__":
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 50)
@@ -0,0 +1,63 @@
+import sys
+import os
+import io
+import time
+import statistics
+from contextlib import redirect_stdout
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from shell_lite.lexer import Lexer
+from shell_lite.parser import Parser
+from shell_lite.interpreter import Interpreter
+FIB = """
+to fib n
+    if n < 2
+        return n
+    return fib(n - 1) + fib(n - 2)
+say fib(20)
+"""
+SKIP_LOOP = """
+to quarter_sum limit
+    total = 0
+    i = 0
+    while i < limit
+        i = i + 1
+        if i % 4 != 0
+            skip
+        total = total + i
+    return total
+say quarter_sum(100000)
+"""
+EARLY_RETURN = """
+to first_over items limit
+    for each x in items
+        if x > limit
+            return x
+    return 0
+data = [1, 2, 3, 4, 5, 6, 7, 8]
+count = 0
+repeat 20000 times
+    count = count + first_over(data, 2)
+say count
+"""
+WORKLOADS = [("recursive fib(20)", FIB), ("skip-heavy while loop", SKIP_LOOP), ("early return in for each", EARLY_RETURN)]
+def run_once(statements):
+    interpreter = Interpreter()
+    start = time.perf_counter()
+    with redirect_stdout(io.StringIO()):
+        for stmt in statements:
+            interpreter.visit(stmt)
+    return time.perf_counter() - start
+def benchmark(iterations=5):
+    print(f"Tree-walker control flow ({iterations} iterations each)\n")
+    results = {}
+    for name, source in WORKLOADS:
+        statements = Parser(Lexer(source).tokenize()).parse()
+        times = [run_once(statements) for _ in range(iterations)]
+        results[name] = statistics.mean(times)
+        print(f"{name}:")
+        print(f"  Mean: {results[name]:.4f}s (+/- {statistics.stdev(times) if len(times) > 1 else 0:.4f}s)")
+        print(f"  Min:  {min(times):.4f}s")
+    return results
+if __name__ == "__main__":
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    benchmark(iterations)
@@ -0,0 +1,18 @@
+import sys
+import os
+import time
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from shell_lite.interpreter import Interpreter
+def benchmark(count=20000, iterations=5):
+    print(f"Constructing {count} Interpreter() instances (best of {iterations})\n")
+    best = float('inf')
+    for _ in range(iterations):
+        start = time.perf_counter()
+        for _ in range(count):
+            Interpreter()
+        best = min(best, time.perf_counter() - start)
+    print(f"Total:        {best:.3f}s")
+    print(f"Per instance: {best / count * 1e6:.1f} us")
+    return best / count
+if __name__ == "__main__":
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
@@ -0,0 +1,21 @@
+import sys
+import os
+import time
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from shell_lite.lexer import Lexer
+def benchmark(filename, copies=500, iterations=5):
+    with open(filename, 'r') as f:
+        source = f.read() * copies
+    megabytes = len(source.encode('utf-8')) / (1024 * 1024)
+    print(f"Lexing {megabytes:.2f} MB ({copies} copies of {os.path.basename(filename)}, best of {iterations})")
+    best = float('inf')
+    for _ in range(iterations):
+        start = time.perf_counter()
+        tokens = Lexer(source).tokenize()
+        best = min(best, time.perf_counter() - start)
+    print(f"Tokens:     {len(tokens)}")
+    print(f"Time:       {best:.4f}s")
+    print(f"Throughput: {megabytes / best:.2f} MB/s  ({len(tokens) / best / 1e6:.2f}M tokens/s)")
+    return megabytes / best
+if __name__ == "__main__":
+    benchmark(sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(__file__), 'benchmark.shl'))
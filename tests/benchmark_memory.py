@@ -0,0 +1,42 @@
+import sys
+import os
+import gc
+import tracemalloc
+from dataclasses import fields
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from shell_lite.ast_nodes import Node
+from shell_lite.lexer import Lexer
+from shell_lite.parser import Parser
+from shell_lite.parser_gbp import GeometricBindingParser
+def count_nodes(tree):
+    count = 0
+    stack = [tree]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, (list, tuple)):
+            stack.extend(item)
+        elif isinstance(item, Node):
+            count += 1
+            stack.extend(getattr(item, f.name) for f in fields(item))
+    return count
+def measure(build):
+    gc.collect()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    gc.collect()
+    return result, tracemalloc.get_traced_memory()[0] - before
+def benchmark(filename, copies=200):
+    with open(filename, 'r') as f:
+        source = f.read() * copies
+    print(f"Memory on {len(source)} chars of code ({copies} copies of {os.path.basename(filename)})\n")
+    tracemalloc.start()
+    tokens, used = measure(lambda: Lexer(source).tokenize())
+    print(f"Tokens:            {len(tokens):>8} tokens  {used / 1024:>9.1f} KiB  {used / len(tokens):6.1f} B/token")
+    for label, parser_class in (("Recursive Descent", Parser), ("Geometric-Binding", GeometricBindingParser)):
+        statements, used = measure(lambda: parser_class(list(tokens)).parse())
+        nodes = count_nodes(statements)
+        print(f"{label + ':':<18} {nodes:>8} nodes   {used / 1024:>9.1f} KiB  {used / nodes:6.1f} B/node")
+        del statements
+    tracemalloc.stop()
+if __name__ == "__main__":
+    benchmark(sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(__file__), 'benchmark.shl'))
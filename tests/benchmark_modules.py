@@ -0,0 +1,29 @@
+import sys
+import os
+import io
+import time
+import tempfile
+from contextlib import redirect_stdout
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from shell_lite.bytecode import compile_source
+from shell_lite.interpreter import Interpreter
+LIBRARY = "".join(f"to helper{i} x\n    return x + {i}\nlimit{i} = {i} * 2\n" for i in range(100))
+def run_requests(lib_path, count, reload):
+    prefix = "    reload_module()\n" if reload else ""
+    source = (f"to handle n\n{prefix}    use \"{lib_path}\" as lib\n    return lib.helper3(n)\n"
+              f"repeat {count} times\n    handle(1)\n")
+    statements = compile_source(source, parser='legacy').statements
+    start = time.perf_counter()
+    with redirect_stdout(io.StringIO()):
+        Interpreter().run_statements(statements)
+    return time.perf_counter() - start
+def benchmark(count=1000):
+    with tempfile.TemporaryDirectory() as tmp:
+        lib_path = os.path.join(tmp, 'lib.shl').replace('\\', '/')
+        with open(lib_path, 'w', encoding='utf-8') as f:
+            f.write(LIBRARY)
+        print(f"`use ... as` of a {LIBRARY.count(chr(10))}-line module inside a handler called {count} times\n")
+        print(f"Re-initialised each call: {run_requests(lib_path, count, True):.3f}s")
+        print(f"Module registry:          {run_requests(lib_path, count, False):.3f}s")
+if __name__ == "__main__":
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
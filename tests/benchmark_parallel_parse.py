@@ -0,0 +1,29 @@
+import sys
+import os
+import time
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from shell_lite.lexer import Lexer
+from shell_lite.parser_gbp import GeometricBindingParser
+def generate_routes(count):
+    lines = []
+    for i in range(count):
+        lines.append(f"when someone visits \"/item/{i}\"\n    say \"item {i}\"\n")
+        lines.append(f"limit_{i} = {i} * 4 + [1, 2, {i}][2]\n")
+    return ''.join(lines)
+def benchmark(count=50000, workers=None):
+    workers = workers or os.cpu_count() or 1
+    source = generate_routes(count)
+    tokens = Lexer(source).tokenize()
+    print(f"Binding {count * 2} top-level statements ({source.count(chr(10))} lines), {os.cpu_count()} CPUs\n")
+    start = time.perf_counter()
+    serial = GeometricBindingParser(tokens).parse()
+    t_serial = time.perf_counter() - start
+    print(f"Serial:              {t_serial:.3f}s")
+    for jobs in sorted({2, workers}):
+        start = time.perf_counter()
+        parallel = GeometricBindingParser(tokens).parse_parallel(jobs, min_roots=1)
+        t_parallel = time.perf_counter() - start
+        assert parallel == serial
+        print(f"Parallel ({jobs} jobs):   {t_parallel:.3f}s  ({t_serial / t_parallel:.2f}x)")
+if __name__ == "__main__":
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 50000, int(sys.argv[2]) if len(sys.argv) > 2 else None)
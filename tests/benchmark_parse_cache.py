@@ -0,0 +1,36 @@
+import sys
+import os
+import io
+import time
+import tempfile
+from contextlib import redirect_stdout
+from unittest import mock
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from shell_lite import interpreter
+from shell_lite.bytecode import compile_source
+from shell_lite.interpreter import Interpreter
+from shell_lite.parse_cache import ParseCache
+LIBRARY = "".join(f"to helper{i} x\n    if x > {i}\n        return x - {i}\n    return x + {i}\n" for i in range(100))
+def run_requests(lib_path, count, cache):
+    source = (f"to handle n\n    use \"{lib_path}\" as lib\n    return lib.helper3(7)\n"
+              f"repeat {count} times\n    handle(1)\nexecute \"say 1 + 1\"\n")
+    statements = compile_source(source, parser='legacy').statements
+    with mock.patch.object(interpreter, 'PARSE_CACHE', cache):
+        start = time.perf_counter()
+        with redirect_stdout(io.StringIO()):
+            Interpreter().run_statements(statements)
+        return time.perf_counter() - start
+def benchmark(count=300):
+    with tempfile.TemporaryDirectory() as tmp:
+        lib_path = os.path.join(tmp, 'lib.shl')
+        with open(lib_path, 'w', encoding='utf-8') as f:
+            f.write(LIBRARY)
+        print(f"Importing a {LIBRARY.count(chr(10))}-line module inside a function called {count} times\n")
+        uncached = ParseCache(max_entries=0, directory=None)
+        print(f"No cache:      {run_requests(lib_path, count, uncached):.3f}s  {uncached.stats()}")
+        cold = ParseCache(directory=os.path.join(tmp, 'cache'))
+        print(f"Cold cache:    {run_requests(lib_path, count, cold):.3f}s  {cold.stats()}")
+        warm = ParseCache(directory=os.path.join(tmp, 'cache'))
+        print(f"Disk-warm:     {run_requests(lib_path, count, warm):.3f}s  {warm.stats()}")
+if __name__ == "__main__":
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 300)
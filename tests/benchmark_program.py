@@ -0,0 +1,38 @@
+import sys
+import os
+import io
+import time
+from contextlib import redirect_stdout
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import shell_lite
+from shell_lite.interpreter import Interpreter
+from shell_lite.main import execute_source
+RULE = """
+to discount total tier
+    if tier == "gold"
+        return total * 0.8
+    if total > 100
+        return total * 0.9
+    return total
+price = discount(amount, level)
+"""
+def benchmark(count=2000):
+    print(f"Evaluating a rule {count} times with different inputs\n")
+    os.environ['USE_LEGACY_PARSER'] = '1'
+    start = time.perf_counter()
+    with redirect_stdout(io.StringIO()):
+        for i in range(count):
+            interpreter = Interpreter()
+            interpreter.global_env.set('amount', i)
+            interpreter.global_env.set('level', 'gold' if i % 2 else 'basic')
+            execute_source(RULE, interpreter)
+    per_call = time.perf_counter() - start
+    start = time.perf_counter()
+    program = shell_lite.compile(RULE, 'rule.shl')
+    for i in range(count):
+        program.run({'amount': i, 'level': 'gold' if i % 2 else 'basic'})
+    compiled = time.perf_counter() - start
+    print(f"execute_source each time: {per_call:.3f}s ({per_call / count * 1e6:.0f} us/run)")
+    print(f"compile once, Program.run: {compiled:.3f}s ({compiled / count * 1e6:.0f} us/run)")
+if __name__ == "__main__":
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
@@ -0,0 +1,65 @@
+import sys
+import os
+import io
+import time
+from contextlib import redirect_stdout
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from shell_lite.interpreter import Interpreter
+from shell_lite.bytecode import compile_source
+from shell_lite.closure_compiler import ClosureCompiler
+from shell_lite.vm import VM
+TAIL_SUM = """
+to sum_from nums i acc
+    if i == len(nums)
+        return acc
+    return sum_from(nums, i + 1, acc + nums[i])
+say sum_from(data, 0, 0)
+"""
+DEEP_SUM = """
+to rsum nums i
+    if i == len(nums)
+        return 0
+    return nums[i] + rsum(nums, i + 1)
+say rsum(data, 0)
+"""
+TAIL_FILTER = """
+to evens nums i out
+    if i == len(nums)
+        return out
+    if nums[i] % 2 == 0
+        return evens(nums, i + 1, out + 1)
+    return evens(nums, i + 1, out)
+say evens(data, 0, 0)
+"""
+WORKLOADS = [("tail-recursive sum", TAIL_SUM), ("non-tail recursive sum", DEEP_SUM), ("tail-recursive filter count", TAIL_FILTER)]
+ENGINES = ('tree', 'closure', 'vm')
+def run_once(module, engine, size):
+    interpreter = Interpreter()
+    interpreter.global_env.set('data', list(range(size)))
+    start = time.perf_counter()
+    with redirect_stdout(io.StringIO()):
+        if engine == 'vm':
+            VM(interpreter).run(module.code)
+        elif engine == 'closure':
+            ClosureCompiler(interpreter).run(module.statements)
+        else:
+            interpreter.run_statements(module.statements)
+    return time.perf_counter() - start
+def benchmark(size=20000, iterations=3):
+    print(f"Recursive list processing over {size} items (best of {iterations})\n")
+    results = {}
+    for name, source in WORKLOADS:
+        module = compile_source(source, parser='legacy')
+        print(f"{name}:")
+        for engine in ENGINES:
+            try:
+                best = min(run_once(module, engine, size) for _ in range(iterations))
+                print(f"  {engine:<8} {best:.4f}s")
+            except RecursionError:
+                best = None
+                print(f"  {engine:<8} RecursionError")
+            results[(name, engine)] = best
+    return results
+if __name__ == "__main__":
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    benchmark(size)
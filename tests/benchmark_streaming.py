@@ -0,0 +1,48 @@
+import sys
+import os
+import gc
+import time
+import tracemalloc
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from shell_lite.lexer import Lexer
+from shell_lite.parser import Parser, StreamingParser
+from shell_lite.parser_gbp import GeometricBindingParser
+def generate(megabytes):
+    blocks = []
+    size = 0
+    i = 0
+    while size < megabytes * 1024 * 1024:
+        block = (f"to step{i} x\n    # scale and offset\n    if x > {i}\n        return x * 2\n"
+                 f"    total = 0\n    for each n in [1, 2, 3]\n        total = total + n\n"
+                 f"    return x + total / {i + 1}\nsay step{i}({i})\n")
+        blocks.append(block)
+        size += len(block)
+        i += 1
+    return ''.join(blocks)
+def eager(source, parser_class):
+    return parser_class(Lexer(source).tokenize()).iter_parse()
+def streaming(source, parser_class):
+    if parser_class is Parser:
+        parser_class = StreamingParser
+    return parser_class(Lexer(source).stream()).iter_parse()
+def measure(source, build, parser_class):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    count = 0
+    for _ in build(source, parser_class):
+        count += 1
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return count, elapsed, peak
+def benchmark(megabytes=1):
+    source = generate(megabytes)
+    print(f"Parsing {len(source) / (1024 * 1024):.2f} MB of generated code, statements consumed one at a time\n")
+    for label, parser_class in (("Recursive Descent", Parser), ("Geometric-Binding", GeometricBindingParser)):
+        print(f"{label}:")
+        for mode, build in (("token list", eager), ("streaming", streaming)):
+            count, elapsed, peak = measure(source, build, parser_class)
+            print(f"  {mode:<11} {count} statements  peak {peak / (1024 * 1024):8.2f} MiB  {elapsed:.2f}s (traced)")
+if __name__ == "__main__":
+    benchmark(float(sys.argv[1]) if len(sys.argv) > 1 else 1)
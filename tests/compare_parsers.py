@@ -27,5 +27,35 @@ def benchmark(filename):
     print(f"Geometric-Binding: {t_new:.4f}s")
     diff = t_old / t_new if t_new > 0 else 0
     print(f"Speedup: {diff:.2f}x")
+def time_parse(parser_class, tokens):
+    start = time.perf_counter()
+    parser_class(tokens).parse()
+    return time.perf_counter() - start
+def scaling(filename, max_lines=1000000):
+    with open(filename, 'r') as f:
+        lines = f.read().splitlines(keepends=True)
+    print(f"Scaling on copies of {filename} ({len(lines)} lines each)")
+    print(f"{'lines':>9} {'lex':>9} {'recursive':>10} {'geometric':>10} {'us/line (gbp)':>14}")
+    count = 1000
+    while count <= max_lines:
+        source = ''.join(lines * (count // len(lines) + 1))
+        start = time.perf_counter()
+        tokens = Lexer(source).tokenize()
+        t_lex = time.perf_counter() - start
+        t_old = time_parse(Parser, tokens)
+        t_new = time_parse(GeometricBindingParser, tokens)
+        print(f"{count:>9} {t_lex:>8.3f}s {t_old:>9.3f}s {t_new:>9.3f}s {t_new / count * 1e6:>14.2f}")
+        del source, tokens
+        count *= 10
+    print()
+    print("Nested list literals (x = [[[...]]] with one item per level)")
+    print(f"{'depth':>9} {'geometric':>10}")
+    for depth in (50, 100, 200, 400):
+        source = "x = " + "[1, " * depth + "2" + "]" * depth + "\n"
+        tokens = Lexer(source).tokenize()
+        print(f"{depth:>9} {time_parse(GeometricBindingParser, tokens):>9.4f}s")
 if __name__ == "__main__":
-    benchmark("tests/benchmark.shl")
\ No newline at end of file
+    if len(sys.argv) > 1 and sys.argv[1] == '--scale':
+        scaling("tests/benchmark.shl", int(sys.argv[2]) if len(sys.argv) > 2 else 1000000)
+    else:
+        benchmark("tests/benchmark.shl")
@@ -0,0 +1,34 @@
+import io
+from contextlib import redirect_stdout
+from shell_lite.bytecode import BytecodeCompiler, compile_source
+from shell_lite.interpreter import Interpreter
+from shell_lite.lexer import Lexer
+from shell_lite.optimizer import DEFAULT_OPT_LEVEL
+from shell_lite.parser import Parser
+def parse(source):
+    """Legacy-parser statements, neither optimized nor resolved."""
+    return Parser(Lexer(source).tokenize()).parse()
+def run(source, engine='tree', interpreter=None, opt_level=DEFAULT_OPT_LEVEL, **variables):
+    """Run `source` on `engine` ('tree', 'closure' or 'vm') and return what
+    it printed. A string is compiled with the legacy parser at `opt_level`,
+    a list of statements runs as it is; `variables` are set as globals
+    first."""
+    interpreter = interpreter or Interpreter()
+    for name, value in variables.items():
+        interpreter.global_env.set(name, value)
+    if isinstance(source, str):
+        module = compile_source(source, parser='legacy', opt_level=opt_level)
+        statements, code = module.statements, module.code
+    else:
+        statements, code = source, None
+    buffer = io.StringIO()
+    with redirect_stdout(buffer):
+        if engine == 'vm':
+            from shell_lite.vm import VM
+            VM(interpreter).run(code or BytecodeCompiler().compile(statements))
+        elif engine == 'closure':
+            from shell_lite.closure_compiler import ClosureCompiler
+            ClosureCompiler(interpreter).run(statements)
+        else:
+            interpreter.run_statements(statements)
+    return buffer.getvalue()
@@ -0,0 +1,49 @@
+import io
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stderr, redirect_stdout
+from unittest import mock
+from shell_lite import main
+class TestBatch(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        patcher = mock.patch.dict(os.environ, {'USE_LEGACY_PARSER': '1', 'SHL_NO_CACHE': '1'})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+    def write(self, name, source):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(source)
+        return path
+    def batch(self, files, jobs=1):
+        out, err = io.StringIO(), io.StringIO()
+        with redirect_stdout(out), redirect_stderr(err):
+            failed = main.run_batch(files, 'tree', 1, jobs)
+        return failed, out.getvalue(), err.getvalue()
+    def test_scripts_get_fresh_globals(self):
+        files = [self.write('a.shl', 'x = 1\nsay "a"\n'), self.write('b.shl', 'say x\n'),
+                 self.write('c.shl', 'say "c"\nexit 2\n'), self.write('d.shl', 'say "d"\n')]
+        failed, out, err = self.batch(files)
+        self.assertEqual(failed, 2)
+        self.assertTrue(out.startswith("a\n"))
+        self.assertIn("Variable 'x' is not defined", out)
+        self.assertTrue(out.endswith("c\nd\n"))
+        self.assertIn("failed: " + files[1], err)
+    def test_worker_pool_keeps_order(self):
+        files = [self.write(f's{i}.shl', f'say {i}\n') for i in range(6)]
+        failed, out, _ = self.batch(files, jobs=3)
+        self.assertEqual((failed, out), (0, "".join(f"{i}\n" for i in range(6))))
+    def test_manifest_and_options(self):
+        self.write('one.shl', 'say 1\n')
+        manifest = self.write('jobs.txt', '# nightly\none.shl\n\n')
+        files, options = main.parse_run_options(['--manifest', manifest, 'extra.shl', '--jobs=4', '--engine', 'vm'])
+        self.assertEqual(files, [os.path.join(self.tmp.name, 'one.shl'), 'extra.shl'])
+        self.assertEqual((options['jobs'], options['engine']), (4, 'vm'))
+        with self.assertRaises(ValueError):
+            main.parse_run_options(['--jobs', '0'])
+        with self.assertRaises(ValueError):
+            main.parse_run_options(['--manifest', os.path.join(self.tmp.name, 'missing.txt')])
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stderr, redirect_stdout
+from shell_lite import bench
+from shell_lite.interpreter import Interpreter
+def report(**medians):
+    return {'benchmarks': {name: {'median': value} for name, value in medians.items()}}
+class TestBench(unittest.TestCase):
+    def test_workloads_compute_expected_results(self):
+        variables = bench.script_runner(bench.WORKLOADS['calls'])().global_env.variables
+        self.assertEqual(variables['result'], 377)
+        variables = bench.script_runner(bench.WORKLOADS['method_calls'])().global_env.variables
+        self.assertEqual(variables['total'], 124750)
+    def test_match_route(self):
+        interpreter = bench.script_runner(bench.ROUTES)()
+        body, params = interpreter.match_route('/api/v1/resource7/abc')
+        self.assertIsNotNone(body)
+        self.assertEqual(params, {'id': 'abc'})
+        self.assertEqual(Interpreter().match_route('/'), (None, {}))
+    def test_suite_report(self):
+        names = bench.select(['interpreter.calls', 'http', 'llvm'])
+        self.assertEqual(names, ['interpreter.calls', 'http.routing', 'llvm.codegen'])
+        result = bench.run_suite(names, warmup=0, repeat=2)
+        timed = result['benchmarks']['interpreter.calls']
+        self.assertEqual(timed['repeat'], 2)
+        self.assertLessEqual(timed['min'], timed['median'])
+        try:
+            import llvmlite
+        except ImportError:
+            self.assertIn('skipped', result['benchmarks']['llvm.codegen'])
+        json.dumps(result)
+    def test_compare(self):
+        rows = bench.compare(report(a=1.2, b=0.5, c=1.05, d=1.0), report(a=1.0, b=1.0, c=1.0), threshold=0.1)
+        self.assertEqual({row['name']: row['status'] for row in rows}, {'a': 'regression', 'b': 'improvement', 'c': 'unchanged'})
+    def test_command_flags_regressions(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            baseline = os.path.join(tmp, 'baseline.json')
+            with open(baseline, 'w') as f:
+                json.dump(report(**{'http.routing': 1e-9}), f)
+            out, err = io.StringIO(), io.StringIO()
+            with redirect_stdout(out), redirect_stderr(err):
+                code = bench.bench_command(['--filter', 'http', '--repeat=2', '--warmup', '0', '--compare', baseline])
+        self.assertEqual(code, 1)
+        self.assertEqual(json.loads(out.getvalue())['comparison'][0]['status'], 'regression')
+        self.assertIn("regressed", err.getvalue())
+        with self.assertRaises(ValueError):
+            bench.bench_command(['--repeat', '0'])
+if __name__ == '__main__':
+    unittest.main()
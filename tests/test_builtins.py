@@ -0,0 +1,30 @@
+import unittest
+from shell_lite.interpreter import BUILTIN_ENV, BUILTINS, Interpreter
+from tests.helpers import run
+class TestSharedBuiltins(unittest.TestCase):
+    def test_table_is_shared_and_read_only(self):
+        first, second = Interpreter(), Interpreter()
+        self.assertIs(first.builtins['len'], second.builtins['len'])
+        self.assertIs(first.builtins['div'], BUILTINS['div'])
+        self.assertIsNot(first.builtins['run'], second.builtins['run'])
+        with self.assertRaises(TypeError):
+            BUILTINS['len'] = None
+        self.assertNotIn('len', first.global_env.variables)
+        self.assertEqual(run("say len([1, 2])\nsay upper(\"a\")\n", interpreter=first), "2\nA\n")
+    def test_globals_overlay_is_per_interpreter(self):
+        first, second = Interpreter(), Interpreter()
+        run("len = 5\n", interpreter=first)
+        first.builtins['tally'] = len
+        self.assertEqual(first.global_env.get('len'), 5)
+        self.assertIs(second.global_env.get('len'), BUILTINS['len'])
+        self.assertIs(BUILTIN_ENV.variables['len'], BUILTINS['len'])
+        self.assertNotIn('tally', second.builtins)
+        self.assertNotEqual(first.global_env.version, second.global_env.version)
+    def test_std_modules_are_copied_on_use(self):
+        first, second = Interpreter(), Interpreter()
+        self.assertEqual(run("use \"math\" as m\nsay m.floor(2.5)\n", interpreter=first), "2\n")
+        first.std_module('math')['pi'] = 3
+        self.assertNotEqual(second.std_module('math')['pi'], 3)
+        self.assertIsNone(first.std_module('nope'))
+if __name__ == '__main__':
+    unittest.main()
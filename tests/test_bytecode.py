@@ -0,0 +1,97 @@
+import io
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from unittest import mock
+from shell_lite import bytecode
+from shell_lite.bytecode import compile_source, disassemble, load_module
+from shell_lite.interpreter import Interpreter
+from shell_lite.vm import VM
+from tests.helpers import run
+class TestVM(unittest.TestCase):
+    def assertSameOutput(self, source):
+        self.assertEqual(run(source, 'tree'), run(source, 'vm'))
+    def test_recursion(self):
+        source = "to fib n\n    if n < 2\n        return n\n    return fib(n - 1) + fib(n - 2)\nsay fib(12)\n"
+        self.assertEqual(run(source, 'vm'), "144\n")
+        self.assertSameOutput(source)
+    def test_loop_control(self):
+        self.assertSameOutput("repeat 6 times\n    if index % 2 == 0\n        skip\n    if index > 4\n        stop\n    say index\nc = 0\nwhile c < 10\n    c = c + 1\n    if c == 3\n        stop\nsay c\n")
+    def test_slot_locals_fall_back_to_globals(self):
+        source = "x = 10\nto shadow\n    y = x\n    x = 99\n    return y + x\nsay shadow()\nsay x\n"
+        self.assertEqual(run(source, 'vm'), "109\n10\n")
+    def test_scoped_loops_and_comprehensions(self):
+        self.assertSameOutput("nums = [1, 2, 3]\nsay [n * n for n in nums]\nrepeat 2 times\n    say index\nd = {\"a\": 1}\nsay d[\"a\"]\n")
+    def test_error_line_matches_tree_walker(self):
+        source = "to f a\n    return a / 0\nx = 5\nsay f(x)\n"
+        lines = []
+        for engine in ('tree', 'vm'):
+            with self.assertRaises(ZeroDivisionError) as ctx:
+                run(source, engine)
+            lines.append(ctx.exception.line)
+        self.assertEqual(lines, [2, 2])
+    def test_function_uses_slots(self):
+        module = compile_source("to total_of a b\n    c = a + b\n    return c\n", parser='legacy')
+        func_code = VM(Interpreter()).compiler.compile_function(module.statements[0])
+        self.assertTrue(func_code.uses_slots)
+        self.assertEqual(func_code.varnames, ['a', 'b', 'c'])
+class TestBytecodeCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'prog.shl')
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write("say 1 + 2\n")
+    def tearDown(self):
+        self.tmp.cleanup()
+    def test_cache_hit_skips_parsing(self):
+        load_module(self.path, parser='legacy')
+        self.assertTrue(os.path.exists(bytecode.cache_path(self.path, 'legacy')))
+        with mock.patch.object(bytecode, 'parse_source', side_effect=AssertionError('parsed')):
+            module = load_module(self.path, parser='legacy')
+        self.assertEqual(module.parser, 'legacy')
+    def test_source_change_invalidates(self):
+        load_module(self.path, parser='legacy')
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write("say 4\n")
+        module = load_module(self.path, parser='legacy')
+        buffer = io.StringIO()
+        with redirect_stdout(buffer):
+            VM(Interpreter()).run(module.code)
+        self.assertEqual(buffer.getvalue(), "4\n")
+    def test_version_mismatch_invalidates(self):
+        load_module(self.path, parser='legacy')
+        with mock.patch.object(bytecode, '__version__', '0.0.0'):
+            self.assertIsNone(bytecode.read_cache(self.path, bytecode.source_hash("say 1 + 2\n"), 'legacy'))
+    def test_levels_cached_separately(self):
+        load_module(self.path, parser='legacy', opt_level=0)
+        optimized = bytecode.cache_path(self.path, 'legacy', 1)
+        self.assertTrue(os.path.exists(bytecode.cache_path(self.path, 'legacy', 0)))
+        self.assertFalse(os.path.exists(optimized))
+        load_module(self.path, parser='legacy')
+        mtime = os.stat(optimized).st_mtime_ns
+        load_module(self.path, parser='legacy', opt_level=0)
+        self.assertEqual(os.stat(optimized).st_mtime_ns, mtime)
+    def test_disasm_shows_optimized_code(self):
+        from shell_lite import main
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write("x = 2 * 3\n")
+        texts = []
+        for args in ([self.path], [self.path, '--opt-level', '0']):
+            files, opt_level = main.parse_disasm_options(args)
+            out = io.StringIO()
+            with mock.patch.dict(os.environ, {'USE_LEGACY_PARSER': '1'}), redirect_stdout(out):
+                main.disasm_file(files[0], opt_level)
+            texts.append(out.getvalue())
+        self.assertNotIn('BINARY_MUL', texts[0])
+        self.assertIn('BINARY_MUL', texts[1])
+    def test_disassemble(self):
+        module = compile_source("to double n\n    return n * 2\nsay double(4)\n", parser='legacy')
+        out = io.StringIO()
+        disassemble(module.code, out)
+        text = out.getvalue()
+        self.assertIn('MAKE_FUNCTION', text)
+        self.assertIn('CALL_NAME', text)
+        self.assertIn('Disassembly of function double', text)
+if __name__ == '__main__':
+    unittest.main()
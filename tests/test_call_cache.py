@@ -0,0 +1,40 @@
+import unittest
+from shell_lite.interpreter import CALL_BUILTIN, CALL_DYNAMIC, CALL_FUNCTION, Interpreter
+from shell_lite.resolver import resolve
+from tests.helpers import parse, run
+class TestCallCache(unittest.TestCase):
+    def test_site_remembers_target(self):
+        statements = resolve(parse("to inc n\n    return n + 1\nx = inc(1)\n"))
+        interpreter = Interpreter()
+        interpreter.run_statements(statements)
+        cache = statements[1].value.cache
+        self.assertEqual(cache[:2], (CALL_FUNCTION, statements[0]))
+    def test_function_redefinition_invalidates(self):
+        source = "to g\n    return 1\nrepeat 2 times\n    say g()\n    to g\n        return 2\n"
+        for engine in ('tree', 'closure'):
+            self.assertEqual(run(resolve(parse(source)), engine), "1\n2\n")
+    def test_new_variable_shadows_function(self):
+        source = ("to h x\n    return \"func\"\nto call_h\n    return h(1)\nsay call_h()\n"
+                  "h = fn z => \"lambda\"\nsay call_h()\n")
+        for engine in ('tree', 'closure'):
+            self.assertEqual(run(resolve(parse(source)), engine), "func\nlambda\n")
+    def test_local_binding_shadows_function(self):
+        source = "to op x\n    return \"global\"\nto apply op\n    return op(3)\nsay op(1)\nsay apply(fn z => z * 2)\n"
+        for engine in ('tree', 'closure'):
+            self.assertEqual(run(resolve(parse(source)), engine), "global\n6\n")
+    def test_builtin_called_once(self):
+        for engine in ('tree', 'closure'):
+            calls = []
+            interpreter = Interpreter()
+            interpreter.builtins['tally'] = lambda x: calls.append(x) or x
+            interpreter.global_env.set('tally', interpreter.builtins['tally'])
+            self.assertEqual(run(resolve(parse("say tally(5)\n")), engine, interpreter), "5\n")
+            self.assertEqual(calls, [5])
+    def test_resolve_call_kinds(self):
+        interpreter = Interpreter()
+        run(resolve(parse("to f\n    return 1\nv = [1]\n")), interpreter=interpreter)
+        self.assertEqual(interpreter.resolve_call('len')[0], CALL_BUILTIN)
+        self.assertEqual(interpreter.resolve_call('f')[0], CALL_FUNCTION)
+        self.assertEqual(interpreter.resolve_call('v')[0], CALL_DYNAMIC)
+if __name__ == '__main__':
+    unittest.main()
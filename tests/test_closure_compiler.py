@@ -0,0 +1,23 @@
+import unittest
+from tests.helpers import parse, run
+class TestClosureCompiler(unittest.TestCase):
+    def assertSameOutput(self, source):
+        self.assertEqual(run(parse(source), 'tree'), run(parse(source), 'closure'))
+    def test_recursion(self):
+        source = "to fib n\n    if n < 2\n        return n\n    return fib(n - 1) + fib(n - 2)\nsay fib(12)\n"
+        self.assertEqual(run(parse(source), 'closure'), "144\n")
+        self.assertSameOutput(source)
+    def test_loops_and_collections(self):
+        self.assertSameOutput("x = [1, 2, 3]\nsay x\nrepeat 3 times\n    say index\nc = 0\nwhile c < 5\n    c = c + 1\nsay c\n")
+    def test_methods(self):
+        self.assertSameOutput("structure Point\n    has x\n    has y\n    to sum\n        return x + y\np is Point 3 4\nsay p.sum()\n")
+    def test_error_line_matches_tree_walker(self):
+        source = "to f a\n    return a / 0\nx = 5\nsay f(x)\n"
+        lines = []
+        for engine in ('tree', 'closure'):
+            with self.assertRaises(ZeroDivisionError) as ctx:
+                run(parse(source), engine)
+            lines.append(ctx.exception.line)
+        self.assertEqual(lines, [2, 2])
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,27 @@
+import unittest
+from shell_lite.interpreter import Completion, Interpreter, RETURN, StopException
+from tests.helpers import parse, run
+class TestControlFlow(unittest.TestCase):
+    def test_return_from_nested_loops(self):
+        source = "to locate items target\n    for each x in items\n        repeat 3 times\n            if x == target\n                return x * 10\n    return 0\nsay locate([1, 2, 3], 2)\nsay locate([1], 5)\n"
+        self.assertEqual(run(parse(source)), "20\n0\n")
+    def test_skip_and_stop(self):
+        source = "n = 0\nuntil n > 5\n    n = n + 1\n    if n == 2\n        skip\n    if n == 5\n        stop\n    say n\n"
+        self.assertEqual(run(parse(source)), "1\n3\n4\n")
+    def test_stop_inside_function_breaks_caller_loop(self):
+        source = "to halt\n    stop\nc = 0\nwhile c < 10\n    c = c + 1\n    halt()\nsay c\n"
+        self.assertEqual(run(parse(source)), "1\n")
+    def test_return_inside_try(self):
+        source = "to g\n    try:\n        return 5\n    catch e:\n        say \"caught\"\n    return 6\nsay g()\n"
+        self.assertEqual(run(parse(source)), "5\n")
+    def test_return_is_a_completion(self):
+        statements = parse("return 3\n")
+        result = Interpreter().visit(statements[0])
+        self.assertIsInstance(result, Completion)
+        self.assertEqual((result.kind, result.value), (RETURN, 3))
+    def test_stop_outside_loop_keeps_line(self):
+        with self.assertRaises(StopException) as ctx:
+            run(parse("say 1\nstop\n"))
+        self.assertEqual(ctx.exception.line, 2)
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+from shell_lite import daemon
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+@unittest.skipUnless(daemon.supported(), "shl daemon needs AF_UNIX and fork()")
+class TestDaemon(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.socket = os.path.join(self.tmp.name, 'shl.sock')
+        self.env = dict(os.environ, PYTHONPATH=ROOT, SHL_DAEMON_SOCKET=self.socket, USE_LEGACY_PARSER='1',
+                        SHL_DAEMON_TIMEOUT='0.5')
+        self.env.pop('SHL_NO_DAEMON', None)
+        self.server = subprocess.Popen([sys.executable, '-m', 'shell_lite.main', 'daemon'], env=self.env,
+                                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        self.addCleanup(self.stop)
+        deadline = time.time() + 30
+        while daemon.request('stats', self.socket) is None:
+            self.assertLess(time.time(), deadline, "daemon did not start")
+            time.sleep(0.05)
+    def stop(self):
+        daemon.request('stop', self.socket)
+        self.server.wait(timeout=10)
+    def shl(self, *args, stdin='', **env):
+        return subprocess.run([sys.executable, '-m', 'shell_lite.main', *args], input=stdin, capture_output=True,
+                              text=True, cwd=self.tmp.name, env=dict(self.env, **env))
+    def test_run_is_forwarded(self):
+        with open(os.path.join(self.tmp.name, 'job.shl'), 'w') as f:
+            f.write('say "who: " + env("WHO")\nsay run "cat"\nexit 3\n')
+        result = self.shl('run', 'job.shl', stdin='piped', WHO='ci')
+        self.assertEqual((result.stdout, result.returncode), ("who: ci\npiped\n", 3))
+        stats = daemon.request('stats', self.socket)
+        self.assertEqual(stats['requests'], 1)
+        self.assertIn('saved_per_run_ms', stats)
+        local = self.shl('job.shl', stdin='piped', WHO='ci', SHL_NO_DAEMON='1')
+        self.assertEqual((local.stdout, local.returncode), (result.stdout, 3))
+        self.assertEqual(daemon.request('stats', self.socket)['requests'], 1)
+    def test_socket_is_private(self):
+        self.assertEqual(os.stat(self.socket).st_mode & 0o777, 0o600)
+        client = daemon.connect(self.socket)
+        with client:
+            self.assertIn(daemon.peer_uid(client), (os.getuid(), None))
+    def test_stalled_client_does_not_block_runs(self):
+        stalled = daemon.connect(self.socket)
+        self.addCleanup(stalled.close)
+        with open(os.path.join(self.tmp.name, 'job.shl'), 'w') as f:
+            f.write('say "ok"\n')
+        start = time.time()
+        result = self.shl('run', 'job.shl')
+        self.assertEqual((result.stdout, result.returncode), ("ok\n", 0))
+        self.assertLess(time.time() - start, 20)
+        self.assertIsNotNone(daemon.request('stats', self.socket))
+    def test_stats_command(self):
+        result = self.shl('daemon', '--stats')
+        self.assertIn("requests", result.stdout)
+        self.assertIn("saved_total_ms", result.stdout)
+if __name__ == '__main__':
+    unittest.main()
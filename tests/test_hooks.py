@@ -0,0 +1,125 @@
+import unittest
+import shell_lite
+from shell_lite.hooks import HOOKED_METHODS
+from shell_lite.interpreter import Interpreter
+from shell_lite.profiler import ExecutionStats, Profiler
+from shell_lite.vm import VM
+from tests.helpers import run
+SOURCE = """to fib n
+    if n < 2
+        return n
+    return fib(n - 1) + fib(n - 2)
+structure Counter
+    has count
+    to bump n
+        return count + n
+c is Counter 1
+db open ":memory:"
+db exec "create table t (x integer)"
+rows = db query "select x from t"
+say c.bump(2)
+say str(fib(5))
+"""
+class TestHooks(unittest.TestCase):
+    def test_no_hooks_no_overrides(self):
+        interpreter = Interpreter()
+        self.assertEqual(interpreter.__dict__.keys() & set(HOOKED_METHODS), set())
+        callback = interpreter.on_statement(lambda node: None)
+        self.assertIn('visit', interpreter.__dict__)
+        interpreter.remove_hook('statement', callback)
+        self.assertEqual(interpreter.__dict__.keys() & set(HOOKED_METHODS), set())
+    def test_events(self):
+        interpreter = Interpreter()
+        events = []
+        interpreter.on_statement(lambda node: events.append(('statement', node.line)))
+        interpreter.on_call_enter(lambda name: events.append(('enter', name)))
+        interpreter.on_call_exit(lambda name, value: events.append(('exit', name, value)))
+        interpreter.on_builtin(lambda name, args: events.append(('builtin', name, args)))
+        interpreter.on_db_query(lambda sql, params: events.append(('db', sql)))
+        self.assertEqual(run(SOURCE, interpreter=interpreter), "3\n5\n")
+        statements = [line for kind, line, *_ in events if kind == 'statement']
+        self.assertEqual(statements[:8], [1, 5, 9, 10, 11, 12, 13, 8])
+        self.assertEqual(sum(1 for e in events if e[0] == 'enter'), 16)
+        self.assertIn(('exit', 'Counter.bump', 3), events)
+        self.assertIn(('exit', 'fib', 5), events)
+        self.assertIn(('builtin', 'str', (5,)), events)
+        self.assertEqual([e[1] for e in events if e[0] == 'db'], ["create table t (x integer)", "select x from t"])
+    def test_hook_can_stop_script(self):
+        class QuotaExceeded(Exception):
+            pass
+        interpreter = Interpreter()
+        count = [0]
+        def quota(node):
+            count[0] += 1
+            if count[0] > 5:
+                raise QuotaExceeded()
+        interpreter.on_statement(quota)
+        with self.assertRaises(QuotaExceeded):
+            run("i = 0\nwhile i < 100\n    i = i + 1\n", interpreter=interpreter)
+    def test_builtin_table_restored(self):
+        interpreter = Interpreter()
+        builtins = interpreter.builtins
+        seen = []
+        callback = interpreter.on_builtin(lambda name, args: seen.append(name))
+        run("say len([1, 2])\n", interpreter=interpreter)
+        interpreter.remove_hook('builtin', callback)
+        self.assertIs(interpreter.builtins, builtins)
+        run("say len([1, 2])\n", interpreter=interpreter)
+        self.assertEqual(seen, ['len'])
+    def test_http_request(self):
+        interpreter = Interpreter()
+        seen = []
+        interpreter.on_http_request(seen.append)
+        request = {'method': 'GET', 'path': '/', 'params': {}, 'form': {}, 'json': None}
+        interpreter.begin_request(request)
+        self.assertEqual(seen, [request])
+        self.assertEqual(interpreter.global_env.get('REQUEST_METHOD'), 'GET')
+    def test_unknown_event(self):
+        with self.assertRaises(ValueError):
+            Interpreter().add_hook('nope', print)
+    def test_hooks_stack_with_profilers(self):
+        interpreter = Interpreter()
+        profiler = Profiler().attach(interpreter)
+        calls = []
+        callback = interpreter.on_call_enter(calls.append)
+        run(SOURCE, interpreter=interpreter)
+        self.assertEqual(len(calls), 16)
+        self.assertEqual(profiler.functions['fib'].count, 15)
+        profiler.detach()
+        run(SOURCE, interpreter=interpreter)
+        self.assertEqual(len(calls), 32)
+        self.assertEqual(profiler.functions['fib'].count, 15)
+        interpreter.remove_hook('call_enter', callback)
+        self.assertNotIn('visit', interpreter.__dict__)
+        self.assertEqual(run(SOURCE, interpreter=interpreter), "3\n5\n")
+        self.assertEqual((len(calls), profiler.functions['fib'].count), (32, 15))
+    def test_profiler_attached_after_hook(self):
+        interpreter = Interpreter()
+        seen = []
+        callback = interpreter.on_statement(lambda node: seen.append(node.line))
+        stats = ExecutionStats().attach(interpreter)
+        interpreter.remove_hook('statement', callback)
+        interpreter.on_call_enter(seen.append)
+        run(SOURCE, interpreter=interpreter)
+        stats.detach()
+        self.assertEqual(stats.nodes['FunctionDef'], 1)
+        self.assertEqual(seen.count('fib'), 15)
+        self.assertFalse(any(isinstance(item, int) for item in seen))
+    def test_other_engines_rejected(self):
+        interpreter = Interpreter()
+        VM(interpreter)
+        with self.assertRaises(ValueError):
+            interpreter.on_statement(print)
+        interpreter = Interpreter()
+        interpreter.on_statement(print)
+        with self.assertRaises(ValueError):
+            VM(interpreter)
+    def test_program_hooks(self):
+        program = shell_lite.compile("x = len([1, 2, 3])\n", parser='legacy')
+        seen = []
+        self.assertEqual(program.run(hooks={'builtin': lambda name, args: seen.append(name)}), {'x': 3})
+        self.assertEqual(seen, ['len'])
+        with self.assertRaises(ValueError):
+            program.run(engine='vm', hooks={'builtin': print})
+if __name__ == '__main__':
+    unittest.main()
@@ -1,8 +1,39 @@
 import unittest
+from shell_lite.lexer import Lexer
+def lex(source):
+    return [(t.type, t.value, t.line, t.column) for t in Lexer(source).tokenize()]
 class TestLexer(unittest.TestCase):
     def test_lexer_initialization(self):
         pass
     def test_make_tokens(self):
         pass
+    def test_phrases_begin_end_and_regex(self):
+        source = 'if x is at least 3 begin\n    say "a\\tb" # note\nend\nsay 6 / 2 / 1\nm = /a+b/i\n'
+        self.assertEqual(lex(source), [
+            ('IF', 'if', 1, 1), ('ID', 'x', 1, 4), ('GE', '>=', 1, 6), ('NUMBER', '3', 1, 18),
+            ('INDENT', '', 1, 20), ('NEWLINE', '', 1, 25), ('INDENT', '', 2, 5), ('SAY', 'say', 2, 5),
+            ('STRING', 'a\tb', 2, 9), ('COMMENT', '# note', 2, 16), ('NEWLINE', '', 2, 22),
+            ('DEDENT', '', 3, 1), ('DEDENT', '', 3, 1), ('SAY', 'say', 4, 1), ('NUMBER', '6', 4, 5),
+            ('DIV', '/', 4, 7), ('NUMBER', '2', 4, 9), ('DIV', '/', 4, 11), ('NUMBER', '1', 4, 13),
+            ('NEWLINE', '', 4, 14), ('ID', 'm', 5, 1), ('ASSIGN', '=', 5, 3), ('REGEX', 'a+b', 5, 5),
+            ('NEWLINE', '', 5, 11), ('EOF', '', 6, 1)])
+    def test_brackets_join_lines(self):
+        self.assertEqual(lex("x = (1 +\n   2)\nsay the x /* gone\n */\n"), [
+            ('ID', 'x', 1, 1), ('ASSIGN', '=', 1, 3), ('LPAREN', '(', 1, 5), ('NUMBER', '1', 1, 6),
+            ('PLUS', '+', 1, 8), ('NUMBER', '2', 2, 4), ('RPAREN', ')', 2, 5), ('NEWLINE', '', 2, 6),
+            ('SAY', 'say', 3, 1), ('ID', 'x', 3, 9), ('NEWLINE', '', 3, 11), ('EOF', '', 5, 1)])
+    def test_stream_matches_tokenize(self):
+        source = "if x begin\n    say 1 / 2\nend\nm = /a/\nlist = [1,\n  2]\nbegin\n    say m\nend\n"
+        streamed = [(t.type, t.value, t.line, t.column) for t in Lexer(source).stream()]
+        self.assertEqual(streamed, lex(source))
+    def test_errors(self):
+        for source, message in (('say "open\n', "Unterminated string on line 1"),
+                                ('x = 1\ny = $\n', "Illegal character '$' at line 2"),
+                                ('/* never closed', "Unterminated multi-line comment")):
+            with self.assertRaises(SyntaxError) as ctx:
+                Lexer(source).tokenize()
+            self.assertEqual(str(ctx.exception), message)
+        with self.assertRaises(IndentationError):
+            Lexer("if x\n    a\n  b\n").tokenize()
 if __name__ == '__main__':
-    unittest.main()
\ No newline at end of file
+    unittest.main()
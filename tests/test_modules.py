@@ -0,0 +1,36 @@
+import os
+import tempfile
+import unittest
+from shell_lite.interpreter import Interpreter
+from tests.helpers import run
+class TestModuleRegistry(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = os.path.join(self.tmp.name, 'lib.shl').replace('\\', '/')
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write("say \"init\"\nlimit = 3\nto triple x\n    return x * 3\n")
+    def test_body_runs_once(self):
+        interp = Interpreter()
+        source = f"use \"{self.path}\" as m\nsay m.triple(2)\n"
+        self.assertEqual(run(source + source, interpreter=interp), "init\n6\n6\n")
+        self.assertEqual(run(f"to handler\n    use \"{self.path}\" as lib\n    return lib.limit\nsay handler()\nsay handler()\n", interpreter=interp), "3\n3\n")
+        self.assertEqual(list(interp.modules), [os.path.abspath(self.path)])
+        self.assertNotIn('triple', interp.functions)
+    def test_reload(self):
+        interp = Interpreter()
+        source = f"use \"{self.path}\" as m\n"
+        run(source, interpreter=interp)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write("limit = 4\n")
+        self.assertEqual(run(source + "say m.limit\n", interpreter=interp), "3\n")
+        self.assertTrue(interp.reload_module(self.path))
+        self.assertFalse(interp.reload_module(self.path))
+        self.assertEqual(run(source + "say m.limit\n", interpreter=interp), "init\n4\n")
+        self.assertEqual(run(f"reload_module()\n{source}", interpreter=interp), "init\n")
+    def test_registry_is_per_interpreter(self):
+        source = f"use \"{self.path}\" as m\n"
+        self.assertEqual(run(source, interpreter=Interpreter()), "init\n")
+        self.assertEqual(run(source, interpreter=Interpreter()), "init\n")
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import unittest
+from shell_lite.ast_nodes import *
+from shell_lite import optimizer
+from shell_lite.optimizer import optimize, register_pass
+from tests.helpers import parse, run
+class TestOptimizer(unittest.TestCase):
+    def test_constant_folding(self):
+        statements = optimize(parse("say 60 * 60 + 1\nsay \"n\" + 1\nsay 1 < 2\nsay not true\n"), 1)
+        values = [stmt.expression for stmt in statements]
+        self.assertEqual([(type(v), v.value) for v in values], [(Number, 3601), (String, "n1"), (Boolean, True), (Boolean, False)])
+        self.assertEqual(values[0].line, 1)
+    def test_errors_are_not_folded(self):
+        expr = optimize(parse("say 1 / 0\n"), 1)[0].expression
+        self.assertIsInstance(expr, BinOp)
+        with self.assertRaises(ZeroDivisionError):
+            run(optimize(parse("say 1 / 0\n"), 1))
+    def test_dead_branches_and_unreachable_code(self):
+        func = optimize(parse("to f\n    if false\n        say 1\n    else\n        say 2\n    return 3\n    say 4\nwhile false\n    say 5\n"), 1)
+        self.assertEqual(len(func), 1)
+        self.assertEqual([type(stmt) for stmt in func[0].body], [Print, Return])
+    def test_const_propagation(self):
+        statements = optimize(parse("const A = 2 * 3\nconst B = A + 1\nto f\n    return B\nto g A\n    return A\nsay f()\n"), 2)
+        self.assertEqual(statements[1].value.value, 7)
+        self.assertEqual(statements[2].body[0].value.value, 7)
+        self.assertIsInstance(statements[3].body[0].value, VarAccess)
+    def test_const_not_propagated_when_shadowed(self):
+        source = "const K = 1\nto f\n    K = 5\n    return K\nfor each K in [7]\n    say K\nsay K\n"
+        statements = optimize(parse(source), 2)
+        self.assertIsInstance(statements[1].body[1].value, VarAccess)
+        self.assertIsInstance(statements[2].body[0].expression, VarAccess)
+        self.assertIsInstance(statements[3].expression, Number)
+    def test_levels_agree(self):
+        source = ("const LIMIT = 4 * 5\nto f x\n    if x > LIMIT\n        return \"big\"\n        say \"never\"\n"
+                  "    unless true\n        say \"dead\"\n    return \"small\"\nsay f(30)\nsay f(LIMIT - 19)\n"
+                  "say true and 0\nsay 10 / 4\n")
+        outputs = {run(optimize(parse(source), level)) for level in optimizer.OPT_LEVELS}
+        self.assertEqual(outputs, {"big\nsmall\n0\n2.5\n"})
+    def test_register_pass(self):
+        seen = []
+        def count(statements):
+            seen.append(len(statements))
+            return statements
+        register_pass('test-count', 1, count)
+        try:
+            optimize(parse("say 1\nsay 2\n"), 1)
+            optimize(parse("say 1\n"), 0)
+        finally:
+            optimizer.PASSES[:] = [p for p in optimizer.PASSES if p[0] != 'test-count']
+        self.assertEqual(seen, [2])
+if __name__ == '__main__':
+    unittest.main()
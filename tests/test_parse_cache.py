@@ -0,0 +1,62 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+from shell_lite import bytecode, interpreter, parse_cache
+from shell_lite.parse_cache import ParseCache
+from tests.helpers import run
+class TestParseCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.disk = os.path.join(self.tmp.name, 'cache')
+        self.cache = ParseCache(directory=self.disk)
+        patcher = mock.patch.object(interpreter, 'PARSE_CACHE', self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+    def tearDown(self):
+        self.tmp.cleanup()
+    def write(self, name, source):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(source)
+        return path
+    def test_repeated_import_hits_memory(self):
+        lib = self.write('lib.shl', "to triple n\n    return n * 3\n")
+        source = f"to work\n    use \"{lib}\" as m\n    return m.triple(5)\nsay work()\n"
+        self.assertEqual(run(source) + run(source), "15\n15\n")
+        self.assertEqual(self.cache.stats()['misses'], 1)
+        self.assertEqual(self.cache.stats()['hits'], 1)
+    def test_changed_file_is_reparsed(self):
+        lib = self.write('lib.shl', "say 1\n")
+        self.assertEqual(run(f"use \"{lib}\"\n"), "1\n")
+        self.write('lib.shl', "say 22\n")
+        self.assertEqual(run(f"use \"{lib}\"\n"), "22\n")
+        self.assertEqual(self.cache.stats()['misses'], 2)
+    def test_disk_layer_survives_new_process_cache(self):
+        lib = self.write('lib.shl', "say 7\n")
+        self.cache.load(lib)
+        fresh = ParseCache(directory=self.disk)
+        with mock.patch.object(parse_cache, 'compile_source', side_effect=AssertionError('parsed')):
+            module = fresh.load(lib)
+        self.assertEqual(fresh.stats()['disk_hits'], 1)
+        self.assertEqual(module.source_hash, bytecode.source_hash("say 7\n"))
+    def test_lru_eviction(self):
+        cache = ParseCache(max_entries=2, directory=None)
+        paths = [self.write(f'm{i}.shl', f"say {i}\n") for i in range(3)]
+        for path in paths:
+            cache.load(path)
+        cache.load(paths[2])
+        cache.load(paths[0])
+        self.assertEqual(cache.stats(), {'hits': 1, 'disk_hits': 0, 'misses': 4, 'evictions': 2, 'entries': 2})
+    def test_disk_size_bound(self):
+        cache = ParseCache(directory=self.disk, max_disk_bytes=1)
+        for i in range(3):
+            cache.load(self.write(f'm{i}.shl', f"say {i}\n"))
+        self.assertLessEqual(len(os.listdir(self.disk)), 1)
+    def test_execute_strings_cached_per_interpreter_safely(self):
+        source = "to helper\n    return {}\nrepeat 2 times\n    execute \"say helper()\"\n"
+        self.assertEqual(run(source.format(1)), "1\n1\n")
+        self.assertEqual(run(source.format(2)), "2\n2\n")
+        self.assertEqual(self.cache.stats()['misses'], 1)
+if __name__ == '__main__':
+    unittest.main()
@@ -1,8 +1,55 @@
+import pickle
 import unittest
+from shell_lite.ast_nodes import Assign, BinOp, Call, ListVal, Number, Print, Return, VarAccess
+from shell_lite.lexer import Lexer
+from shell_lite.parser import Parser, StreamingParser
+from shell_lite.parser_gbp import GeometricBindingParser
 class TestParser(unittest.TestCase):
     def test_parser_initialization(self):
         pass
     def test_parse_expression(self):
         pass
+    def test_nodes_and_tokens_are_slotted(self):
+        source = "to f n\n    return g(n)\nsay f(1)\n"
+        tokens = Lexer(source).tokenize()
+        self.assertFalse(hasattr(tokens[0], '__dict__'))
+        for parser_class in (Parser, GeometricBindingParser):
+            statements = parser_class(list(tokens)).parse()
+            ret = statements[0].body[0]
+            self.assertIsInstance(ret, Return)
+            self.assertFalse(hasattr(ret, '__dict__'))
+            self.assertFalse(ret.tail)
+            call = ret.value
+            self.assertIsInstance(call, Call)
+            call.cache = (0, None, 0, 0)
+            copy = pickle.loads(pickle.dumps(statements))
+            self.assertEqual(copy, statements)
+            self.assertIsNone(copy[0].body[0].value.cache)
+            self.assertEqual(copy[0].body[0].line, ret.line)
+    def test_streaming_parsers_match_list_parsers(self):
+        source = ("to f n\n    if n > 1\n        return n * f(n - 1)\n    return 1\n"
+                  "# comment\nfor each i in [1, 2, 3]\n    say f(i)\nsay \"done\"\n")
+        tokens = Lexer(source).tokenize()
+        lexer = Lexer(source)
+        parser = StreamingParser(lexer.stream())
+        statements = []
+        for stmt in parser.iter_parse():
+            self.assertLessEqual(len(parser.buffer), 4)
+            statements.append(stmt)
+        self.assertEqual(statements, Parser(list(tokens)).parse())
+        self.assertEqual(list(GeometricBindingParser(Lexer(source).stream()).iter_parse()),
+                         GeometricBindingParser(list(tokens)).parse())
+    def test_gbp_nested_expressions(self):
+        statements = GeometricBindingParser(Lexer("x = [1, [2, 3]]\nsay f(a + 1 * 2, [4])\n").tokenize()).parse()
+        self.assertEqual(statements, [
+            Assign('x', ListVal([Number(1), ListVal([Number(2), Number(3)])])),
+            Print(Call('f', [BinOp(VarAccess('a'), '+', BinOp(Number(1), '*', Number(2))), ListVal([Number(4)])]))])
+    def test_gbp_parallel_binding_keeps_order(self):
+        source = "".join(f"to f{i} x\n    return x + {i}\nsay f{i}([{i}, 2])\n" for i in range(40))
+        tokens = Lexer(source).tokenize()
+        serial = GeometricBindingParser(list(tokens)).parse()
+        parallel = GeometricBindingParser(list(tokens)).parse_parallel(workers=2, min_roots=1)
+        self.assertEqual(parallel, serial)
+        self.assertEqual(GeometricBindingParser(list(tokens)).parse_parallel(workers=2), serial)
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
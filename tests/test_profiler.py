@@ -0,0 +1,198 @@
+import io
+import os
+import tempfile
+import threading
+import time
+import unittest
+from contextlib import redirect_stderr, redirect_stdout
+from unittest import mock
+from shell_lite import main
+from shell_lite import profiler as profiler_module
+from shell_lite.bytecode import compile_source
+from shell_lite.interpreter import Interpreter
+from shell_lite.profiler import ExecutionStats, MemoryProfiler, Profiler, SamplingProfiler
+from tests.helpers import run
+SOURCE = """to fib n
+    if n < 2
+        return n
+    return fib(n - 1) + fib(n - 2)
+structure Counter
+    has count
+    to bump n
+        return count + n
+c is Counter 5
+total = 0
+i = 0
+while i < 10
+    total = total + c.bump(i)
+    i = i + 1
+say fib(8)
+say total
+"""
+def profile(source):
+    interpreter = Interpreter()
+    profiler = Profiler('test.shl').attach(interpreter)
+    out = run(source, interpreter=interpreter)
+    profiler.detach()
+    return profiler, interpreter, out
+class TestProfiler(unittest.TestCase):
+    def test_counts_functions_methods_and_lines(self):
+        profiler, _, out = profile(SOURCE)
+        self.assertEqual(out, "21\n95\n")
+        self.assertEqual(profiler.functions['fib'].count, 67)
+        self.assertEqual(profiler.functions['Counter.bump'].count, 10)
+        self.assertEqual(profiler.lines[('fib', 2)].count, 67)
+        self.assertEqual(profiler.lines[('fib', 4)].count, 33)
+        self.assertEqual(profiler.lines[('<module>', 13)].count, 10)
+        self.assertEqual(profiler.lines[('Counter.bump', 8)].count, 10)
+        whole = profiler.lines[('<module>', 15)]
+        self.assertGreaterEqual(whole.inclusive, profiler.functions['fib'].inclusive)
+    def test_detach_restores_class_methods(self):
+        profiler, interpreter, _ = profile("say 1\n")
+        for name in ('visit', '_run_function', '_run_method'):
+            self.assertNotIn(name, interpreter.__dict__)
+    def test_collapsed_stacks(self):
+        profiler, _, _ = profile(SOURCE)
+        stacks = {}
+        for line in profiler.collapsed():
+            stack, weight = line.rsplit(' ', 1)
+            stacks[stack] = int(weight)
+        self.assertTrue(all(stack.startswith('<module>;') for stack in stacks))
+        self.assertIn('<module>;fib;fib;fib:2', stacks)
+        self.assertIn('<module>;Counter.bump;Counter.bump:8', stacks)
+    def test_run_profile_command(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            script = os.path.join(tmp, 'prof.shl')
+            folded = os.path.join(tmp, 'out.folded')
+            with open(script, 'w', encoding='utf-8') as f:
+                f.write(SOURCE)
+            out, err = io.StringIO(), io.StringIO()
+            with mock.patch.dict(os.environ, {'USE_LEGACY_PARSER': '1', 'SHL_NO_CACHE': '1'}), \
+                    redirect_stdout(out), redirect_stderr(err):
+                files, options = main.parse_run_options([script, '--profile-output', folded])
+                self.assertTrue(main.run_instrumented(files[0], options))
+            self.assertEqual(out.getvalue(), "21\n95\n")
+            self.assertIn("line 4 in fib", err.getvalue())
+            with open(folded, encoding='utf-8') as f:
+                self.assertTrue(f.read().startswith('<module>;'))
+BUSY = """to spin n
+    total = 0
+    i = 0
+    while i < n
+        total = total + i
+        i = i + 1
+    return total
+structure Box
+    has label
+    to fill n
+        return spin(n)
+b is Box 1
+say b.fill(rounds)
+"""
+class TestSamplingProfiler(unittest.TestCase):
+    def test_samples_other_threads(self):
+        statements = compile_source(BUSY, parser='legacy').statements
+        interpreter = Interpreter()
+        interpreter.global_env.set('rounds', 30000)
+        worker = threading.Thread(target=lambda: interpreter.run_statements(statements))
+        with tempfile.TemporaryDirectory() as tmp, redirect_stdout(io.StringIO()):
+            sampler = SamplingProfiler(os.path.join(tmp, 'out.folded'), interval=0.001).start()
+            worker.start()
+            worker.join()
+            self.assertGreater(sampler.stop(), 0)
+            self.assertFalse(sampler.running)
+            with open(sampler.output, encoding='utf-8') as f:
+                stacks = f.read().splitlines()
+        self.assertTrue(stacks)
+        self.assertTrue(any(line.startswith('<module>;Box.fill;spin;spin:') for line in stacks))
+    def test_process_wide_sampler(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            output = os.path.join(tmp, 'out.folded')
+            self.assertTrue(profiler_module.start_sampling(output, 1))
+            self.assertFalse(profiler_module.start_sampling(output, 1))
+            time.sleep(0.01)
+            profiler_module.stop_sampling()
+            self.assertTrue(os.path.exists(output))
+    def test_run_sample_command_uses_tree_engine(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            script = os.path.join(tmp, 'busy.shl')
+            folded = os.path.join(tmp, 'out.folded')
+            with open(script, 'w', encoding='utf-8') as f:
+                f.write("rounds = 30000\n" + BUSY)
+            err = io.StringIO()
+            with mock.patch.dict(os.environ, {'USE_LEGACY_PARSER': '1', 'SHL_NO_CACHE': '1'}), \
+                    mock.patch('signal.signal'), redirect_stdout(io.StringIO()), redirect_stderr(err):
+                files, options = main.parse_run_options([script, '--sample', folded, '--sample-interval', '1', '--engine=vm'])
+                self.assertTrue(main.run_sampled(files[0], options))
+            self.assertIn("ignoring --engine=vm", err.getvalue())
+            with open(folded, encoding='utf-8') as f:
+                self.assertIn('<module>;Box.fill;spin;spin:', f.read())
+    def test_route_label(self):
+        interpreter = Interpreter()
+        run('when someone visits "/user/:id"\n    return id\n', interpreter=interpreter)
+        body, _ = interpreter.match_route('/user/7')
+        handler = mock.Mock(command='GET')
+        local = {'matched_body': body, 'interpreter_ref': interpreter, 'self': handler}
+        self.assertEqual(profiler_module.route_label(local), 'GET /user/:id')
+        self.assertEqual(profiler_module.route_label({}), '<request>')
+class TestExecutionStats(unittest.TestCase):
+    def test_counts(self):
+        source = ("to probe n\n    if n > 2\n        stop\n    return n\n"
+                  "i = 0\nwhile i < 10\n    i = i + 1\n    say upper(str(probe(i)))\n"
+                  "when someone visits \"/u/:id\"\n    return id\n")
+        interpreter = Interpreter()
+        stats = ExecutionStats().attach(interpreter)
+        out = run(source, interpreter=interpreter)
+        stats.detach()
+        self.assertEqual(out, "1\n2\n")
+        self.assertEqual(stats.nodes['While'], 1)
+        self.assertEqual(stats.nodes['FunctionDef'], 1)
+        self.assertEqual(stats.exceptions, {'StopException': 1})
+        self.assertEqual(stats.builtins, {'str': 2, 'upper': 2})
+        self.assertEqual(stats.scopes, {'Frame': 3})
+        self.assertEqual(stats.regexes, {':(\\w+)': 1, '^/u/(?P<id>[^/]+)$': 1})
+        self.assertNotIn('visit', interpreter.__dict__)
+        Interpreter()
+        self.assertEqual(stats.scopes, {'Frame': 3})
+    def test_counts_matches_operator(self):
+        source = "out = []\nfor each w in [\"a1\", \"b\", \"c2\"]\n    if w matches \"[0-9]\"\n        add w to out\nsay len(out)\n"
+        interpreter = Interpreter()
+        stats = ExecutionStats().attach(interpreter)
+        out = run(source, interpreter=interpreter)
+        stats.detach()
+        self.assertEqual(out, "2\n")
+        self.assertEqual(stats.regexes, {'[0-9]': 3})
+    def test_stacks_with_profiler(self):
+        interpreter = Interpreter()
+        stats = ExecutionStats().attach(interpreter)
+        profiler = Profiler().attach(interpreter)
+        run(SOURCE, interpreter=interpreter)
+        profiler.detach()
+        self.assertIn('visit', interpreter.__dict__)
+        stats.detach()
+        self.assertEqual(profiler.functions['fib'].count, 67)
+        self.assertEqual(stats.nodes['ClassDef'], 1)
+        self.assertEqual(interpreter.__dict__.keys() & {'visit', '_run_function', '_run_method'}, set())
+class TestMemoryProfiler(unittest.TestCase):
+    def test_attributes_allocations_to_lines(self):
+        import tracemalloc
+        source = ("to build n\n    return [x * 2 for x in [1 to n]]\n"
+                  "big = build(50000)\nsmall = [1 to 10]\nbig = 0\n")
+        statements = compile_source(source, parser='legacy').statements
+        interpreter = Interpreter()
+        profiler = MemoryProfiler().attach(interpreter)
+        interpreter.run_statements(statements)
+        profiler.detach()
+        self.assertFalse(tracemalloc.is_tracing())
+        built = profiler.lines[('<module>', 3)]
+        self.assertGreater(built.net, 1000000)
+        self.assertGreaterEqual(built.peak, built.net)
+        self.assertLess(profiler.lines[('<module>', 4)].peak, 100000)
+        self.assertLess(profiler.lines[('<module>', 5)].net, -1000000)
+        self.assertEqual(profiler.functions['build'].count, 1)
+        self.assertGreater(profiler.functions['build'].peak, 1000000)
+        report = io.StringIO()
+        profiler.report(out=report)
+        self.assertIn("line 3 in <module>", report.getvalue().split("Lines by peak memory:")[1].splitlines()[2])
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,40 @@
+import io
+import threading
+import unittest
+from contextlib import redirect_stdout
+import shell_lite
+from shell_lite import Program
+RULE = ("to grade x\n    if x >= limit\n        return \"pass\"\n    return \"fail\"\n"
+        "result = grade(score)\ncount = 0\ni = 0\nwhile i < 50\n    count = count + score\n    i = i + 1\n")
+class TestProgram(unittest.TestCase):
+    def test_compile_once_run_many(self):
+        program = shell_lite.compile(RULE, 'rule.shl', parser='legacy')
+        self.assertIsInstance(program, Program)
+        for engine in ('tree', 'closure', 'vm'):
+            self.assertEqual(program.run({'limit': 5, 'score': 7}, engine=engine),
+                             {'limit': 5, 'score': 7, 'result': 'pass', 'count': 350, 'i': 50})
+            self.assertEqual(program.run({'limit': 5, 'score': 2}, engine=engine)['result'], 'fail')
+    def test_runs_do_not_share_state(self):
+        program = shell_lite.compile("say defined\ndefined = 1\n", parser='legacy')
+        buffer = io.StringIO()
+        with redirect_stdout(buffer):
+            self.assertEqual(program.run({'defined': 0}), {'defined': 1})
+            self.assertEqual(program.run({'defined': 5}), {'defined': 1})
+        self.assertEqual(buffer.getvalue(), "0\n5\n")
+        with self.assertRaises(NameError):
+            program.run()
+        with self.assertRaises(ValueError):
+            program.run({'defined': 0}, engine='jit')
+    def test_threads_share_one_program(self):
+        program = shell_lite.compile(RULE, parser='legacy')
+        results = {}
+        def worker(n):
+            results[n] = [program.run({'limit': 10, 'score': n})['count'] for _ in range(20)]
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(results, {n: [n * 50] * 20 for n in range(8)})
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,32 @@
+import unittest
+from shell_lite.bytecode import compile_source
+from tests.helpers import run
+COUNTDOWN = "to countdown n acc\n    if n == 0\n        return acc\n    return countdown(n - 1, acc + n)\nsay countdown(depth, 0)\n"
+DEEP = "to rsum n\n    if n == 0\n        return 0\n    return n + rsum(n - 1)\nsay rsum(depth)\n"
+class TestRecursion(unittest.TestCase):
+    def test_tail_calls_marked(self):
+        module = compile_source(COUNTDOWN + "to g n\n    try:\n        return g(n)\n    catch e:\n        say e\n", parser='legacy')
+        self.assertTrue(module.statements[0].body[1].tail)
+        self.assertFalse(module.statements[0].body[0].body[0].tail)
+        self.assertFalse(module.statements[2].body[0].try_body[0].tail)
+    def test_self_tail_call_runs_as_loop(self):
+        for engine in ('tree', 'closure', 'vm'):
+            self.assertEqual(run(COUNTDOWN, engine, depth=20000), "200010000\n")
+    def test_vm_explicit_stack_deep_recursion(self):
+        self.assertEqual(run(DEEP, 'vm', depth=20000), "200010000\n")
+        with self.assertRaises(RecursionError):
+            run(DEEP, 'tree', depth=20000)
+    def test_redefined_function_is_not_looped(self):
+        source = ("to step n\n    if n == 0\n        return \"done\"\n    return step(n - 1)\n"
+                  "to outer\n    to step n\n        return \"inner\"\n    return \"ok\"\n"
+                  "say step(3)\nsay outer()\nsay step(3)\n")
+        outputs = {run(source, engine, depth=0) for engine in ('tree', 'closure', 'vm')}
+        self.assertEqual(outputs, {"done\nok\ninner\n"})
+    def test_errors_inside_deep_calls_keep_line(self):
+        source = "to down n\n    if n == 0\n        return 1 / 0\n    return 1 + down(n - 1)\nsay down(depth)\n"
+        for engine in ('tree', 'vm'):
+            with self.assertRaises(ZeroDivisionError) as ctx:
+                run(source, engine, depth=50)
+            self.assertEqual(ctx.exception.line, 3)
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,42 @@
+import unittest
+from shell_lite.interpreter import Frame, Interpreter
+from shell_lite.resolver import resolve
+from tests.helpers import parse, run
+class TestResolver(unittest.TestCase):
+    def test_function_slots(self):
+        func = resolve(parse("to f a\n    b = a + 1\n    return b\n"))[0]
+        self.assertEqual(func.layout, {'a': 0, 'b': 1})
+        assign = func.body[0]
+        self.assertEqual(assign.scope, (1, func.layout))
+        self.assertEqual(assign.value.left.scope, (0, 0, func.layout))
+    def test_nested_loop_depth(self):
+        func = resolve(parse("to f items\n    total = 0\n    for each x in items\n        say x + total\n    return total\n"))[0]
+        loop = func.body[1]
+        expr = loop.body[0].expression
+        self.assertEqual(expr.left.scope, (0, 0, loop.layout))
+        self.assertEqual(expr.right.scope, (1, func.layout['total'], func.layout))
+    def test_globals_stay_unresolved(self):
+        statements = resolve(parse("x = 1\nto f\n    return x\n"))
+        self.assertIsNone(statements[0].scope)
+        self.assertIsNone(statements[1].body[0].value.scope)
+    def test_same_output_as_name_lookup(self):
+        source = ("x = 10\nto shadow\n    y = x\n    x = 99\n    return y + x\nsay shadow()\nsay x\n"
+                  "to scan items\n    best = 0\n    for each v in items\n        repeat 2 times\n"
+                  "            if v * index > best\n                best = v * index\n    return best\n"
+                  "say scan([3, 7, 2])\nto mk\n    y = 4\n    f = fn z => z + y\n    return f(3)\nsay mk()\n")
+        self.assertEqual(run(resolve(parse(source))), "109\n10\n0\n7\n")
+        self.assertEqual(run(resolve(parse(source))), run(parse(source)))
+    def test_frame_constants_and_dynamic_names(self):
+        interpreter = Interpreter()
+        interpreter.global_env.set_const('K', 1)
+        frame = Frame({'a': 0}, parent=interpreter.global_env)
+        frame.set('a', 5)
+        frame.set('extra', 6)
+        self.assertEqual(frame.variables, {'a': 5, 'extra': 6})
+        self.assertEqual(frame.get('K'), 1)
+        with self.assertRaises(RuntimeError):
+            frame.set('K', 2)
+        with self.assertRaises(NameError):
+            frame.get('missing')
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,25 @@
+import io
+import os
+import subprocess
+import sys
+import unittest
+from contextlib import redirect_stdout
+from shell_lite import main
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LAZY = ['concurrent.futures', 'csv', 'http.server', 'sqlite3', 'subprocess', 'tkinter', 'urllib.request', 'zipfile']
+class TestStartup(unittest.TestCase):
+    def test_heavy_modules_load_lazily(self):
+        code = f"import sys, shell_lite.main; print([m for m in {LAZY!r} if m in sys.modules])"
+        env = dict(os.environ, PYTHONPATH=ROOT)
+        result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, env=env, check=True)
+        self.assertEqual(result.stdout.strip(), "[]")
+    def test_startup_report(self):
+        buffer = io.StringIO()
+        with redirect_stdout(buffer):
+            main.startup_report(limit=3)
+        report = buffer.getvalue()
+        self.assertTrue(report.startswith("shl startup: "))
+        self.assertIn("shell_lite.interpreter", report)
+        self.assertIn("Slowest other imports", report)
+if __name__ == '__main__':
+    unittest.main()